@@ -1,30 +1,48 @@
 import logging
+from functools import partial
 
 import uvicorn
 from config.config import load_config
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
-from src.core.get_db import GetDBMiddleware
 
-from src.models import Base
+from src.core import metrics
+from src.core.engine import configure_engines, dispose_engines, get_engine, get_session_maker
+from src.core.notify import FEED_CHANGED, NEWS_CHANGED
+from src.core.pubsub import Broker
+from src.core.response_cache import MemoryBackend, ResponseCache, SqliteBackend
+from src.core.profiling import configure_profiling
+from src.core.tracing import configure_tracing
+from src.migrations import migrate
 from src.router import routers
 
 logger = logging.getLogger(__name__)
 config = load_config()
 
-main_engine = create_async_engine(config.db.alchemy_url)
+configure_engines(config.db)
+configure_tracing(config.tracing)
+configure_profiling(config.profiling)
 
-MainAsyncSessionLocal = async_sessionmaker(
-    bind=main_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+main_engine = get_engine()
+MainAsyncSessionLocal = get_session_maker()
+
+if config.cache.backend == "sqlite":
+    cache_backend = SqliteBackend(config.cache.path, maxsize=config.cache.maxsize)
+else:
+    cache_backend = MemoryBackend(maxsize=config.cache.maxsize)
 
 app = FastAPI()
+app.state.session_pool = MainAsyncSessionLocal
+app.state.response_cache = ResponseCache(cache_backend, ttl=config.cache.ttl)
+app.state.broker = Broker()
+# ingest шлёт NOTIFY после коммита News / NewsTickerValue — кэш ответов устарел
+app.state.broker.on(NEWS_CHANGED, app.state.response_cache.invalidate)
+# новые SourceNews и is_original (на каждую пачку обхода) меняют только ленту:
+# /hot и ряды тикеров остаются в кэше
+app.state.broker.on(FEED_CHANGED, partial(app.state.response_cache.invalidate,
+                                          prefix=f"{routers.prefix}/news"))
 app.include_router(routers)
 
-app.add_middleware(GetDBMiddleware, session_pool=MainAsyncSessionLocal)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,6 +51,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(filename)s:%(lineno)d #%(levelname)-8s '
@@ -43,10 +68,18 @@ logging.basicConfig(
 @app.on_event("startup")
 async def main():
     async with main_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await migrate(conn)
+
+    await app.state.broker.start(config.db.url)
 
     logger.info('Starting services_api')
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.broker.stop()
+    await dispose_engines()
+
+
 if __name__ == '__main__':
     uvicorn.run('app:app', host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,76 @@
+"""
+Горячие пути анализа на синтетическом корпусе: get_duplicate_count (окно 2 дня)
+и get_line (окно 10 дней) в зависимости от размера окна.
+
+    python -m benchmarks.analysis --sizes 250 500 1000 2000 4000 --targets 20
+
+Для каждого размера окна берутся последние новости корпуса, целевые новости — из самых
+свежих сюжетных. Печатается медиана/p95 на вызов, вызовы в секунду, показатель роста
+времени относительно предыдущего размера (1.0 — линейно, 2.0 — квадратично) и found —
+сколько целевых новостей получили дубликаты/сюжет (проверка, что корпус не вырожден).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.corpus import Corpus, make_corpus
+from parsers.__main__ import get_duplicate_count, get_line
+
+
+async def measure(corpus: Corpus, size: int, targets: np.ndarray,
+                  case: str) -> tuple[list[float], int]:
+    """Время каждого вызова и число целевых новостей, для которых что-то нашлось."""
+    window = corpus.window(size=size + len(targets))
+    timings, found = [], 0
+    for i in targets:
+        news = corpus.news(i)
+        started = time.perf_counter()
+        if case == "duplicates":
+            result = await get_duplicate_count(news, window.exclude([news.id]).embeddings)
+        else:
+            # get_line печатает причины отказа — в замер они не нужны
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = await get_line(news, window)
+        timings.append(time.perf_counter() - started)
+        found += bool(result)
+    return timings, found
+
+
+def pick_targets(corpus: Corpus, n: int) -> np.ndarray:
+    """Самые свежие новости из сюжетов: на них get_line проходит все этапы."""
+    order = np.argsort(corpus.dttm)[::-1]
+    return order[corpus.stories[order] >= 0][:n]
+
+
+async def main(sizes: list[int], targets: int, seed: int):
+    corpus = make_corpus(max(sizes) + targets, seed=seed)
+    chosen = pick_targets(corpus, targets)
+    print(f"corpus {len(corpus)} news, {targets} targets")
+    print(f"{'case':<12}{'window':>8}{'median ms':>12}{'p95 ms':>10}{'calls/s':>10}"
+          f"{'growth':>8}{'found':>8}")
+    for case in ("duplicates", "line"):
+        prev = None
+        for size in sizes:
+            timings, found = await measure(corpus, size, chosen, case)
+            median = statistics.median(timings)
+            p95 = np.percentile(timings, 95)
+            growth = "" if prev is None else \
+                f"{math.log(median / prev[1]) / math.log(size / prev[0]):.2f}"
+            print(f"{case:<12}{size:>8}{median * 1000:>12.1f}{p95 * 1000:>10.1f}"
+                  f"{1 / median:>10.1f}{growth:>8}{found:>8}")
+            prev = (size, median)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analysis hot-path benchmark")
+    parser.add_argument("--sizes", nargs="+", default=[250, 500, 1000, 2000, 4000], type=int)
+    parser.add_argument("--targets", default=20, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.targets, args.seed))
@@ -0,0 +1,141 @@
+"""
+Пропускная способность API-слоя: старый GetDBMiddleware (BaseHTTPMiddleware, сессия на
+каждый запрос) против ленивой сессии через DBSessionRoute + get_db.
+
+    python -m benchmarks.api_throughput --requests 20000 --concurrency 50
+
+Запросы подаются прямо в ASGI-приложение, без сети. Пул сессий фиктивный: он только
+считает открытые сессии, так что замеряется накладной расход фреймворка, а не Postgres.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.core.get_db import DBSessionRoute, get_db
+
+
+class CountingSessionPool:
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return _FakeSession()
+
+
+class _FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await asyncio.sleep(0)
+
+
+class LegacyGetDBMiddleware(BaseHTTPMiddleware):
+    """Копия удалённого GetDBMiddleware для сравнения."""
+
+    def __init__(self, app, session_pool):
+        super().__init__(app)
+        self.session_pool = session_pool
+
+    async def dispatch(self, request: Request, call_next):
+        async with self.session_pool() as session:
+            request.state.db = session
+            return await call_next(request)
+
+
+async def legacy_get_db(request: Request):
+    return request.state.db
+
+
+def build_legacy_app(pool: CountingSessionPool) -> FastAPI:
+    router = APIRouter()
+
+    @router.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @router.get("/db")
+    async def with_db(db=Depends(legacy_get_db)):
+        return {"ok": db is not None}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(LegacyGetDBMiddleware, session_pool=pool)
+    return app
+
+
+def build_lazy_app(pool: CountingSessionPool) -> FastAPI:
+    router = APIRouter(route_class=DBSessionRoute)
+
+    @router.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @router.get("/db")
+    async def with_db(db=Depends(get_db)):
+        return {"ok": db is not None}
+
+    app = FastAPI()
+    app.state.session_pool = pool
+    app.include_router(router)
+    return app
+
+
+async def asgi_get(app, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80), "state": {},
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run_case(app, path: str, requests: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            assert await asgi_get(app, path) == 200
+
+    for _ in range(min(200, requests)):
+        await asgi_get(app, path)
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main(requests: int, concurrency: int):
+    print(f"{'app':<8}{'path':<8}{'req/s':>12}{'sessions':>10}")
+    for name, build in (("legacy", build_legacy_app), ("lazy", build_lazy_app)):
+        for path in ("/ping", "/db"):
+            pool = CountingSessionPool()
+            app = build(pool)
+            rps = await run_case(app, path, requests, concurrency)
+            print(f"{name:<8}{path:<8}{rps:>12.0f}{pool.opened:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API request-throughput benchmark")
+    parser.add_argument("--requests", default=20000, type=int)
+    parser.add_argument("--concurrency", default=50, type=int)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
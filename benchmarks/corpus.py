@@ -0,0 +1,114 @@
+"""
+Синтетический корпус новостей для бенчмарков анализа.
+
+Сюжет (story) — направление в пространстве эмбеддингов. Новости сюжета разбросаны по
+нескольким дням и источникам и лежат рядом с его направлением; доля dup_rate из них —
+почти точные перепечатки предыдущей новости того же сюжета (материал для дедупликации).
+Остальное — одиночные новости без сюжета. Всё детерминировано seed'ом.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from src.store import EmbeddingWindow
+from src.store.embeddings import DTTM_DTYPE, EMBEDDING_DIM
+
+SOURCES = ("www.interfax.ru", "www.cbr.ru", "lenta.ru", "www.rbc.ru", "tass.ru")
+WORDS = ("рынок", "акции", "банк", "ставка", "нефть", "рубль", "биржа", "индекс", "компания",
+         "дивиденды", "отчёт", "выручка", "инфляция", "санкции", "облигации", "курс")
+
+
+@dataclass
+class Corpus:
+    ids: np.ndarray
+    dttm: np.ndarray
+    source_titles: np.ndarray
+    embeddings: np.ndarray
+    stories: np.ndarray  # -1 — новость вне сюжета
+    texts: list[str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def window(self, end: Optional[datetime] = None, size: Optional[int] = None) -> EmbeddingWindow:
+        """Окно в формате EmbeddingStore: последние size новостей до end."""
+        order = np.lexsort((self.ids, self.dttm))
+        if end is not None:
+            order = order[self.dttm[order] < np.datetime64(end, "us")]
+        if size is not None:
+            order = order[-size:]
+        sources = sorted(set(self.source_titles.tolist()))
+        codes = {s: i for i, s in enumerate(sources)}
+        return EmbeddingWindow(
+            ids=self.ids[order],
+            dttm=self.dttm[order],
+            source_codes=np.array([codes[s] for s in self.source_titles[order]], dtype=np.int16),
+            sources=sources,
+            embeddings=self.embeddings[order],
+        )
+
+    def news(self, i: int) -> SimpleNamespace:
+        """Новость как объект с полями SourceNews, которые читает анализ."""
+        return SimpleNamespace(
+            id=int(self.ids[i]),
+            dttm=self.dttm[i].astype(datetime),
+            source_title=str(self.source_titles[i]),
+            embedding=self.embeddings[i],
+            content=self.texts[i],
+        )
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def make_corpus(n: int, *, days: int = 10, n_sources: int = 3, story_share: float = 0.6,
+                story_size: int = 8, dup_rate: float = 0.2, spread: float = 0.25,
+                end: datetime = datetime(2025, 6, 30), seed: int = 0) -> Corpus:
+    rng = np.random.default_rng(seed)
+    sources = np.array(SOURCES[:n_sources], dtype=object)
+    start = end - timedelta(days=days)
+    span_us = days * 24 * 3600 * 10 ** 6
+
+    n_story_news = int(n * story_share)
+    n_stories = max(1, n_story_news // story_size)
+    centers = _unit(rng.standard_normal((n_stories, EMBEDDING_DIM)))
+    stories = np.full(n, -1, dtype=np.int64)
+    stories[:n_story_news] = rng.integers(0, n_stories, n_story_news)
+
+    # сюжет живёт пару дней: новости сюжета группируются вокруг его начала
+    story_start = rng.integers(0, span_us, n_stories)
+    offsets = rng.integers(0, span_us, n)
+    in_story = stories >= 0
+    delay = rng.exponential(span_us / days, in_story.sum()).astype(np.int64)
+    offsets[in_story] = np.minimum(story_start[stories[in_story]] + delay, span_us - 1)
+    dttm = np.datetime64(start, "us") + offsets.astype("timedelta64[us]")
+
+    embeddings = rng.standard_normal((n, EMBEDDING_DIM))
+    embeddings[in_story] = centers[stories[in_story]] + spread * _unit(embeddings[in_story])
+    embeddings[~in_story] = _unit(embeddings[~in_story])
+
+    # перепечатки: копия более ранней новости того же сюжета с небольшим шумом
+    order = np.argsort(dttm, kind="stable")
+    last_in_story: dict[int, int] = {}
+    for i in order:
+        story = stories[i]
+        if story < 0:
+            continue
+        if story in last_in_story and rng.random() < dup_rate:
+            j = last_in_story[story]
+            embeddings[i] = embeddings[j] + 0.01 * rng.standard_normal(EMBEDDING_DIM)
+        last_in_story[story] = i
+
+    texts = [" ".join(rng.choice(WORDS, 60)) for _ in range(n)]
+    return Corpus(
+        ids=np.arange(1, n + 1, dtype=np.int64),
+        dttm=dttm.astype(DTTM_DTYPE),
+        source_titles=sources[rng.integers(0, n_sources, n)],
+        embeddings=_unit(embeddings).astype(np.float32),
+        stories=stories,
+        texts=texts,
+    )
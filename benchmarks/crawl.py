@@ -0,0 +1,112 @@
+"""
+Пропускная способность парсеров на replay-сервере (benchmarks.replay) без сети.
+
+    python -m benchmarks.crawl --parsers interfax cbr lenta --concurrency 1 5 15 \
+        --latency-ms 50 --jitter-ms 50 --error-rate 0.02
+
+Сервер поднимается в том же процессе на свободном порту; фикстуры — из --fixtures или
+синтетические (benchmarks.fixtures) во временной директории. Парсеры пишут в CSV во
+временную директорию, так что замеряется обход и разбор страниц, а не БД и эмбеддинги.
+Падение парсера на внедрённой ошибке — тоже результат: печатается тип исключения.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fixtures import generate
+from benchmarks.replay import Faults, FixtureStore, ReplayServer
+from parsers.cbr_sync import SBRParser
+from parsers.interfax_async import InterfaxParser
+from parsers.lenta_async import LentaParser
+
+# lenta_async при импорте включает DEBUG для всего процесса
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def count_rows(path: Path) -> int:
+    """Строки CSV без заголовка (у LentaParser разделитель ",", у BaseParser — "|")."""
+    if not path.exists():
+        return 0
+    delimiter = "," if path.stem == "lenta" else "|"
+    with open(path, encoding="utf-8", newline="") as file:
+        return max(sum(1 for _ in csv.reader(file, delimiter=delimiter)) - 1, 0)
+
+
+async def run_parser(name: str, base_url: str, concurrency: int, out: Path) -> int:
+    """Один полный обход; возвращает число сохранённых статей."""
+    path = out / f"{name}.csv"
+    path.unlink(missing_ok=True)
+    if name == "lenta":
+        # у LentaParser свой пул соединений, concurrency к нему не применяется
+        parser = LentaParser(max_workers=2, outfile_name=str(path),
+                             from_date=time.strftime("%d.%m.%Y"), base_url=f"{base_url}/lenta")
+        await parser.run()
+    else:
+        cls = InterfaxParser if name == "interfax" else SBRParser
+        parser = cls(source_title=f"bench-{name}", dump_to_type="file", dump_pointer=str(path),
+                     base_url=f"{base_url}/{name}", concurrency=concurrency)
+        await parser.run()
+    return count_rows(path)
+
+
+async def main(parsers: list[str], levels: list[int], faults: Faults, fixtures: Optional[str],
+               articles: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = FixtureStore(fixtures or tmp / "fixtures")
+        if fixtures is None:
+            generate(store, articles=articles, seed=faults.seed)
+        server = ReplayServer(store, faults)
+        runner, base_url = await server.start()
+        print(f"{len(store)} fixtures, latency {faults.latency_ms}+{faults.jitter_ms} ms, "
+              f"errors {faults.error_rate:.0%}")
+        print(f"{'parser':<10}{'conc':>6}{'seconds':>9}{'articles':>10}{'art/s':>8}"
+              f"{'requests':>10}{'failed':>8}{'peak':>6}  result")
+        try:
+            for name in parsers:
+                for concurrency in ([0] if name == "lenta" else levels):
+                    server.reset_stats()
+                    started = time.perf_counter()
+                    try:
+                        # парсеры печатают каждую страницу и дамп — в замер это не нужно
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            stored = await run_parser(name, base_url, concurrency, tmp)
+                        result = "ok"
+                    except Exception as exc:
+                        stored = count_rows(tmp / f"{name}.csv")
+                        result = type(exc).__name__
+                    elapsed = time.perf_counter() - started
+                    stats = server.snapshot()
+                    failed = stats.get("injected", 0) + stats.get("missing", 0)
+                    print(f"{name:<10}{concurrency or '-':>6}{elapsed:>9.2f}{stored:>10}"
+                          f"{stored / elapsed:>8.1f}{stats['requests']:>10}{failed:>8}"
+                          f"{stats['peak_in_flight']:>6}  {result}")
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline parser crawl benchmark")
+    parser.add_argument("--parsers", nargs="+", default=["interfax", "cbr", "lenta"],
+                        choices=["interfax", "cbr", "lenta"])
+    parser.add_argument("--concurrency", nargs="+", default=[1, 5, 15], type=int)
+    parser.add_argument("--fixtures", default=None, help="recorded fixtures, default synthetic")
+    parser.add_argument("--articles", default=300, type=int)
+    parser.add_argument("--latency-ms", default=20, type=float)
+    parser.add_argument("--jitter-ms", default=20, type=float)
+    parser.add_argument("--error-rate", default=0, type=float)
+    parser.add_argument("--error-status", default=503, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.parsers, args.concurrency,
+        Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed),
+        args.fixtures, args.articles,
+    ))
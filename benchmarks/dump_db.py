@@ -0,0 +1,92 @@
+"""
+Запись новостей парсером (BaseParser._dump_db) в локальный Postgres с pgvector.
+
+    docker run -d -p 5433:5432 -e POSTGRES_PASSWORD=bench pgvector/pgvector:pg16
+    DB__HOST=localhost DB__PORT=5433 ... python -m benchmarks.dump_db --rows 100 500 2000
+
+Подключение — из тех же переменных DB__*, что и у приложения; схема доводится migrate.
+Строки пишутся с source_title "bench" и удаляются после каждого прогона. Модель — StubModel
+из benchmarks.embeddings, так что замеряется путь в БД, а не эмбеддинги.
+Печатаются строки в секунду, SQL-запросов на строку и доля времени в БД.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from benchmarks.corpus import make_corpus
+from benchmarks.embeddings import StubModel
+from config.config import Tracing, load_config
+from parsers import utils
+from src.core.engine import configure_engines, dispose_engines, get_engine
+from src.core.tracing import configure_tracing, trace
+from src.migrations import migrate
+from src.models import SourceNews, SourceNewsContent
+
+SOURCE_TITLE = "bench"
+
+
+class BenchParser(utils.BaseParser):
+    """Только запись: строки подаются в _dump_db напрямую, обхода нет."""
+
+    async def discover(self, session, day, used):
+        return []
+
+    async def extract(self, session, item):
+        return None
+
+    async def collect_data(self, session, used):
+        return []
+
+
+def make_rows(n: int, seed: int) -> list[dict]:
+    corpus = make_corpus(n, seed=seed, end=datetime.utcnow() + timedelta(hours=3))
+    return [{
+        "other_id": 10 ** 9 + seed * n + i,
+        "published_dttm": corpus.dttm[i].astype(datetime).isoformat(),
+        "url": f"https://bench.local/{seed}/{i}",
+        "content": corpus.texts[i],
+    } for i in range(n)]
+
+
+async def cleanup():
+    bench_ids = select(SourceNews.id).where(SourceNews.source_title == SOURCE_TITLE)
+    async with get_engine().begin() as conn:
+        await conn.execute(delete(SourceNewsContent)
+                           .where(SourceNewsContent.source_news_id.in_(bench_ids)))
+        await conn.execute(delete(SourceNews).where(SourceNews.source_title == SOURCE_TITLE))
+
+
+async def main(sizes: list[int]):
+    config = load_config()
+    configure_engines(config.db)
+    configure_tracing(Tracing(enabled=True, n_plus_one=10 ** 9, slow_ms=10 ** 9))
+    utils._model = StubModel()
+    parser = BenchParser(SOURCE_TITLE, "db", config.db.alchemy_url)
+    try:
+        async with get_engine().begin() as conn:
+            await migrate(conn)
+        await cleanup()
+        print(f"{'rows':>8}{'rows/s':>10}{'queries/row':>13}{'db share':>10}")
+        for seed, n in enumerate(sizes):
+            rows = make_rows(n, seed)
+            started = time.perf_counter()
+            with trace("dump_db", scope="bench") as sql:
+                stored = await parser.dump(rows)
+            elapsed = time.perf_counter() - started
+            assert len(stored) == n
+            await cleanup()
+            print(f"{n:>8}{n / elapsed:>10.0f}{sql.count / n:>13.1f}"
+                  f"{sql.db_seconds / elapsed:>10.0%}")
+    finally:
+        # строки упавшего прогона удалит cleanup в начале следующего
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Parser DB-write benchmark")
+    arg_parser.add_argument("--rows", nargs="+", default=[100, 500, 2000], type=int)
+    args = arg_parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,106 @@
+"""
+Очистка текста и эмбеддинги: clean_news_content по шагам, generate_news_embedding по одной
+новости против generate_news_embeddings пачкой.
+
+    python -m benchmarks.embeddings --news 2000 --batch 1 8 32 128
+    python -m benchmarks.embeddings --real   # настоящая модель (скачивается при первом запуске)
+
+По умолчанию вместо SentenceTransformer подставляется StubModel с почти бесплатным encode,
+так что видны накладные расходы вокруг модели (очистка, нормализация, метрики, вызовы
+по одной новости), а не сама модель.
+"""
+import argparse
+import time
+import zlib
+
+import numpy as np
+
+from benchmarks.corpus import WORDS
+from parsers import utils
+from src.store.embeddings import EMBEDDING_DIM
+
+SOURCE_TITLE = "www.interfax.ru"
+
+
+class StubModel:
+    """Детерминированные псевдо-эмбеддинги: вектор из crc32 текста."""
+
+    def encode(self, sentences: list[str], show_progress_bar: bool = False,
+               convert_to_numpy: bool = True) -> np.ndarray:
+        out = np.empty((len(sentences), EMBEDDING_DIM), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            rng = np.random.default_rng(zlib.crc32(sentence.encode()))
+            out[i] = rng.standard_normal(EMBEDDING_DIM)
+        return out
+
+
+def make_texts(n: int, seed: int = 0) -> list[str]:
+    """Тексты с тем, что вычищает clean_news_content: префикс, приветствие, ссылки, эмодзи."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for i in range(n):
+        body = " ".join(rng.choice(WORDS, rng.integers(40, 400)))
+        texts.append(
+            f"Москва. {i} interfax.ru — Добрый день, коллеги! {body} 📈 "
+            f"подробнее https://www.interfax.ru/business/{i} и https://t.me/c/{i}"
+        )
+    return texts
+
+
+def rate(fn, items: int, repeat: int = 3) -> float:
+    """Лучшее из repeat прогонов, элементов в секунду."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return items / best
+
+
+def bench_cleaning(texts: list[str]):
+    steps = (
+        ("interfax_prefix", utils.remove_interfax_prefix),
+        ("greeting_prefix", utils.remove_greeting_prefix),
+        ("source_urls", lambda t: utils.remove_source_urls(t, SOURCE_TITLE)),
+        ("emoji", utils.remove_emoji),
+        ("clean_news_content", lambda t: utils.clean_news_content(t, SOURCE_TITLE)),
+    )
+    mb = sum(len(t.encode()) for t in texts) / 2 ** 20
+    print(f"{'step':<22}{'texts/s':>12}{'MB/s':>10}")
+    for name, step in steps:
+        per_sec = rate(lambda: [step(t) for t in texts], len(texts))
+        print(f"{name:<22}{per_sec:>12.0f}{per_sec / len(texts) * mb:>10.1f}")
+
+
+def bench_embeddings(texts: list[str], batches: list[int]):
+    print(f"{'mode':<22}{'batch':>8}{'texts/s':>12}")
+    per_sec = rate(lambda: [utils.generate_news_embedding(t, SOURCE_TITLE) for t in texts],
+                   len(texts), repeat=1)
+    print(f"{'one-by-one':<22}{1:>8}{per_sec:>12.1f}")
+    for batch in batches:
+        def run():
+            for i in range(0, len(texts), batch):
+                utils.generate_news_embeddings(texts[i:i + batch], SOURCE_TITLE)
+        per_sec = rate(run, len(texts), repeat=1)
+        print(f"{'generate_embeddings':<22}{batch:>8}{per_sec:>12.1f}")
+
+
+def main(news: int, batches: list[int], real: bool):
+    texts = make_texts(news)
+    bench_cleaning(texts)
+    print()
+    if real:
+        utils.get_model().encode(texts[:8])  # загрузка и прогрев вне замера
+    else:
+        utils._model = StubModel()
+    print(f"model: {utils.EMBEDDING_MODEL_NAME if real else 'stub'} ({utils.device})")
+    bench_embeddings(texts, batches)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text cleaning and embedding benchmark")
+    parser.add_argument("--news", default=2000, type=int)
+    parser.add_argument("--batch", nargs="+", default=[8, 32, 128], type=int)
+    parser.add_argument("--real", action="store_true", help="use the real SentenceTransformer")
+    args = parser.parse_args()
+    main(args.news, args.batch, args.real)
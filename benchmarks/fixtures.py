@@ -0,0 +1,104 @@
+"""
+Синтетические фикстуры replay-сервера: страницы в той разметке, которую разбирают
+InterfaxParser, SBRParser и LentaParser (списки за день, статьи, JSON-лента ЦБ).
+
+По умолчанию день — сегодняшний: InterfaxParser.run и LentaParser идут от текущей даты.
+"""
+import json
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.corpus import WORDS
+from benchmarks.replay import Fixture, FixtureStore, request_key
+
+INTERFAX_PAGE = 40
+CBR_PAGE = 10
+CBR_PAGES = 99  # SBRParser.collect_data всегда обходит страницы 1..99
+LENTA_PAGE = 20
+MONTHS = ("января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа",
+          "сентября", "октября", "ноября", "декабря")
+
+HTML_CP1251 = "text/html; charset=windows-1251"
+HTML_UTF8 = "text/html; charset=utf-8"
+JSON_UTF8 = "application/json; charset=utf-8"
+
+
+def _paragraphs(rng: np.random.Generator) -> str:
+    return "".join(f"<p>{' '.join(rng.choice(WORDS, rng.integers(20, 80))).capitalize()}.</p>"
+                   for _ in range(rng.integers(3, 10)))
+
+
+def _times(rng: np.random.Generator, n: int) -> list[str]:
+    minutes = np.sort(rng.integers(0, 24 * 60, n))[::-1]
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+
+def _html(body: str) -> str:
+    return f"<html><body>{body}</body></html>"
+
+
+def generate_interfax(store: FixtureStore, day: date, articles: int, rng: np.random.Generator):
+    pages = max(1, -(-articles // INTERFAX_PAGE))
+    day_path = f"/news/{day.year}/{day.month}/{day.day}/all"
+    pager = "".join(f'<a href="{day_path}/page_{i}">{i}</a>' for i in range(1, pages + 1))
+    ids = list(range(900000, 900000 + articles))
+    times = _times(rng, articles)
+    for page in range(pages):
+        items = "".join(
+            f'<div data-id="{i}"><span>{t}</span><a href="/business/{i}">Новость {i}</a></div>'
+            for i, t in zip(ids[page * INTERFAX_PAGE:(page + 1) * INTERFAX_PAGE],
+                            times[page * INTERFAX_PAGE:(page + 1) * INTERFAX_PAGE])
+        )
+        body = _html(f'<div class="an">{items}</div><div class="pages">{pager}</div>')
+        store.put("interfax", f"{day_path}/page_{page + 1}",
+                  Fixture(200, HTML_CP1251, body.encode("cp1251")))
+    for i in ids:
+        body = _html(f'<article itemprop="articleBody">{_paragraphs(rng)}</article>')
+        store.put("interfax", f"/business/{i}", Fixture(200, HTML_CP1251, body.encode("cp1251")))
+
+
+def generate_cbr(store: FixtureStore, day: date, articles: int, rng: np.random.Generator):
+    ids = list(range(50000, 50000 + min(articles, CBR_PAGE * CBR_PAGES)))
+    times = _times(rng, len(ids))
+    for page in range(1, CBR_PAGES + 1):
+        chunk = slice((page - 1) * CBR_PAGE, page * CBR_PAGE)
+        feed = [{"doc_htm": str(i), "DT": f"{day.isoformat()}T{t}:00"}
+                for i, t in zip(ids[chunk], times[chunk])]
+        query = {"IsEng": "false", "page": str(page), "pagesize": str(CBR_PAGE), "type": "0"}
+        store.put("cbr", request_key("/FPEventAndPress/", query),
+                  Fixture(200, JSON_UTF8, json.dumps(feed, ensure_ascii=False).encode()))
+    for i in ids:
+        store.put("cbr", f"/press/event/?id={i}",
+                  Fixture(200, HTML_UTF8, _html(_paragraphs(rng)).encode()))
+
+
+def generate_lenta(store: FixtureStore, day: date, articles: int, rng: np.random.Generator):
+    day_path = f"/news/{day:%Y/%m/%d}"
+    urls = [f"{day_path}/story-{i}/" for i in range(articles)]
+    times = _times(rng, articles)
+    for page in range(max(1, -(-articles // LENTA_PAGE))):
+        items = "".join(
+            f'<li class="archive-page__item _news"><a href="{url}">Новость</a>'
+            f"<time>{t}, {day.day} {MONTHS[day.month - 1]} {day.year}</time></li>"
+            for url, t in zip(urls[page * LENTA_PAGE:(page + 1) * LENTA_PAGE],
+                              times[page * LENTA_PAGE:(page + 1) * LENTA_PAGE])
+        )
+        store.put("lenta", f"{day_path}/page/{page + 1}/",
+                  Fixture(200, HTML_UTF8, _html(f"<ul>{items}</ul>").encode()))
+    for url in urls:
+        body = _html(f'<div class="topic-body__content">{_paragraphs(rng)}</div>')
+        store.put("lenta", url, Fixture(200, HTML_UTF8, body.encode()))
+
+
+def generate(store: FixtureStore, day: Optional[str | date] = None, articles: int = 300,
+             seed: int = 0):
+    if day is None:
+        day = date.today()
+    elif isinstance(day, str):
+        day = datetime.strptime(day, "%Y-%m-%d").date()
+    rng = np.random.default_rng(seed)
+    generate_interfax(store, day, articles, rng)
+    generate_cbr(store, day, articles, rng)
+    generate_lenta(store, day, articles, rng)
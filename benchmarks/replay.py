@@ -0,0 +1,229 @@
+"""
+Локальный replay-сервер для парсеров: отдаёт записанные ответы interfax.ru, cbr.ru и
+lenta.ru с искусственной задержкой и ошибками.
+
+    python -m benchmarks.replay generate --fixtures data/replay --articles 300
+    python -m benchmarks.replay record --fixtures data/replay --port 8800
+    python -m benchmarks.replay serve --fixtures data/replay --port 8800 --latency-ms 50 --error-rate 0.02
+
+Сайты живут под префиксами: http://127.0.0.1:8800/interfax, /cbr, /lenta — это base_url для
+InterfaxParser / SBRParser / LentaParser. generate пишет синтетические страницы
+(benchmarks.fixtures), record работает как прокси к живым сайтам и сохраняет всё, чего ещё
+нет в фикстурах. GET /_replay/stats — счётчики: запросы по статусам, пик одновременных.
+
+Задержка и ошибки детерминированы: решение для запроса зависит от seed, ключа запроса и
+номера обращения к этому ключу, а не от порядка, в котором их обработал event loop.
+"""
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+
+import aiohttp
+from aiohttp import web
+
+SITES = {
+    "interfax": "https://www.interfax.ru",
+    "cbr": "https://www.cbr.ru",
+    "lenta": "https://lenta.ru",
+}
+INDEX = "index.json"
+EXTENSIONS = {"application/json": ".json", "text/html": ".html"}
+# заголовки клиента, которые не пробрасываются на живой сайт при записи
+HOP_HEADERS = {"host", "accept-encoding", "connection", "content-length"}
+
+
+def request_key(path: str, query) -> str:
+    """Путь плюс отсортированный query: порядок параметров у клиента не важен."""
+    items = sorted(query.items())
+    return path + ("?" + urlencode(items) if items else "")
+
+
+@dataclass
+class Fixture:
+    status: int
+    content_type: str
+    body: bytes
+
+
+class FixtureStore:
+    """
+    Фикстуры на диске: <root>/<site>/index.json (ключ -> файл, статус, Content-Type)
+    и файлы тел. Все тела читаются в память при открытии — сервер не должен быть узким местом.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._index: dict[str, dict[str, dict]] = defaultdict(dict)
+        self._bodies: dict[tuple[str, str], bytes] = {}
+        for site in SITES:
+            index_path = self.root / site / INDEX
+            if not index_path.exists():
+                continue
+            self._index[site] = json.loads(index_path.read_text(encoding="utf-8"))
+            for key, meta in self._index[site].items():
+                self._bodies[site, key] = (self.root / site / meta["file"]).read_bytes()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def get(self, site: str, key: str) -> Optional[Fixture]:
+        meta = self._index[site].get(key)
+        if meta is None:
+            return None
+        return Fixture(meta["status"], meta["content_type"], self._bodies[site, key])
+
+    def put(self, site: str, key: str, fixture: Fixture):
+        index = self._index[site]
+        meta = index.get(key)
+        if meta is None:
+            ext = EXTENSIONS.get(fixture.content_type.split(";")[0].strip(), ".bin")
+            meta = index[key] = {"file": f"{len(index):06d}{ext}"}
+        meta.update(status=fixture.status, content_type=fixture.content_type)
+        self._bodies[site, key] = fixture.body
+        (self.root / site).mkdir(parents=True, exist_ok=True)
+        (self.root / site / meta["file"]).write_bytes(fixture.body)
+
+    def save(self):
+        for site, index in self._index.items():
+            (self.root / site).mkdir(parents=True, exist_ok=True)
+            (self.root / site / INDEX).write_text(
+                json.dumps(index, ensure_ascii=False, indent=1), encoding="utf-8",
+            )
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+    error_status: int = 503
+    seed: int = 0
+
+
+class ReplayServer:
+    def __init__(self, store: FixtureStore, faults: Faults = Faults(), record: bool = False):
+        self.store = store
+        self.faults = faults
+        self.record = record
+        self.stats: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._attempts: Counter = Counter()
+        self._upstream: Optional[aiohttp.ClientSession] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_replay/stats", self.handle_stats)
+        app.router.add_get("/{site}/{tail:.*}", self.handle)
+        app.on_cleanup.append(self._close)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+        """Запуск внутри текущего event loop; возвращает runner и корень сервера."""
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://{host}:{port}"
+
+    def reset_stats(self):
+        self.stats.clear()
+        self._attempts.clear()
+        self.peak_in_flight = self.in_flight
+
+    def snapshot(self) -> dict:
+        return {"requests": sum(self.stats.values()), "peak_in_flight": self.peak_in_flight,
+                **{str(k): v for k, v in sorted(self.stats.items(), key=str)}}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.snapshot())
+
+    async def handle(self, request: web.Request) -> web.Response:
+        site = request.match_info["site"]
+        if site not in SITES:
+            raise web.HTTPNotFound()
+        key = request_key("/" + request.match_info["tail"], request.query)
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            self._attempts[site, key] += 1
+            rng = random.Random(f"{self.faults.seed}:{site}:{key}:{self._attempts[site, key]}")
+            delay = self.faults.latency_ms + rng.uniform(0, self.faults.jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            if rng.random() < self.faults.error_rate:
+                self.stats["injected"] += 1
+                return web.Response(status=self.faults.error_status)
+
+            fixture = self.store.get(site, key)
+            if fixture is None and self.record:
+                fixture = await self._fetch_upstream(site, key, request)
+            if fixture is None:
+                self.stats["missing"] += 1
+                return web.Response(status=404)
+            self.stats[fixture.status] += 1
+            return web.Response(status=fixture.status, body=fixture.body,
+                                headers={"Content-Type": fixture.content_type})
+        finally:
+            self.in_flight -= 1
+
+    async def _fetch_upstream(self, site: str, key: str, request: web.Request) -> Fixture:
+        if self._upstream is None:
+            self._upstream = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        async with self._upstream.get(SITES[site] + key, headers=headers,
+                                      allow_redirects=False) as resp:
+            fixture = Fixture(resp.status, resp.headers.get("Content-Type", "text/html"),
+                              await resp.read())
+        self.store.put(site, key, fixture)
+        self.stats["recorded"] += 1
+        print(f"[record] {site}{key} -> {fixture.status}")
+        return fixture
+
+    async def _close(self, app: web.Application):
+        if self._upstream is not None:
+            await self._upstream.close()
+        if self.record:
+            self.store.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP replay server for parsers")
+    parser.add_argument("command", choices=["serve", "record", "generate"])
+    parser.add_argument("--fixtures", default="data/replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8800, type=int)
+    parser.add_argument("--latency-ms", default=0, type=float)
+    parser.add_argument("--jitter-ms", default=0, type=float)
+    parser.add_argument("--error-rate", default=0, type=float)
+    parser.add_argument("--error-status", default=503, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument("--articles", default=300, type=int, help="generate: articles per site")
+    parser.add_argument("--date", default=None, help="generate: YYYY-MM-DD, default today")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    if args.command == "generate":
+        from benchmarks.fixtures import generate
+        generate(store, args.date, args.articles, seed=args.seed)
+        store.save()
+        print(f"{len(store)} fixtures in {args.fixtures}")
+        return
+
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed)
+    server = ReplayServer(store, faults, record=args.command == "record")
+    print(f"{len(store)} fixtures, sites: "
+          + ", ".join(f"http://{args.host}:{args.port}/{s}" for s in SITES))
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import os
-from dataclasses import fields, is_dataclass
+from dataclasses import MISSING, fields, is_dataclass
 from datetime import time, date, datetime
 from typing import Any, get_origin
 
@@ -46,6 +46,8 @@ def create_empty_config(cls):
     for field in fields(cls):
         if is_dataclass(field.type):
             value = create_empty_config(field.type)
+        elif field.default is not MISSING:
+            value = field.default
         elif field.type in (int, str, float, bool, time, list, dict):
             value = None
         elif get_origin(field.type) is list:
@@ -60,6 +62,7 @@ def fill_from_env(obj: Any, prefix: str = ""):
     """
     Рекурсивно заполняет поля объекта из переменных окружения.
     Имя переменной: {prefix}__{field_name} в верхнем регистре.
+    Поля со значением по умолчанию можно не задавать в окружении.
     """
     if not is_dataclass(obj) or isinstance(obj, type):
         return
@@ -72,7 +75,13 @@ def fill_from_env(obj: Any, prefix: str = ""):
         if is_dataclass(value) and not isinstance(value, type):
             fill_from_env(value, env_key)
         else:
-            setattr(obj, field.name, parse_value(getenv(env_key), field.type))
+            try:
+                raw_value = getenv(env_key)
+            except ImproperlyConfigured:
+                if field.default is MISSING:
+                    raise
+                continue
+            setattr(obj, field.name, parse_value(raw_value, field.type))
 
 
 def parse_value(value: str, target_type: type) -> Any:
@@ -13,6 +13,12 @@ class PostgresDB:
     port: int
     table: str
     do_backup: bool
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_pre_ping: bool = True
+    pool_recycle: int = 30 * 60
+    # размер LRU prepared statements на соединение (asyncpg-диалект SQLAlchemy)
+    statement_cache_size: int = 500
 
     @property
     def alchemy_url(self) -> str:
@@ -24,6 +30,86 @@ class PostgresDB:
         return f"postgresql://{self.username}:{self.password}@{self.host}:{self.port}/{self.table}"
 
 
+@dataclass
+class EmbeddingStore:
+    path: str = "data/embeddings"
+
+
+@dataclass
+class Cache:
+    # "memory" — в процессе, "sqlite" — общий для worker-процессов на одной машине
+    backend: str = "memory"
+    path: str = "data/response_cache.sqlite"
+    ttl: int = 30
+    maxsize: int = 1024
+
+
+@dataclass
+class Metrics:
+    # порт экспортера метрик процесса парсеров; 0 — не поднимать
+    port: int = 9108
+
+
+@dataclass
+class Tracing:
+    # трассировка SQL по HTTP-запросам и циклам ingest (src/core/tracing.py)
+    enabled: bool = False
+    # столько одинаковых по форме запросов за запрос/цикл — предупреждение о N+1
+    n_plus_one: int = 10
+    slow_ms: int = 100
+    top: int = 5
+
+
+@dataclass
+class Profiling:
+    # профилирование по запросу (src/core/profiling.py), результаты — файлы в dir
+    dir: str = "data/profiles"
+    # профилировать столько ближайших циклов ingest после старта процесса
+    cycles: int = 0
+    # доля профилируемых HTTP-запросов API, 0 — только по trigger-файлу
+    sample_rate: float = 0.0
+    # файл с числом N: профилировать следующие N циклов / запросов, файл удаляется
+    trigger: str = "data/profiles/TRIGGER"
+    # цикл дольше этого (секунды) — профилируется следующий; 0 — выключено
+    slow_cycle_s: int = 300
+    # рост RSS с прошлого цикла больше этого (МБ) — профилируется следующий; 0 — выключено
+    rss_growth_mb: int = 256
+    tracemalloc: bool = True
+    lag_interval_ms: int = 50
+    top: int = 25
+
+
+@dataclass
+class Crawl:
+    # "local" — парсеры обходят сайты внутри цикла parsers/__main__;
+    # "queue" — обходят parsers.crawl_worker через crawl_tasks, цикл только анализирует
+    mode: str = "local"
+    batch: int = 10
+    lease_s: int = 300
+    max_attempts: int = 5
+    # пауза перед повтором: backoff_s * 2^(попытка-1)
+    backoff_s: int = 30
+    # как часто перечитывать списки текущего дня
+    refresh_s: int = 300
+    poll_s: int = 5
+    retention_days: int = 7
+
+
+@dataclass
+class Analysis:
+    # "cycle" — анализ внутри цикла parsers/__main__; "workers" — parsers.analysis_worker
+    # по NOTIFY о вставке в source_news
+    mode: str = "cycle"
+    batch: int = 20
+    # запасной опрос на случай потерянного NOTIFY (переподключение LISTEN)
+    poll_s: int = 30
+    # полный пересчёт затухания hotness: каждый воркер не чаще раза в scoring_s,
+    # одновременно — только один (advisory lock)
+    scoring_s: int = 60
+    # сколько раз новость может уронить пачку, прежде чем её отложат
+    max_attempts: int = 3
+
+
 # @dataclass
 # class Bot:
 #     token: str
@@ -37,6 +123,13 @@ class PostgresDB:
 @dataclass
 class Config:
     db: PostgresDB
+    store: EmbeddingStore
+    cache: Cache
+    metrics: Metrics
+    tracing: Tracing
+    profiling: Profiling
+    crawl: Crawl
+    analysis: Analysis
     # services: Services
 
 
@@ -1,5 +1,7 @@
 import asyncio
 import time
+from collections import defaultdict
+from datetime import datetime, timedelta
 from itertools import chain
 
 import hdbscan
@@ -7,16 +9,31 @@ import numpy as np
 import pandas as pd
 from sklearn.metrics.pairwise import cosine_distances
 from sklearn.preprocessing import normalize
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import selectinload
 
 from config.config import load_config
 from parsers.cbr_sync import SBRParser
 from parsers.interfax_async import InterfaxParser
-from src.models import SourceNews
-from src.repo import DB
-
-
-async def get_all_last_news(db_url: str) -> list[SourceNews]:
+from parsers.scoring import HotnessScorer
+from parsers.tickers import TickerExtractor
+from parsers.utils import BaseParser, EMBEDDING_MODEL_VERSION
+from src.core import metrics
+from src.core.engine import configure_engines, get_engine, get_session_maker, pool_stats
+from src.core.notify import FEED_CHANGED, NEWS_CHANGED, NEWS_ORIGINAL, NEWS_STORYLINE, \
+    TICKER_HOTNESS, notify, notify_json
+from src.core.profiling import configure_profiling, profile, watch_cycle
+from src.core.tracing import configure_tracing, trace
+from src.models import News, SourceNews
+from src.models.partitions import ensure_partitions
+from src.repo import DB, UnitOfWork
+from src.store import EmbeddingStore, EmbeddingWindow, sync_store
+
+# CRAWL__MODE=queue: сколько сохранённых воркерами новостей анализировать за цикл
+UNPROCESSED_LIMIT = 500
+
+
+def build_parsers(db_url: str) -> list[BaseParser]:
+    """Парсеры создаются один раз на процесс и переиспользуются между циклами."""
     sbr = SBRParser(
         source_title="www.cbr.ru",
         dump_to_type="db",
@@ -29,29 +46,58 @@ async def get_all_last_news(db_url: str) -> list[SourceNews]:
         dump_pointer=db_url
     )
 
-    results = await asyncio.gather(
-        # sbr.run(),
-        interfax.run()
-    )
+    return [
+        # sbr,
+        interfax,
+    ]
+
+
+async def get_all_last_news(parsers: list[BaseParser]) -> list[SourceNews]:
+    results = await asyncio.gather(*(p.run() for p in parsers))
     print(results)
     return list(chain.from_iterable(results))
 
 
-async def get_duplicate_count(news: SourceNews, prevs: list[SourceNews]) -> int:
+async def get_queued_news(session_maker) -> list[SourceNews]:
+    """
+    CRAWL__MODE=queue: новости уже сохранили parsers.crawl_worker, цикл берёт ещё не
+    проанализированные. Текст нужен для тикеров, поэтому грузится явно.
+    """
+    since = datetime.utcnow() + timedelta(hours=3) - timedelta(days=2)
+    async with session_maker() as session:
+        return list(await DB(session).source_news.get_unprocessed(
+            since, UNPROCESSED_LIMIT, options=[selectinload(SourceNews.body)],
+        ))
+
+
+async def get_duplicate_count(news: SourceNews, prevs: list[SourceNews] | np.ndarray) -> int:
     """
     Определяет, является ли news новой или дубликатом среди prevs.
-    Все объекты уже содержат поле .embedding (numpy-массив или list).
+    prevs — объекты с полем .embedding (numpy-массив или list)
+    либо сразу матрица эмбеддингов (например, окно EmbeddingStore).
     Возвращает количество дубликатов (0 — если новая).
     """
-    if not prevs:
-        return 0
+    return len(await get_duplicates(news, prevs))
+
+
+async def get_duplicates(news: SourceNews, prevs: list[SourceNews] | np.ndarray) -> np.ndarray:
+    """
+    Как get_duplicate_count, но возвращает индексы дубликатов — новостей из того же
+    кластера HDBSCAN: строк матрицы prevs (для списка — среди новостей с эмбеддингом).
+    """
+    none = np.empty(0, dtype=np.int64)
+    if len(prevs) == 0:
+        return none
 
     # Преобразуем эмбеддинги в numpy
-    prev_embs = [np.array(p.embedding) for p in prevs if p.embedding is not None]
+    if isinstance(prevs, np.ndarray):
+        prev_embs = prevs
+    else:
+        prev_embs = [np.array(p.embedding) for p in prevs if p.embedding is not None]
     news_emb = np.array(news.embedding)
 
     if len(prev_embs) == 0:
-        return 0
+        return none
 
     # Собираем все эмбеддинги вместе
     all_embs = np.vstack([prev_embs, news_emb[None, :]])
@@ -69,50 +115,51 @@ async def get_duplicate_count(news: SourceNews, prevs: list[SourceNews]) -> int:
 
     # Если выброс (новая новость)
     if news_label == -1:
-        return 0
+        return none
 
-    # Считаем количество прошлых новостей в том же кластере
-    duplicate_count = int(np.sum(labels[:-1] == news_label))
-    return duplicate_count
+    # Прошлые новости в том же кластере
+    return np.flatnonzero(labels[:-1] == news_label)
 
 
-async def get_line(target_news: SourceNews, news: list[SourceNews]) -> list[SourceNews] | None:
+async def get_line(target_news: SourceNews, news: EmbeddingWindow) -> list[int] | None:
     """
     Находит сюжетную линию, связанную с target_news.
     1. Внутри каждого источника строятся кластеры новостей за последние 7 дней.
     2. Кластеры усредняются и между источниками ищутся связи (глобальные мета-кластеры).
-    3. Возвращает цепочку новостей (самые ранние упоминания) или None.
+    3. Возвращает id новостей цепочки (по времени, самые ранние упоминания первыми) или None.
+    news — окно эмбеддингов (EmbeddingStore.window или EmbeddingWindow.from_news).
     """
 
-    if not news:
+    if not len(news):
         return None
 
     # ------------------------------
     # 1. Фильтрация новостей по времени
     # ------------------------------
     target_time = pd.to_datetime(target_news.dttm)
-    news_7d = [
-        n for n in news
-        if n.dttm >= target_time - pd.Timedelta(days=7) and n.dttm <= target_time
-    ]
+    news_7d = news.slice(
+        target_time - pd.Timedelta(days=7),
+        target_time + pd.Timedelta(microseconds=1),
+    ).exclude([target_news.id])
 
-    if not news_7d:
+    if not len(news_7d):
         print("no 7d news")
         return None
 
     # ------------------------------
     # 2. Формируем DataFrame
     # ------------------------------
-    df = pd.DataFrame([{
-        'id': n.id,
-        'source_title': n.source_title,
-        'dttm': pd.to_datetime(n.dttm),
-        'embedding': np.array(n.embedding),
-        'is_target': n.id == target_news.id
-    } for n in news_7d + [target_news]])
-
-    df = df.reset_index(drop=True)
-    embeddings = np.vstack(df['embedding'].to_numpy())
+    df = pd.DataFrame({
+        'id': np.append(news_7d.ids, target_news.id),
+        'source_title': np.append(news_7d.source_titles, target_news.source_title),
+        'dttm': np.append(news_7d.dttm, np.datetime64(target_news.dttm, 'us')),
+    })
+    df['is_target'] = df['id'] == target_news.id
+
+    embeddings = np.vstack([
+        news_7d.embeddings,
+        np.asarray(target_news.embedding, dtype=np.float32)[None, :],
+    ])
     embeddings_norm = normalize(embeddings)
 
     # ------------------------------
@@ -169,7 +216,8 @@ async def get_line(target_news: SourceNews, news: list[SourceNews]) -> list[Sour
     # ------------------------------
     # 6. Кластеризация между источниками
     # ------------------------------
-    dist_matrix = cosine_distances(cluster_embs)
+    # окно EmbeddingStore хранит float32, а precomputed-HDBSCAN принимает только float64
+    dist_matrix = cosine_distances(cluster_embs).astype(np.float64)
     clusterer_global = hdbscan.HDBSCAN(
         metric='precomputed',
         min_cluster_size=2,
@@ -198,73 +246,211 @@ async def get_line(target_news: SourceNews, news: list[SourceNews]) -> list[Sour
         .to_dict('records')
     )
 
-    # Восстанавливаем оригинальные объекты
-    id_to_news = {n.id: n for n in news_7d + [target_news]}
-    chain = [id_to_news[r['id']] for r in storyline if r['id'] in id_to_news]
-    if chain is None:
-        print("chain is None")
+    chain = [int(r['id']) for r in storyline]
     return chain if chain else None
 
 
 async def process_model(
+        db: DB,
+        extractor: TickerExtractor,
+        news: News,
         target_news: SourceNews,
         line: list[SourceNews],
         duplicate_count: int,
-) -> {}:
-    ...
+) -> dict:
+    """
+    Упоминания тикеров в тексте оригинала -> NewsTickerValue.
+    hotness здесь начальная (0), её в том же цикле выставляет HotnessScorer.
+    """
+    mentions = extractor.extract(target_news.content)
+    await db.news_ticker_values.upsert_mentions(news.id, mentions)
     return {
         "tickers": {
-            "ticker_name": {
-                "hotness": float,
-                "sector": str,
-                "shap": dict,
-            }
+            extractor.symbols[ticker_id]: {"mentions": count}
+            for ticker_id, count in mentions.items()
         },
-        "target_news_id": int,
-        "description": str,
+        "target_news_id": news.id,
+        "description": "",
     }
 
 
-async def main():
-    config = load_config()
-    engine = create_async_engine(config.db.alchemy_url, future=True)
-    session_maker = async_sessionmaker(bind=engine, class_=AsyncSession,
-                                       expire_on_commit=False)
-
-    while True:
-        news = await get_all_last_news(config.db.alchemy_url)
-        print(news)
-        originals = []
-        for n in sorted(news, key=lambda x: x.dttm, reverse=True):
-
-            async with session_maker() as session:
-                db = DB(session)
-
-                prev_news = await db.source_news.get_last_for_n_days(2)
-            async with session_maker() as session:
-                db = DB(session)
-                duplicate_count = await get_duplicate_count(n, prev_news)
-                if duplicate_count == 0:
-                    n = await db.source_news.update(n, is_original=True)
-                    originals.append((n, duplicate_count))
-
-        if not originals:
-            print("no originals")
+async def mark_originals(db: DB, news: list[SourceNews],
+                         window: EmbeddingWindow) -> list[tuple[SourceNews, int]]:
+    """
+    Дедупликация против окна за 2 дня: is_original копится через stage_update
+    (один bulk UPDATE на выходе из UnitOfWork), по оригиналам — NEWS_ORIGINAL.
+    is_original виден в /news, поэтому в той же транзакции — FEED_CHANGED.
+    Возвращает пары (оригинал, число его дубликатов в этой пачке) — см. count_duplicates.
+    """
+    if news:
+        await notify(db.session, FEED_CHANGED)
+    originals, clusters = [], {}
+    for n in sorted(news, key=lambda x: x.dttm, reverse=True):
+        prevs = window.exclude([n.id])
+        with metrics.STAGE_SECONDS.labels("dedup").time():
+            duplicates = prevs.ids[await get_duplicates(n, prevs.embeddings)]
+        db.source_news.stage_update(n.id, is_original=len(duplicates) == 0)
+        if len(duplicates):
+            clusters[n.id] = duplicates
             continue
-        print(originals)
-        print(21312313)
-        prev_10_days = await db.source_news.get_last_for_n_days(10)
-        for o, dup_cnt in originals:
-            line = await get_line(o, prev_10_days)
-            if line is not None:
-                print('===start line')
-                for l in line:
-                    print(l.content)
-                print('===end line')
+        n.is_original = True
+        originals.append((n, 0))
+        await notify_json(db.session, NEWS_ORIGINAL, {
+            "id": n.id, "dttm": n.dttm, "url": n.url, "source_title": n.source_title,
+        })
+    return await count_duplicates(db, originals, clusters, window)
 
-            res = await process_model(o, line, dup_cnt)
+
+async def count_duplicates(db: DB, originals: list[tuple[SourceNews, int]],
+                           clusters: dict[int, np.ndarray],
+                           window: EmbeddingWindow) -> list[tuple[SourceNews, int]]:
+    """
+    Каждый дубликат (clusters: id -> id новостей его кластера) засчитывается самому
+    раннему оригиналу кластера. Оригиналу этой пачки — в возвращаемой паре (News с этим
+    duplicate_count создаст analyze_originals), уже существующему — stage_update его
+    News.duplicate_count. Эти News блокируются до commit: инкременты параллельных
+    воркеров не теряются. Новую hotness таких News посчитает следующий полный пересчёт.
+    """
+    if not clusters:
+        return originals
+    in_batch = {o.id for o, _ in originals}
+    mates = np.unique(np.concatenate(list(clusters.values())))
+    existing = {n.news_id: n for n in await db.news.lock_by_source_news(mates.tolist())}
+    known = np.isin(window.ids, mates)
+    dttm = dict(zip(window.ids[known].tolist(), window.dttm[known]))
+
+    counts = defaultdict(int)
+    for duplicates in clusters.values():
+        candidates = [i for i in duplicates.tolist() if i in in_batch or i in existing]
+        if candidates:
+            counts[min(candidates, key=lambda i: (dttm[i], i))] += 1
+
+    for source_news_id, n in counts.items():
+        if source_news_id in existing:
+            news = existing[source_news_id]
+            db.news.stage_update(news.id, duplicate_count=(news.duplicate_count or 0) + n)
+    return [(o, dup_cnt + counts.get(o.id, 0)) for o, dup_cnt in originals]
+
+
+async def analyze_originals(db: DB, extractor: TickerExtractor,
+                            originals: list[tuple[SourceNews, int]],
+                            window: EmbeddingWindow) -> list[int]:
+    """Сюжетные линии (окно за 10 дней), News и упоминания тикеров; возвращает id News."""
+    await extractor.ensure_loaded(db)
+    news_ids = []
+    tickers = 0
+    for o, dup_cnt in originals:
+        line = None
+        with metrics.STAGE_SECONDS.labels("get_line").time():
+            line_ids = await get_line(o, window)
+        if line_ids is not None:
+            line = await db.source_news.get_many(
+                line_ids, defer=[SourceNews.embedding], options=[],
+            )
+            print('===start line')
+            for l in line:
+                print(l.dttm, l.source_title, l.url)
+            print('===end line')
+
+        news_row = await db.news.create(
+            news_id=o.id,
+            duplicate_count=dup_cnt,
+            timeline_length=len(line) if line else 1,
+            sources_count=len({l.source_title for l in line}) if line else 1,
+        )
+        news_ids.append(news_row.id)
+        if line_ids is not None:
+            await notify_json(db.session, NEWS_STORYLINE, {
+                "news_id": news_row.id, "source_news_id": o.id, "line": line_ids[:100],
+            })
+
+        with metrics.STAGE_SECONDS.labels("tickers").time():
+            res = await process_model(db, extractor, news_row, o, line, dup_cnt)
+        tickers += len(res["tickers"])
+    if news_ids:
+        print(f"[analysis] {len(news_ids)} news, {tickers} ticker mentions")
+    return news_ids
+
+
+async def publish_hotness(db: DB, news_ids: list[int]):
+    """Rollup'ы hotness по изменившимся News и уведомления API (уйдут с commit)."""
+    if not news_ids:
+        return
+    with metrics.DB_WRITE_SECONDS.labels("hotness_rollup").time():
+        await db.hotness.refresh(news_ids)
+    await notify_json(db.session, TICKER_HOTNESS, {"news_ids": news_ids})
+    await notify(db.session, NEWS_CHANGED)
+
+
+async def run_cycle(parsers: list[BaseParser], session_maker, store: EmbeddingStore,
+                    extractor: TickerExtractor, scorer: HotnessScorer, queue: bool = False,
+                    analyze: bool = True):
+    """
+    Один цикл: сбор новостей, дедупликация, сюжетные линии, тикеры и hotness.
+    analyze=False (ANALYSIS__MODE=workers) — только сбор, анализ делают
+    parsers.analysis_worker по NOTIFY о вставке.
+    """
+    # процесс живёт месяцами: секции следующих месяцев должны появиться до первой вставки
+    async with get_engine().begin() as conn:
+        await conn.run_sync(ensure_partitions)
+    with metrics.STAGE_SECONDS.labels("crawl").time():
+        news = await get_queued_news(session_maker) if queue else \
+            await get_all_last_news(parsers)
+    metrics.CYCLE_ITEMS.labels("ingested").set(len(news))
+    print(news)
+    print(f"[db-pool] {pool_stats()}")
+    if not analyze:
+        return
+    with metrics.STAGE_SECONDS.labels("sync_store").time():
+        synced = await sync_store(store, session_maker)
+    print(f"[store] +{synced}, total {len(store)}")
+
+    now = datetime.utcnow() + timedelta(hours=3)
+    # весь анализ цикла — одна транзакция: is_original не коммитится без News и тикеров,
+    # иначе при сбое оригиналы остались бы без News и в get_unprocessed уже не попали бы
+    async with UnitOfWork(session_maker) as db:
+        originals = await mark_originals(db, news, store.window(now - timedelta(days=2)))
+        metrics.CYCLE_ITEMS.labels("originals").set(len(originals))
+        print(originals or "no originals")
+        news_ids = await analyze_originals(db, extractor, originals,
+                                           store.window(now - timedelta(days=10)))
+        # hotness пересчитывается по всему активному окну: её меняет и затухание по времени
+        with metrics.STAGE_SECONDS.labels("scoring").time():
+            news_ids = sorted(set(news_ids) | set(await scorer.run(db, now)))
+        await publish_hotness(db, news_ids)
 
 
+async def main():
+    config = load_config()
+    configure_engines(config.db)
+    configure_tracing(config.tracing)
+    configure_profiling(config.profiling)
+    session_maker = get_session_maker()
+    parsers = build_parsers(config.db.alchemy_url)
+    store = EmbeddingStore(config.store.path, model_version=EMBEDDING_MODEL_VERSION)
+    extractor = TickerExtractor()
+    scorer = HotnessScorer()
+    queue = config.crawl.mode == "queue"
+    analyze = config.analysis.mode != "workers"
+    if queue and not analyze:
+        print("[main] CRAWL__MODE=queue and ANALYSIS__MODE=workers: "
+              "run parsers.crawl_worker and parsers.analysis_worker instead")
+        return
+    metrics.start_exporter(config.metrics.port)
+
+    while True:
+        cycle_started = time.perf_counter()
+        async with profile("ingest_cycle", scope="cycle") as profiled:
+            with trace("ingest_cycle", scope="cycle") as sql:
+                await run_cycle(parsers, session_maker, store, extractor, scorer,
+                                queue=queue, analyze=analyze)
+        cycle_seconds = time.perf_counter() - cycle_started
+        if sql is not None:
+            print(f"[sql] {sql.summary()}")
+        if profiled is not None:
+            print(f"[profile] {profiled}.prof / .json / .tracemalloc")
+        metrics.CYCLE_SECONDS.observe(cycle_seconds)
+        watch_cycle(cycle_seconds, profiled is not None)
         time.sleep(5 * 60)
 
 
@@ -0,0 +1,229 @@
+"""
+Воркер анализа: дедупликация, сюжетные линии, тикеры и hotness по мере вставки новостей.
+
+    ANALYSIS__MODE=workers python -m parsers.analysis_worker --processes 4
+
+Вставка в source_news шлёт NOTIFY source_news_inserted (триггер source_news, см.
+src/models/partitions.py). Воркер просыпается по нему, после переподключения LISTEN
+(Listener) и раз в ANALYSIS__POLL_S на случай потерянного уведомления; догружает
+EmbeddingStore и в одной транзакции забирает пачку неразмеченных новостей через
+SKIP LOCKED, размечает is_original, строит News и упоминания тикеров и коммитит.
+Пока пачки полные, следующая берётся сразу. Затухание hotness всего окна раз в
+ANALYSIS__SCORING_S пересчитывает один из воркеров (advisory lock).
+
+Упавшая пачка разбирается по одной новости: сбой конкретной строки увеличивает её
+analysis_attempts, после ANALYSIS__MAX_ATTEMPTS она откладывается. Сбои соединения и
+deadlock'и строкам не засчитываются — воркер ждёт с нарастающей паузой и пробует снова.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+from multiprocessing.connection import wait
+from typing import Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.orm import selectinload
+
+from config.config import Analysis, load_config
+from parsers.__main__ import analyze_originals, mark_originals, publish_hotness
+from parsers.scoring import HotnessScorer
+from parsers.tickers import TickerExtractor
+from parsers.utils import EMBEDDING_MODEL_VERSION
+from src.core import metrics
+from src.core.engine import configure_engines, dispose_engines, get_engine, get_session_maker
+from src.core.notify import SOURCE_NEWS_INSERTED, Listener
+from src.core.profiling import configure_profiling, profile
+from src.core.tracing import configure_tracing, trace
+from src.migrations import migrate
+from src.models import SourceNews
+from src.repo import UnitOfWork
+from src.store import EmbeddingStore, sync_store
+
+# ключ pg_try_advisory_xact_lock полного пересчёта hotness
+SCORING_LOCK = 5_050_001
+
+
+def moscow_now() -> datetime:
+    return datetime.utcnow() + timedelta(hours=3)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Сбой не из-за данных: соединение, рестарт сервера, deadlock/serialization."""
+    if isinstance(exc, (OSError, asyncio.TimeoutError, InterfaceError, OperationalError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        sqlstate = getattr(exc.orig, "sqlstate", None) or ""
+        return exc.connection_invalidated or sqlstate[:2] in ("08", "40", "57")
+    return False
+
+
+class AnalysisWorker:
+    def __init__(self, session_maker, store: EmbeddingStore, extractor: TickerExtractor,
+                 scorer: HotnessScorer, settings: Analysis, name: str):
+        self.session_maker = session_maker
+        self.store = store
+        self.extractor = extractor
+        self.scorer = scorer
+        self.settings = settings
+        self.name = name
+        self.wake = asyncio.Event()
+        self._scored = 0.0
+        self._claimed: list[int] = []
+
+    async def run_once(self, ids: Optional[Sequence[int]] = None) -> int:
+        """Одна пачка (ids — только эти новости); возвращает число взятых новостей."""
+        self._claimed = []
+        with metrics.STAGE_SECONDS.labels("sync_store").time():
+            await sync_store(self.store, self.session_maker)
+        now = moscow_now()
+        async with UnitOfWork(self.session_maker) as db:
+            news = await db.source_news.claim_unprocessed(
+                now - timedelta(days=2), self.settings.batch, ids=ids,
+                max_attempts=self.settings.max_attempts,
+                options=[selectinload(SourceNews.body)],
+            )
+            if not news:
+                return 0
+            self._claimed = [n.id for n in news]
+            originals = await mark_originals(db, list(news),
+                                             self.store.window(now - timedelta(days=2)))
+            news_ids = await analyze_originals(db, self.extractor, originals,
+                                               self.store.window(now - timedelta(days=10)))
+            with metrics.STAGE_SECONDS.labels("scoring").time():
+                await self.scorer.score_news(db, news_ids, now)
+            await publish_hotness(db, news_ids)
+        metrics.CYCLE_ITEMS.labels("originals").set(len(originals))
+        print(f"[analysis][{self.name}] {len(news)} news, {len(originals)} originals")
+        return len(news)
+
+    async def run_batch(self) -> int:
+        """
+        run_once; если пачка упала не из-за соединения, её новости разбираются по одной,
+        и сбой каждой засчитывается только ей самой (isolate).
+        """
+        try:
+            return await self.run_once()
+        except Exception as exc:
+            claimed = self._claimed
+            if not claimed or is_transient(exc):
+                raise
+            print(f"[analysis][{self.name}] batch of {len(claimed)} failed: {exc!r}")
+            return await self.isolate(claimed)
+
+    async def isolate(self, ids: list[int]) -> int:
+        done = 0
+        for news_id in ids:
+            try:
+                done += await self.run_once([news_id])
+            except Exception as exc:
+                # сбой до выборки (sync_store) или соединения — не вина этой новости
+                if is_transient(exc) or not self._claimed:
+                    raise
+                async with UnitOfWork(self.session_maker) as db:
+                    attempts = await db.source_news.add_analysis_attempt(news_id)
+                state = "set aside" if (attempts or 0) >= self.settings.max_attempts \
+                    else f"attempt {attempts}"
+                print(f"[analysis][{self.name}] source_news {news_id} failed ({state}): "
+                      f"{exc!r}")
+        return done
+
+    async def rescore(self):
+        """Затухание hotness по всему окну; пока пересчитывает другой воркер — пропуск."""
+        if time.monotonic() - self._scored < self.settings.scoring_s:
+            return
+        self._scored = time.monotonic()
+        async with UnitOfWork(self.session_maker) as db:
+            if not await db.session.scalar(select(func.pg_try_advisory_xact_lock(SCORING_LOCK))):
+                return
+            with metrics.STAGE_SECONDS.labels("scoring").time():
+                news_ids = await self.scorer.run(db, moscow_now())
+            await publish_hotness(db, news_ids)
+
+    async def run(self, url: str):
+        # после переподключения LISTEN вставки за время разрыва разбираются сразу
+        listener = Listener(url, {SOURCE_NEWS_INSERTED: lambda _payload: self.wake.set()},
+                            on_reconnect=self.wake.set)
+        await listener.start()
+        failures = 0
+        try:
+            while True:
+                # сброс до выборки: вставка во время пачки разбудит следующую итерацию
+                self.wake.clear()
+                try:
+                    async with profile("analysis_batch", scope="cycle"):
+                        with trace("analysis_batch", scope="cycle"):
+                            claimed = await self.run_batch()
+                    await self.rescore()
+                    failures = 0
+                except Exception as exc:
+                    failures += 1
+                    delay = min(2 ** failures, self.settings.poll_s)
+                    print(f"[analysis][{self.name}] failed ({exc!r}), retry in {delay}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if claimed >= self.settings.batch:
+                    continue
+                try:
+                    await asyncio.wait_for(self.wake.wait(), self.settings.poll_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await listener.stop()
+
+
+async def apply_migrations():
+    configure_engines(load_config().db)
+    try:
+        async with get_engine().begin() as conn:
+            await migrate(conn)
+    finally:
+        await dispose_engines()
+
+
+async def main(index: int):
+    config = load_config()
+    configure_engines(config.db)
+    configure_tracing(config.tracing)
+    configure_profiling(config.profiling)
+    # у каждого процесса свой экспортер: port, port + 1, ...
+    metrics.start_exporter(config.metrics.port + index if config.metrics.port > 0 else 0)
+    store = EmbeddingStore(config.store.path, model_version=EMBEDDING_MODEL_VERSION)
+    worker = AnalysisWorker(get_session_maker(), store, TickerExtractor(), HotnessScorer(),
+                            config.analysis, str(index))
+    print(f"[analysis] worker {index} started")
+    try:
+        await worker.run(config.db.url)
+    finally:
+        await dispose_engines()
+
+
+def run_process(index: int):
+    asyncio.run(main(index))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="source_news analysis worker")
+    parser.add_argument("--processes", default=1, type=int)
+    args = parser.parse_args()
+    # миграции (в том числе триггер NOTIFY) — один раз до старта процессов
+    asyncio.run(apply_migrations())
+    if args.processes == 1:
+        run_process(0)
+    else:
+        processes = {}
+        for i in range(args.processes):
+            processes[i] = multiprocessing.Process(target=run_process, args=(i,))
+            processes[i].start()
+        # упавший процесс (OOM, сбой вне цикла пачек) перезапускается с тем же номером
+        while True:
+            wait([p.sentinel for p in processes.values()])
+            for i, p in list(processes.items()):
+                if p.is_alive():
+                    continue
+                print(f"[analysis] worker {i} exited with {p.exitcode}, restarting")
+                time.sleep(1)
+                processes[i] = multiprocessing.Process(target=run_process, args=(i,))
+                processes[i].start()
@@ -1,11 +1,13 @@
 import asyncio
+from datetime import date
+from typing import Optional
 
 from parsers.utils import BaseParser
 from src.models import SourceNews
 
 
 class SBRParser(BaseParser):
-    BASE_URL = "https://www.cbr.ru/FPEventAndPress/"
+    BASE_URL = "https://www.cbr.ru"
     cookies = {
         '__ddg1_': 'XHymmnxMmKIFAhUsvMUS',
         '__ddg8_': 'NZ51YsIord6h9Agf',
@@ -32,38 +34,42 @@ class SBRParser(BaseParser):
         # 'TE': 'trailers',
     }
 
-    async def collect_data(self, session, used: set[int]) -> list[SourceNews]:
-        queue = set()
-        to_dump = []
-        total_models: list[SourceNews] = []
+    async def discover(self, session, day: date, used: set[int]) -> list[dict]:
+        """
+        Лента ЦБ не разбита по датам: day не используется, обходятся страницы ленты
+        до первой пустой.
+        """
+        items = []
         for i in range(1, 100):
             params = {"page": str(i), "IsEng": "false", "type": "0", "pagesize": "10"}
 
-            data = await self.fetch_json(session, self.BASE_URL, params=params)
+            data = await self.fetch_json(session, f"{self.base_url}/FPEventAndPress/",
+                                         params=params)
+            if not data:
+                break
 
             for d in data:
                 _id = int(d.get("doc_htm"))
                 if _id in used:
                     continue
-                queue.add((_id, d.get("DT"), f"https://www.cbr.ru/press/event/?id={_id}"))
-
-            while queue:
-                _id, dt, url = queue.pop()
+                items.append({"other_id": _id, "published_dttm": d.get("DT"),
+                              "url": f"{self.base_url}/press/event/?id={_id}"})
+        return items
 
-                html = await self.fetch_html(session, url)
-                content = self.normalize_content(html)
+    async def extract(self, session, item: dict) -> Optional[dict]:
+        html = await self.fetch_html(session, item["url"])
+        return {**item, "content": self.normalize_content(html)}
 
-                to_dump.append({
-                    "other_id": _id,
-                    "published_dttm": dt,
-                    "content": content,
-                    "url": url,
-                })
-                if len(to_dump) == 10:
-                    news_models = await self.dump(to_dump)
-                    total_models.extend(news_models)
-                    print(f"[dump][{i}] {to_dump}")
-                    to_dump.clear()
+    async def collect_data(self, session, used: set[int]) -> list[SourceNews]:
+        to_dump = []
+        total_models: list[SourceNews] = []
+        for item in await self.discover(session, date.today(), used):
+            to_dump.append(await self.extract(session, item))
+            if len(to_dump) == 10:
+                news_models = await self.dump(to_dump)
+                total_models.extend(news_models)
+                print(f"[dump] {to_dump}")
+                to_dump.clear()
 
         if to_dump:
             news_models = await self.dump(to_dump)
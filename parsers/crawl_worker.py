@@ -0,0 +1,164 @@
+"""
+Ingest-воркер очереди crawl_tasks: обход, извлечение текста и эмбеддинги без дублей
+между процессами и узлами.
+
+    CRAWL__MODE=queue python -m parsers.crawl_worker --worker-id node1-a
+
+Воркеров может быть сколько угодно. Каждый ставит в очередь listing-задачу текущего дня
+по каждому источнику (повторная постановка ничего не меняет), забирает пачку задач
+через SKIP LOCKED и выполняет: listing -> discover и новые article-задачи, article ->
+extract, dump (эмбеддинг + source_news). Анализ остаётся за parsers/__main__.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import aiohttp
+
+from config.config import Crawl, load_config
+from parsers.__main__ import build_parsers
+from parsers.utils import BaseParser
+from src.core import metrics
+from src.core.engine import configure_engines, dispose_engines, get_engine, get_session_maker
+from src.migrations import migrate
+from src.models import CrawlTask
+from src.repo import DB
+from src.repo.crawl_task import ARTICLE, LISTING
+
+
+def moscow_today() -> date:
+    # dttm источников — московское время без таймзоны, как и везде в проекте
+    return (datetime.utcnow() + timedelta(hours=3)).date()
+
+
+class CrawlWorker:
+    def __init__(self, parsers: list[BaseParser], session_maker, settings: Crawl, owner: str):
+        self.parsers = {p.source_title: p for p in parsers}
+        self.session_maker = session_maker
+        self.settings = settings
+        self.owner = owner
+        self._purged = 0.0
+
+    async def seed_listings(self, db: DB):
+        key = moscow_today().isoformat()
+        for source_title in self.parsers:
+            await db.crawl_tasks.enqueue(source_title, LISTING, [{"key": key}])
+
+    async def _fail(self, db: DB, task: CrawlTask, error: str):
+        print(f"[crawl][{self.owner}] {task.kind} {task.source_title} {task.key}: {error}")
+        # listing не становится failed: seed_listings (ON CONFLICT DO NOTHING) её не оживит,
+        # и обнаружение статей источника встало бы до конца дня. Пауза — не дольше refresh_s
+        listing = task.kind == LISTING
+        await db.crawl_tasks.fail(
+            task.id, self.owner, error[:1000], task.attempts,
+            None if listing else self.settings.max_attempts,
+            timedelta(seconds=self.settings.backoff_s),
+            max_backoff=timedelta(seconds=self.settings.refresh_s) if listing else None,
+        )
+
+    async def handle_listing(self, db: DB, session: aiohttp.ClientSession, task: CrawlTask):
+        parser = self.parsers[task.source_title]
+        day = date.fromisoformat(task.key)
+        used = set(await db.source_news.get_used(task.source_title))
+        items = await parser.discover(session, day, used)
+        added = await db.crawl_tasks.enqueue(task.source_title, ARTICLE, [
+            {"key": str(i["other_id"]), "url": i["url"], "published_dttm": i["published_dttm"]}
+            for i in items
+        ])
+        print(f"[crawl][{self.owner}] {task.source_title} {day}: {len(items)} found, +{added}")
+        if day < moscow_today():
+            # день закончился: список больше не меняется
+            await db.crawl_tasks.complete(task.id, self.owner)
+        else:
+            await db.crawl_tasks.reschedule(task.id, self.owner,
+                                            timedelta(seconds=self.settings.refresh_s))
+
+    async def handle_articles(self, db: DB, session: aiohttp.ClientSession, source_title: str,
+                              tasks: list[CrawlTask]):
+        parser = self.parsers[source_title]
+        items = [{"other_id": int(t.key), "published_dttm": t.published_dttm, "url": t.url}
+                 for t in tasks]
+        results = await asyncio.gather(*(parser.extract(session, i) for i in items),
+                                       return_exceptions=True)
+        done, rows = [], []
+        for task, row in zip(tasks, results):
+            if isinstance(row, BaseException):
+                await self._fail(db, task, repr(row))
+            elif row is None:
+                await self._fail(db, task, "no content")
+            else:
+                done.append(task)
+                rows.append(row)
+        if not rows:
+            return
+        # dump пишет пачку одной транзакцией до complete(); повтор после сбоя между ними
+        # или запоздавший владелец истёкшей аренды упираются в уникальный ключ и ничего не вставят
+        try:
+            await parser.dump(rows)
+        except Exception as exc:
+            for task in done:
+                await self._fail(db, task, repr(exc))
+            return
+        for task in done:
+            await db.crawl_tasks.complete(task.id, self.owner)
+
+    async def run_once(self, session: aiohttp.ClientSession) -> int:
+        """Одна пачка задач; возвращает число взятых задач."""
+        async with self.session_maker() as db_session:
+            db = DB(db_session)
+            await self.seed_listings(db)
+            tasks = await db.crawl_tasks.claim(
+                self.owner, self.settings.batch, timedelta(seconds=self.settings.lease_s),
+                sources=list(self.parsers),
+            )
+            articles = defaultdict(list)
+            for task in tasks:
+                if task.kind == LISTING:
+                    try:
+                        await self.handle_listing(db, session, task)
+                    except Exception as exc:
+                        await self._fail(db, task, repr(exc))
+                else:
+                    articles[task.source_title].append(task)
+            for source_title, source_tasks in articles.items():
+                with metrics.STAGE_SECONDS.labels("crawl_articles").time():
+                    await self.handle_articles(db, session, source_title, source_tasks)
+
+            if time.monotonic() - self._purged > 3600:
+                self._purged = time.monotonic()
+                await db.crawl_tasks.purge(timedelta(days=self.settings.retention_days))
+        return len(tasks)
+
+    async def run(self, concurrency: int):
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            while True:
+                if not await self.run_once(session):
+                    await asyncio.sleep(self.settings.poll_s)
+
+
+async def main(worker_id: str, concurrency: int):
+    config = load_config()
+    configure_engines(config.db)
+    async with get_engine().begin() as conn:
+        await migrate(conn)
+    metrics.start_exporter(config.metrics.port)
+    worker = CrawlWorker(build_parsers(config.db.alchemy_url), get_session_maker(),
+                         config.crawl, worker_id)
+    print(f"[crawl] worker {worker_id}: {', '.join(worker.parsers)}")
+    try:
+        await worker.run(concurrency)
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="crawl_tasks queue worker")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--concurrency", default=5, type=int, help="HTTP connections")
+    args = parser.parse_args()
+    asyncio.run(main(args.worker_id, args.concurrency))
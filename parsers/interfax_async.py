@@ -1,14 +1,15 @@
 import asyncio
 from datetime import datetime, date as datetime_date
-from typing import Set, List, Dict
+from typing import Set, List, Dict, Optional
 
 from bs4 import BeautifulSoup
 
 from parsers.utils import BaseParser
+from src.core import metrics
 
 
 class InterfaxParser(BaseParser):
-    BASE_URL = "https://www.interfax.ru/news/"
+    BASE_URL = "https://www.interfax.ru"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:143.0) Gecko/20100101 Firefox/143.0',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -31,21 +32,18 @@ class InterfaxParser(BaseParser):
         today = datetime_date.today()
         return await self.parse_day(session, today.year, today.month, today.day, used)
 
-    async def parse_day(self, session, year: int, month: int, day: int, used: Set[int]):
+    async def discover(self, session, day: datetime_date, used: Set[int]) -> List[Dict]:
         """
-        Парсим все страницы одного дня, делаем дамп после обработки дня
+        Все страницы списка за день -> [{other_id, published_dttm, url}] без used
         """
-        to_dump: List[Dict] = []
-        total_items = []
-
         queue = set()
-        year_s, month_s, day_s = str(year), str(month), str(day)
+        year_s, month_s, day_s = str(day.year), str(day.month), str(day.day)
 
-        html = await self.fetch_html(session,
-                                     f'{self.BASE_URL}{year_s}/{month_s}/{day_s}/all/page_1')
+        day_url = f'{self.base_url}/news/{year_s}/{month_s}/{day_s}/all'
+        html = await self.fetch_html(session, f'{day_url}/page_1')
         if not html:
-            print(f"[error] cannot fetch page 1 ({year}-{month}-{day})")
-            return
+            print(f"[error] cannot fetch page 1 ({day})")
+            return []
 
         soup = BeautifulSoup(html, "html.parser")
         queue.update(self.extract_news_from_soup(soup, used, year_s, month_s, day_s))
@@ -54,38 +52,46 @@ class InterfaxParser(BaseParser):
         pages_count = len(pages_div.find_all("a")) if pages_div else 1
 
         for i in range(2, pages_count + 1):
-            html = await self.fetch_html(session,
-                                         f'{self.BASE_URL}{year_s}/{month_s}/{day_s}/all/page_{i}')
+            html = await self.fetch_html(session, f'{day_url}/page_{i}')
             if not html:
                 continue
             soup = BeautifulSoup(html, "html.parser")
             queue.update(self.extract_news_from_soup(soup, used, year_s, month_s, day_s))
 
+        return [{"other_id": nid, "published_dttm": dt, "url": url} for nid, dt, url in queue]
+
+    async def extract(self, session, item: Dict) -> Optional[Dict]:
+        url = item["url"]
+        html = await self.fetch_html(session, url)
+        if not html:
+            print(f"[skipped] {url}")
+            return None
+        with metrics.EXTRACT_SECONDS.labels(self.source_title).time():
+            soup = BeautifulSoup(html, "html.parser")
+            news_box = soup.find("article", {"itemprop": "articleBody"})
+            content = None if news_box is None else \
+                " ".join(p.text for p in news_box.find_all("p") if p.text)
+        if content is None:
+            print(f"[skipped] {url}")
+            return None
+        return {**item, "content": content}
+
+    async def parse_day(self, session, year: int, month: int, day: int, used: Set[int]):
+        """
+        Парсим все страницы одного дня, делаем дамп после обработки дня
+        """
+        to_dump: List[Dict] = []
+        total_items = []
+
+        queue = await self.discover(session, datetime_date(year, month, day), used)
         print(f"[date: {year}-{month}-{day}] total: {len(queue)}")
-        total = len(queue)
         sem = asyncio.Semaphore(15)
 
-        async def process(news_id, published_dt, url):
+        async def process(item):
             async with sem:
-                html = await self.fetch_html(session, url)
-                if not html:
-                    print(f"[skipped] {url}")
-                    return None
-                soup = BeautifulSoup(html, "html.parser")
-                news_box = soup.find("article", {"itemprop": "articleBody"})
-                if news_box is None:
-                    print(f"[skipped] {url}")
-                    return None
-                content = " ".join(p.text for p in news_box.find_all("p") if p.text)
-                return {
-                    "other_id": news_id,
-                    "published_dttm": published_dt,
-                    "content": content,
-                    "url": url,
-                }
-
-        tasks = [process(nid, dt, url) for nid, dt, url in queue]
-        results = await asyncio.gather(*tasks)
+                return await self.extract(session, item)
+
+        results = await asyncio.gather(*(process(item) for item in queue))
 
         for item in results:
             if item:
@@ -99,8 +105,7 @@ class InterfaxParser(BaseParser):
             to_dump.clear()
         return total_items
 
-    @staticmethod
-    def extract_news_from_soup(soup, used: Set[int], year_s: str, month_s: str, day_s: str):
+    def extract_news_from_soup(self, soup, used: Set[int], year_s: str, month_s: str, day_s: str):
         """
         Собираем (id, dt, url) из HTML страницы
         """
@@ -116,7 +121,7 @@ class InterfaxParser(BaseParser):
             dt_span = d.find("span")
             dt = datetime.strptime(f"{year_s}-{month_s}-{day_s} {dt_span.text}", "%Y-%m-%d %H:%M") \
                 .strftime("%Y-%m-%dT%H:%M:%S")
-            queue.add((_id, dt, "https://www.interfax.ru" + url))
+            queue.add((_id, dt, self.base_url + url))
         return queue
 
 
@@ -19,9 +19,12 @@ logger = logging.getLogger(name="LentaParser")
 
 class LentaParser:
     default_parser = "html.parser"
+    BASE_URL = "https://lenta.ru"
 
-    def __init__(self, *, max_workers: int, outfile_name: str, from_date: str):
-        self._endpoint = "https://lenta.ru/news"
+    def __init__(self, *, max_workers: int, outfile_name: str, from_date: str,
+                 base_url: str = BASE_URL):
+        self._base_url = base_url.rstrip("/")
+        self._endpoint = f"{self._base_url}/news"
 
         self._sess = None
         self._connector = None
@@ -83,14 +86,14 @@ class LentaParser:
         return text
 
     @staticmethod
-    def _extract_urls_from_html(html: str):
+    def _extract_urls_from_html(html: str, base_url: str = BASE_URL):
         """Возвращает список словарей: [{url, datetime}]"""
         doc_tree = BeautifulSoup(html, LentaParser.default_parser)
         news_list = doc_tree.find_all("li", {"class": "archive-page__item _news"})
 
         results = []
         for news in news_list:
-            url = f"https://lenta.ru{news.find('a')['href']}"
+            url = f"{base_url}{news.find('a')['href']}"
             time_text = news.find("time").text.split(",")[0]
             results.append({"url": url, "datetime": time_text})
         return tuple(results)
@@ -98,7 +101,7 @@ class LentaParser:
     async def _fetch_all_news_on_page(self, html: str):
         loop = asyncio.get_running_loop()
         news_items = await loop.run_in_executor(
-            self._executor, self._extract_urls_from_html, html
+            self._executor, self._extract_urls_from_html, html, self._base_url
         )
 
         tasks = {item["url"]: asyncio.create_task(self.fetch(item["url"])) for item in news_items}
@@ -187,12 +190,19 @@ def main():
         help="download news from this date. Example: 30.08.1999",
     )
 
+    parser.add_argument(
+        "--base-url",
+        default=LentaParser.BASE_URL,
+        help="site root, e.g. a local replay server (benchmarks.replay)",
+    )
+
     args = parser.parse_args()
 
     parser = LentaParser(
         max_workers=args.cpu_workers,
         outfile_name=args.outfile,
         from_date=args.from_date,
+        base_url=args.base_url,
     )
 
     try:
@@ -0,0 +1,119 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+EMBEDDING_DIM = 384
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("other_id", pa.int64()),
+    ("source_title", pa.string()),
+    ("dttm", pa.timestamp("us")),
+    ("url", pa.string()),
+    ("content", pa.string()),
+    ("embedding", pa.list_(pa.float32(), EMBEDDING_DIM)),
+])
+
+
+def write_batch(path: str, rows: List[Dict], embeddings: np.ndarray, *,
+                row_group_size: int = 1024) -> Optional[str]:
+    """
+    Пишет пачку новостей отдельным parquet-файлом в директорию path.
+    rows: словари с ключами из SCHEMA (кроме embedding), embeddings: матрица (len(rows), 384).
+    Строки сортируются по dttm, чтобы статистики row group'ов отсекали лишнее при чтении окна.
+    """
+    if not rows:
+        return None
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if embeddings.shape != (len(rows), EMBEDDING_DIM):
+        raise ValueError(f"embeddings shape {embeddings.shape} != ({len(rows)}, {EMBEDDING_DIM})")
+
+    order = sorted(range(len(rows)), key=lambda i: rows[i]["dttm"])
+    rows = [rows[i] for i in order]
+    embeddings = embeddings[order]
+
+    columns = {name: [r.get(name) for r in rows] for name in SCHEMA.names if name != "embedding"}
+    columns["embedding"] = pa.FixedSizeListArray.from_arrays(
+        pa.array(embeddings.reshape(-1), type=pa.float32()), EMBEDDING_DIM
+    )
+    table = pa.Table.from_pydict(columns, schema=SCHEMA)
+
+    os.makedirs(path, exist_ok=True)
+    name = f"part-{time.time_ns()}-{os.getpid()}"
+    filename = os.path.join(path, f"{name}.parquet")
+    # пишем во временный файл, чтобы читатели никогда не видели недописанный part;
+    # точка в начале имени — _dataset его пропускает (ignore_prefixes)
+    tmp_filename = os.path.join(path, f".{name}.tmp")
+    pq.write_table(table, tmp_filename, row_group_size=row_group_size, compression="zstd")
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def _dataset(path: str) -> ds.Dataset:
+    return ds.dataset(path, format="parquet", schema=SCHEMA,
+                      exclude_invalid_files=True, ignore_prefixes=[".", "_"])
+
+
+def read_window(path: str,
+                start: Optional[datetime] = None,
+                end: Optional[datetime] = None,
+                columns: Optional[Sequence[str]] = None,
+                source_title: Optional[str] = None) -> pa.Table:
+    """Читает новости из [start, end), отсортированные по dttm."""
+    if not os.path.isdir(path):
+        return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+
+    flt = None
+    if start is not None:
+        flt = ds.field("dttm") >= pa.scalar(start, type=pa.timestamp("us"))
+    if end is not None:
+        cond = ds.field("dttm") < pa.scalar(end, type=pa.timestamp("us"))
+        flt = cond if flt is None else flt & cond
+    if source_title is not None:
+        cond = ds.field("source_title") == source_title
+        flt = cond if flt is None else flt & cond
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys([*columns, "dttm"]))
+
+    table = _dataset(path).to_table(columns=read_columns, filter=flt)
+    table = table.sort_by("dttm")
+    if columns is not None:
+        table = table.select(list(columns))
+    return table
+
+
+def embedding_matrix(table: pa.Table) -> np.ndarray:
+    """
+    Отдаёт колонку embedding как матрицу (n, 384) без копирования данных.
+    Копия делается только если таблица состоит из нескольких chunk'ов.
+    """
+    column = table.column("embedding")
+    if column.num_chunks == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    return array.flatten().to_numpy(zero_copy_only=True).reshape(-1, EMBEDDING_DIM)
+
+
+def load_embeddings(path: str,
+                    start: Optional[datetime] = None,
+                    end: Optional[datetime] = None,
+                    source_title: Optional[str] = None) -> tuple[pa.Table, np.ndarray]:
+    """Метаданные окна [start, end) и соответствующая им матрица эмбеддингов."""
+    table = read_window(path, start, end,
+                        columns=["id", "other_id", "source_title", "dttm", "url", "embedding"],
+                        source_title=source_title)
+    return table.drop_columns(["embedding"]), embedding_matrix(table)
+
+
+def get_used_ids(path: str, source_title: str) -> set[int]:
+    table = read_window(path, columns=["other_id"], source_title=source_title)
+    return set(table.column("other_id").to_pylist())
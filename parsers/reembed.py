@@ -0,0 +1,170 @@
+"""
+Пересчёт SourceNews.embedding после смены модели или правил clean_news_content.
+
+    python -m parsers.reembed --workers 4 --batch-size 256
+
+Строки читаются keyset-пагинацией по id, эмбеддинги считаются в пуле процессов,
+результат пишется bulk UPDATE'ом вместе с embedding_model. После каждой записанной
+пачки обновляется checkpoint, так что прерванный запуск продолжается с того же места.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config.config import load_config
+from parsers.utils import EMBEDDING_MODEL_VERSION, generate_news_embeddings, get_model
+from src.core.engine import configure_engines, dispose_engines, get_engine, \
+    get_session_maker
+from src.migrations import migrate
+from src.repo import DB
+from src.store import EmbeddingStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s @ %(message)s",
+    datefmt="%d-%m-%Y %H:%M:%S",
+)
+logger = logging.getLogger(name="Reembed")
+
+
+def _init_worker():
+    get_model()
+
+
+def _embed(contents: list[str], source_titles: list[str]) -> np.ndarray:
+    """Выполняется в процессе пула: эмбеддинги пачки, сгруппированной по источникам."""
+    result = np.empty((len(contents), 384), dtype=np.float32)
+    groups: dict[str, list[int]] = {}
+    for i, source_title in enumerate(source_titles):
+        groups.setdefault(source_title, []).append(i)
+    for source_title, idxs in groups.items():
+        result[idxs] = generate_news_embeddings([contents[i] or "" for i in idxs], source_title)
+    return result
+
+
+def read_checkpoint(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0
+    if checkpoint.get("model_version") != EMBEDDING_MODEL_VERSION:
+        logger.info(f"Checkpoint {path} belongs to another model version, starting over")
+        return 0
+    return checkpoint["last_id"]
+
+
+def write_checkpoint(path: str, last_id: int):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model_version": EMBEDDING_MODEL_VERSION, "last_id": last_id}, f)
+    os.replace(tmp, path)
+
+
+class Reembedder:
+    def __init__(self, *, db_url: str, workers: int, batch_size: int, checkpoint: str):
+        self.engine = get_engine(db_url)
+        self.session_maker = get_session_maker(db_url)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self.n_done = 0
+
+    async def _read_batch(self, after_id: int):
+        async with self.session_maker() as session:
+            return await DB(session).source_news.get_stale_embeddings(
+                EMBEDDING_MODEL_VERSION, after_id, self.batch_size,
+            )
+
+    async def _write_batch(self, rows, embeddings: np.ndarray):
+        values = [(r.id, {
+            "embedding": embeddings[i],
+            "embedding_model": EMBEDDING_MODEL_VERSION,
+        }) for i, r in enumerate(rows)]
+        async with self.session_maker() as session:
+            await DB(session).source_news.update_many(values)
+
+    async def run(self):
+        async with self.engine.begin() as conn:
+            await migrate(conn)
+
+        loop = asyncio.get_running_loop()
+        last_id = read_checkpoint(self.checkpoint)
+        logger.info(f"Re-embedding with {EMBEDDING_MODEL_VERSION}, starting after id {last_id}")
+
+        # держим в пуле до workers пачек, пока читаем следующие
+        in_flight: list[tuple[list, asyncio.Future]] = []
+        read_after = last_id
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < self.workers:
+                rows = await self._read_batch(read_after)
+                if not rows:
+                    exhausted = True
+                    break
+                read_after = rows[-1].id
+                future = loop.run_in_executor(
+                    self._executor, _embed,
+                    [r.content for r in rows], [r.source_title for r in rows],
+                )
+                in_flight.append((rows, future))
+
+            if not in_flight:
+                break
+
+            # пачки пишутся строго по порядку id, иначе checkpoint мог бы перепрыгнуть дыру
+            rows, future = in_flight.pop(0)
+            embeddings = await future
+            await self._write_batch(rows, embeddings)
+            write_checkpoint(self.checkpoint, rows[-1].id)
+            self.n_done += len(rows)
+            logger.info(f"{self.n_done} rows re-embedded, last id {rows[-1].id}")
+
+    async def shutdown(self):
+        self._executor.shutdown(wait=True)
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embeds SourceNews with the current model")
+    parser.add_argument("--workers", default=max(1, multiprocessing.cpu_count() // 2), type=int,
+                        help="number of embedding processes")
+    parser.add_argument("--batch-size", default=256, type=int, help="rows per batch")
+    parser.add_argument("--checkpoint", default="reembed.checkpoint.json",
+                        help="checkpoint file for restarts")
+    args = parser.parse_args()
+
+    config = load_config()
+    configure_engines(config.db)
+    reembedder = Reembedder(
+        db_url=config.db.alchemy_url,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+    )
+
+    async def _run():
+        try:
+            await reembedder.run()
+        finally:
+            await reembedder.shutdown()
+
+    asyncio.run(_run())
+    # окна хранилища должны собраться заново уже из пересчитанных векторов
+    EmbeddingStore(config.store.path, model_version=EMBEDDING_MODEL_VERSION).reset()
+    logger.info(f"Done: {reembedder.n_done} rows, embedding store reset")
+
+
+if __name__ == "__main__":
+    main()
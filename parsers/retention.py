@@ -0,0 +1,126 @@
+"""
+Retention для source_news: старые помесячные секции уходят в Parquet-архив и удаляются.
+
+    python -m parsers.retention --keep-months 12 --archive data/archive [--dry-run]
+
+Секция сначала отцепляется (DETACH PARTITION), и только потом выгружается: после этого
+в неё ничего не пишется, а строки её месяца, вставленные позже, попадают в
+source_news_default. Каждая секция пишется в {archive}/source_news_pYYYYMM/ в формате
+parquet_dump, id сохраняются, так что News.news_id продолжает указывать на архивную строку.
+Таблица удаляется только если число записанных строк совпало с её count(*); отцепленные,
+но не удалённые прерванным запуском таблицы дорабатываются следующим.
+default-секция не архивируется и не удаляется никогда — о её строках старше границы
+retention только предупреждение.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+from datetime import date, datetime, time
+
+import numpy as np
+from sqlalchemy import Connection, MetaData, func, select, text
+
+from config.config import load_config
+from parsers.parquet_dump import EMBEDDING_DIM, write_batch
+from src.core.engine import configure_engines, dispose_engines, get_engine, get_session_maker
+from src.models import SourceNews, SourceNewsContent
+from src.models.partitions import DEFAULT_PARTITION, add_months, detach_partition, \
+    drop_detached, list_detached, list_partitions, month_start, partition_name
+
+
+async def archive_partition(session_maker, month, archive: str, batch_size: int) -> int:
+    """Выгружает отцепленную секцию месяца month в parquet; возвращает число записанных строк."""
+    name = partition_name(month)
+    path = os.path.join(archive, name)
+    # частично записанный архив от прерванного запуска переписывается целиком
+    shutil.rmtree(path, ignore_errors=True)
+    # отцепленная секция — обычная таблица с колонками source_news
+    table = SourceNews.__table__.to_metadata(MetaData(), name=name)
+    written = 0
+    async with session_maker() as session:
+        result = await session.stream(
+            select(table.c.id, table.c.other_id, table.c.source_title, table.c.dttm,
+                   table.c.url, table.c.embedding, SourceNewsContent.content)
+            .outerjoin(SourceNewsContent, SourceNewsContent.source_news_id == table.c.id)
+            .order_by(table.c.dttm, table.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for chunk in result.partitions():
+            rows = [{
+                "id": n.id, "other_id": n.other_id, "source_title": n.source_title,
+                "dttm": n.dttm, "url": n.url, "content": n.content,
+            } for n in chunk]
+            # строки без эмбеддинга архивируются с NaN-вектором
+            embeddings = np.full((len(chunk), EMBEDDING_DIM), np.nan, dtype=np.float32)
+            for i, n in enumerate(chunk):
+                if n.embedding is not None:
+                    embeddings[i] = n.embedding
+            write_batch(path, rows, embeddings)
+            written += len(rows)
+
+        expected = await session.scalar(select(func.count()).select_from(table))
+    if written != expected:
+        raise RuntimeError(f"{name}: archived {written} rows, expected {expected}")
+    return written
+
+
+def count_default_before(conn: Connection, cutoff: date) -> int:
+    """Строки default-секции старше cutoff: retention их не трогает."""
+    if conn.scalar(text("SELECT to_regclass(:t)"), {"t": DEFAULT_PARTITION}) is None:
+        return 0
+    return conn.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE dttm < :cutoff"),
+                       {"cutoff": datetime.combine(cutoff, time())})
+
+
+async def run(keep_months: int, archive: str, batch_size: int, dry_run: bool):
+    engine = get_engine()
+    session_maker = get_session_maker()
+    cutoff = add_months(month_start(datetime.utcnow()), -keep_months)
+
+    async with engine.connect() as conn:
+        attached = [m for m in await conn.run_sync(list_partitions) if m < cutoff]
+        detached = await conn.run_sync(list_detached)
+        in_default = await conn.run_sync(count_default_before, cutoff)
+    print(f"[retention] cutoff {cutoff}, partitions to archive: "
+          f"{[partition_name(m) for m in attached]}, "
+          f"left detached by a previous run: {[partition_name(m) for m in detached]}")
+    if in_default:
+        print(f"[retention] {DEFAULT_PARTITION}: {in_default} rows older than {cutoff} "
+              f"are not archived, the default partition is never detached")
+    if dry_run:
+        return
+
+    for month in sorted(set(attached) | set(detached)):
+        if month in attached:
+            async with engine.begin() as conn:
+                await conn.run_sync(detach_partition, month)
+        written = await archive_partition(session_maker, month, archive, batch_size)
+        async with engine.begin() as conn:
+            await conn.run_sync(drop_detached, month)
+        print(f"[retention] {partition_name(month)}: {written} rows archived, partition dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archives and drops old source_news partitions")
+    parser.add_argument("--keep-months", default=12, type=int,
+                        help="months (besides the current one) kept in Postgres")
+    parser.add_argument("--archive", default="data/archive", help="parquet archive directory")
+    parser.add_argument("--batch-size", default=2000, type=int)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    config = load_config()
+    configure_engines(config.db)
+
+    async def _run():
+        try:
+            await run(args.keep_months, args.archive, args.batch_size, args.dry_run)
+        finally:
+            await dispose_engines()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
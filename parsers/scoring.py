@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.repo import DB
+
+
+def hotness_scores(mentions: np.ndarray,
+                   duplicate_count: np.ndarray,
+                   sources_count: np.ndarray,
+                   timeline_length: np.ndarray,
+                   age_seconds: np.ndarray,
+                   half_life_seconds: float) -> np.ndarray:
+    """
+    hotness пары (новость, тикер) для всех пар сразу.
+    Каждый фактор растёт логарифмически, чтобы одна шумная новость не забивала остальные,
+    и всё умножается на экспоненциальное затухание по возрасту новости.
+    """
+    base = (
+        np.log1p(mentions)
+        * (1 + np.log1p(duplicate_count))
+        * (1 + np.log1p(np.maximum(sources_count - 1, 0)))
+        * (1 + 0.5 * np.log1p(np.maximum(timeline_length - 1, 0)))
+    )
+    decay = np.exp2(-np.maximum(age_seconds, 0) / half_life_seconds)
+    return base * decay
+
+
+class HotnessScorer:
+    """
+    Раз в цикл пересчитывает NewsTickerValue.hotness по всему активному окну.
+    Пишутся только строки, где значение заметно изменилось (rtol/atol), одним bulk UPDATE.
+    """
+
+    def __init__(self, *, window: timedelta = timedelta(days=3),
+                 half_life: timedelta = timedelta(hours=12),
+                 rtol: float = 0.05, atol: float = 1e-3):
+        self.window = window
+        self.half_life = half_life
+        self.rtol = rtol
+        self.atol = atol
+
+    async def run(self, db: DB, now: datetime) -> list[int]:
+        """Возвращает id News, у которых поменялась hotness хотя бы одного тикера."""
+        return await self._score(db, now, await db.news_ticker_values.get_active(now - self.window))
+
+    async def score_news(self, db: DB, news_ids: list[int], now: datetime) -> list[int]:
+        """
+        То же только для news_ids — новых News воркера анализа; затухание остального окна
+        пересчитывает периодический run.
+        """
+        if not news_ids:
+            return []
+        return await self._score(db, now, await db.news_ticker_values.get_active(
+            now - self.window, news_ids=news_ids,
+        ))
+
+    async def _score(self, db: DB, now: datetime, rows) -> list[int]:
+        if not rows:
+            return []
+
+        n = len(rows)
+        ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=n)
+        news_ids = np.fromiter((r.news_id for r in rows), dtype=np.int64, count=n)
+        old = np.fromiter((r.hotness for r in rows), dtype=np.float64, count=n)
+        dttm = np.array([r.dttm for r in rows], dtype="datetime64[us]")
+        new = hotness_scores(
+            mentions=np.fromiter((r.mentions for r in rows), dtype=np.float64, count=n),
+            duplicate_count=np.fromiter((r.duplicate_count or 0 for r in rows),
+                                        dtype=np.float64, count=n),
+            sources_count=np.fromiter((r.sources_count or 1 for r in rows),
+                                      dtype=np.float64, count=n),
+            timeline_length=np.fromiter((r.timeline_length or 1 for r in rows),
+                                        dtype=np.float64, count=n),
+            age_seconds=(np.datetime64(now, "us") - dttm) / np.timedelta64(1, "s"),
+            half_life_seconds=self.half_life.total_seconds(),
+        )
+
+        changed = ~np.isclose(new, old, rtol=self.rtol, atol=self.atol)
+        if not changed.any():
+            return []
+        await db.news_ticker_values.update_many(
+            (int(i), {"hotness": float(h)}) for i, h in zip(ids[changed], new[changed])
+        )
+        return np.unique(news_ids[changed]).tolist()
@@ -0,0 +1,144 @@
+import re
+from collections import Counter, deque
+from typing import Iterable, Iterator, Optional
+
+from src.repo import DB
+
+# окончания, которые срезаются с кириллических слов и в названиях тикеров, и в тексте:
+# "Сбербанка", "Сбербанку", "Сбербанк" сводятся к одной основе, одному шаблону автомата
+ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ую", "юю", "ым", "им", "ых", "их",
+    "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ей", "ию", "ия", "ии",
+    "а", "я", "у", "ю", "е", "ы", "и", "о", "ь", "й",
+), key=len, reverse=True)
+MIN_STEM = 3
+
+CYRILLIC_RE = re.compile(r"[а-я]")
+WORD_RE = re.compile(r"\w+")
+SPACE_RE = re.compile(r"\s+")
+
+
+def stem(word: str) -> str:
+    """Грубая основа без словаря; латиница и короткие слова не трогаются."""
+    if len(word) <= MIN_STEM or not CYRILLIC_RE.search(word):
+        return word
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, ё -> е, основы слов, пробельные последовательности -> один пробел."""
+    text = SPACE_RE.sub(" ", text.lower().replace("ё", "е"))
+    return WORD_RE.sub(lambda m: stem(m.group()), text)
+
+
+def name_pattern(name: str) -> str:
+    """Шаблон названия: основы слов через пробел, так же как их выдаст normalize_text."""
+    return " ".join(stem(w) for w in WORD_RE.findall(name.lower().replace("ё", "е")))
+
+
+class Automaton:
+    """Aho-Corasick: все шаблоны ищутся за один проход по тексту."""
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, int]]] = [[]]
+
+    def add(self, pattern: str, value: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state == 0:
+                    continue
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def iter(self, text: str) -> Iterator[tuple[int, int, int]]:
+        """(start, end, value) для каждого вхождения каждого шаблона."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i - length + 1, i + 1, value
+
+
+class TickerExtractor:
+    """
+    Находит упоминания тикеров (symbol и name в любой падежной форме) в тексте новости
+    за один проход автомата по нормализованному тексту.
+    Автомат пересобирается, только когда меняется таблица tickers (см. TickerRepo.fingerprint).
+    """
+
+    def __init__(self):
+        self.fingerprint: Optional[tuple] = None
+        self.symbols: dict[int, str] = {}
+        self._automaton: Optional[Automaton] = None
+
+    async def ensure_loaded(self, db: DB):
+        fingerprint = await db.tickers.fingerprint()
+        if fingerprint == self.fingerprint:
+            return
+        self.build((t.id, t.symbol, t.name) for t in await db.tickers.get_all())
+        self.fingerprint = fingerprint
+
+    def build(self, tickers: Iterable[tuple[int, str, Optional[str]]]):
+        automaton = Automaton()
+        symbols = {}
+        for ticker_id, symbol, name in tickers:
+            symbols[ticker_id] = symbol
+            patterns = {name_pattern(symbol)}
+            if name:
+                patterns.add(name_pattern(name))
+            for pattern in patterns - {""}:
+                automaton.add(pattern, ticker_id)
+        automaton.build()
+        self.symbols = symbols
+        self._automaton = automaton
+
+    def extract(self, text: Optional[str]) -> Counter:
+        """ticker_id -> число упоминаний; пересекающиеся совпадения — leftmost-longest."""
+        if not text or self._automaton is None:
+            return Counter()
+        text = normalize_text(text)
+        n = len(text)
+        matches = [
+            (start, end, ticker_id)
+            for start, end, ticker_id in self._automaton.iter(text)
+            if (start == 0 or not text[start - 1].isalnum())
+            and (end == n or not text[end].isalnum())
+        ]
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+
+        mentions = Counter()
+        covered = 0
+        for start, end, ticker_id in matches:
+            if start < covered:
+                continue
+            mentions[ticker_id] += 1
+            covered = end
+        return mentions
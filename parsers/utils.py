@@ -1,24 +1,32 @@
+import asyncio
 import csv
 import re
+import time
 import urllib.parse
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, List, Set
 
 import aiohttp
+import numpy as np
 import torch
 from bs4 import BeautifulSoup
 from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import normalize
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
+from parsers import parquet_dump
+from src.core import metrics
+from src.core.engine import get_engine, get_session_maker
 from src.models import SourceNews
 from src.repo import DB
 
 labels = ["other_id", "published_dttm", "content", "url"]
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-                            device=device)
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# увеличивать при любом изменении clean_news_content: старые эмбеддинги станут несовместимы
+CLEANING_VERSION = 1
+EMBEDDING_MODEL_VERSION = f"{EMBEDDING_MODEL_NAME}@clean-v{CLEANING_VERSION}"
+_model: Optional[SentenceTransformer] = None
 INTERFAX_RE = re.compile(r"^.*?interfax\.ru\s*[-—–:]*\s*", flags=re.IGNORECASE)
 
 # 2) Приветствия
@@ -45,6 +53,14 @@ EMOJI_RE = re.compile("["
 
 # ------------------- Функции -------------------
 
+def get_model() -> SentenceTransformer:
+    """Модель грузится при первом обращении, а не при импорте модуля."""
+    global _model
+    if _model is None:
+        _model = SentenceTransformer(EMBEDDING_MODEL_NAME, device=device)
+    return _model
+
+
 def normalize_source_token(src):
     if not isinstance(src, str) or not src.strip():
         return None
@@ -90,48 +106,64 @@ def remove_emoji(text):
     return EMOJI_RE.sub("", text)
 
 
-def generate_news_embedding(content: str, source_title) -> list[float]:
+def clean_news_content(content: str, source_title) -> str:
     content = remove_interfax_prefix(content)  # 1. всё до interfax.ru
     content = remove_greeting_prefix(content)  # 2. приветствия
     content = remove_source_urls(content, source_title)  # 3. ссылки на source
     content = remove_emoji(content)  # 4. эмодзи
     if isinstance(content, str):
         content = content.lower()
-    embeddings = model.encode(
-        [content],
-        show_progress_bar=True,
-        convert_to_numpy=True,
-    )
-    embeddings = normalize(embeddings)
-    return embeddings[0].tolist()
+    return content
+
+
+def generate_news_embeddings(contents: list[str], source_title) -> np.ndarray:
+    """Эмбеддинги пачки новостей одного источника одним вызовом модели, shape (n, 384)."""
+    metrics.EMBEDDING_BATCH_SIZE.observe(len(contents))
+    with metrics.EMBEDDING_SECONDS.time():
+        embeddings = get_model().encode(
+            [clean_news_content(c, source_title) for c in contents],
+            show_progress_bar=True,
+            convert_to_numpy=True,
+        )
+    return normalize(embeddings).astype(np.float32, copy=False)
+
+
+def generate_news_embedding(content: str, source_title) -> list[float]:
+    return generate_news_embeddings([content], source_title)[0].tolist()
 
 
 class BaseParser(ABC):
+    # корень сайта без завершающего "/"; все URL парсера строятся от self.base_url
     BASE_URL: Optional[str] = None
     headers: Dict[str, str] = {}
     cookies: Dict[str, str] = {}
 
     def __init__(self, source_title: str, dump_to_type: str, dump_pointer: str, *,
                  db_engine_url: Optional[str] = None,
+                 base_url: Optional[str] = None,
                  concurrency: int = 5,
                  batch_size: int = 50):
         """
         :param source_title: source_title источника в БД
-        :param dump_to_type: "file" or "db"
-        :param dump_pointer: если file -> путь к csv; если db -> строка подключения (DSN) к БД (async)
+        :param dump_to_type: "file", "parquet" or "db"
+        :param dump_pointer: если file -> путь к csv; если parquet -> директория с part-файлами;
+            если db -> строка подключения (DSN) к БД (async)
         :param db_engine_url: альтернативная точка для создания engine (если dump_to_type == 'db')
+        :param base_url: подменяет BASE_URL класса, например на replay-сервер
+            (benchmarks.replay) для офлайн-замеров
         """
         self.source_title = source_title
-        self.dump_to_type = dump_to_type  # "file" / "db"
+        self.base_url = (base_url or self.BASE_URL or "").rstrip("/")
+        self.dump_to_type = dump_to_type  # "file" / "parquet" / "db"
         self.dump_pointer = dump_pointer
         self.concurrency = concurrency
         self.batch_size = batch_size
 
         if self.dump_to_type == "db":
+            # engine общий для процесса (src.core.engine), парсеры не плодят свои пулы
             engine_url = db_engine_url or dump_pointer
-            self.engine = create_async_engine(engine_url, future=True)
-            self.session_maker = async_sessionmaker(bind=self.engine, class_=AsyncSession,
-                                                    expire_on_commit=False)
+            self.engine = get_engine(engine_url)
+            self.session_maker = get_session_maker(engine_url)
         else:
             self.engine = None
             self.session_maker = None
@@ -163,6 +195,8 @@ class BaseParser(ABC):
         """Возвращает множество использованных other_id в зависимости от режима дампа."""
         if self.dump_to_type == "file":
             return self._get_used_file()
+        elif self.dump_to_type == "parquet":
+            return parquet_dump.get_used_ids(self.dump_pointer, self.source_title)
         else:
             return await self._get_used_db()
 
@@ -182,65 +216,125 @@ class BaseParser(ABC):
                 writer.writeheader()
             writer.writerows(data)
 
+    def _dump_parquet(self, data: List[Dict]):
+        if not data:
+            return
+        rows = [{
+            "other_id": r.get("other_id"),
+            "source_title": self.source_title,
+            "dttm": datetime.fromisoformat(r.get("published_dttm")),
+            "url": r.get("url"),
+            "content": r.get("content"),
+        } for r in data]
+        embeddings = generate_news_embeddings([r["content"] for r in rows], self.source_title)
+        parquet_dump.write_batch(self.dump_pointer, rows, embeddings,
+                                 row_group_size=self.batch_size)
+
     async def _dump_db(self, data: List[Dict]) -> list[SourceNews]:
+        """
+        Вся пачка — одна транзакция; статьи, которые уже есть в БД, пропускаются
+        (SourceNewsRepo.insert_new), возвращаются только вставленные.
+        """
         if not data:
             return []
-        items = []
+        embeddings = generate_news_embeddings([r.get("content") for r in data],
+                                              self.source_title)
+        rows = [{
+            "dttm": datetime.fromisoformat(r.get("published_dttm")),
+            "source_title": self.source_title,
+            "url": r.get("url"),
+            "other_id": r.get("other_id"),
+            "content": r.get("content"),
+            "embedding": embedding.tolist(),
+            "embedding_model": EMBEDDING_MODEL_VERSION,
+        } for r, embedding in zip(data, embeddings)]
 
         async with self.session_maker() as session:
-            db = DB(session)
-            for r in data:
-                item = await db.source_news.create(
-                    dttm=datetime.fromisoformat(r.get("published_dttm")),
-                    source_title=self.source_title,
-                    url=r.get("url"),
-                    other_id=r.get("other_id"),
-                    content=r.get("content"),
-                    embedding=generate_news_embedding(r.get("content"), self.source_title),
-                )
-                items.append(item)
-
+            with metrics.DB_WRITE_SECONDS.labels("source_news").time():
+                items = await DB(session).source_news.insert_new(rows)
+
+        # dttm источников — московское время без таймзоны, как и везде в проекте
+        now = datetime.utcnow() + timedelta(hours=3)
+        metrics.INGESTED.labels(self.source_title).inc(len(items))
+        for item in items:
+            metrics.INGEST_LAG_SECONDS.labels(self.source_title).observe(
+                max((now - item.dttm).total_seconds(), 0)
+            )
         return items
 
-    async def dump(self, data: List[Dict]):
+    async def dump(self, data: List[Dict]) -> list[SourceNews]:
+        """Модели SourceNews есть только при записи в БД; file/parquet возвращают []."""
         if self.dump_to_type == "file":
             self._dump_file(data)
+        elif self.dump_to_type == "parquet":
+            await asyncio.to_thread(self._dump_parquet, data)
         else:
             return await self._dump_db(data)
+        return []
 
     async def fetch_json(self, session: aiohttp.ClientSession, url: str,
                          params: dict = None) -> dict:
-        async with session.get(url, params=params, headers=self.headers, cookies=self.cookies,
-                               timeout=self._aio_timeout) as resp:
-            resp.raise_for_status()
-            return await resp.json()
+        host = urllib.parse.urlparse(url).netloc
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params, headers=self.headers,
+                                   cookies=self.cookies, timeout=self._aio_timeout) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+        except Exception:
+            metrics.FETCH_ERRORS.labels(host).inc()
+            raise
+        finally:
+            metrics.FETCH_SECONDS.labels(host, "json").observe(time.perf_counter() - started)
 
     async def fetch_html(self, session: aiohttp.ClientSession, url: str,
                          params: dict = None) -> str:
-        async with session.get(url, params=params, headers=self.headers, cookies=self.cookies,
-                               timeout=self._aio_timeout) as resp:
-            raw = await resp.read()
-            # пытаемся cp1251 → если не вышло, то utf-8
-            try:
-                return raw.decode("cp1251")
-            except UnicodeDecodeError:
-                return raw.decode("utf-8", errors="ignore")
+        host = urllib.parse.urlparse(url).netloc
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params, headers=self.headers,
+                                   cookies=self.cookies, timeout=self._aio_timeout) as resp:
+                raw = await resp.read()
+        except Exception:
+            metrics.FETCH_ERRORS.labels(host).inc()
+            raise
+        finally:
+            metrics.FETCH_SECONDS.labels(host, "html").observe(time.perf_counter() - started)
+        # пытаемся cp1251 → если не вышло, то utf-8
+        try:
+            return raw.decode("cp1251")
+        except UnicodeDecodeError:
+            return raw.decode("utf-8", errors="ignore")
 
     def normalize_content(self, html: str) -> str:
         """Базовый нормалайзер: собирает текст из <p> и убирает лишние пробелы."""
-        soup = BeautifulSoup(html, "html.parser")
-        paragraphs = [p.get_text(separator=" ", strip=True) for p in soup.find_all("p") if
-                      p.get_text(strip=True)]
-        return " ".join(paragraphs)
+        with metrics.EXTRACT_SECONDS.labels(self.source_title).time():
+            soup = BeautifulSoup(html, "html.parser")
+            paragraphs = [p.get_text(separator=" ", strip=True) for p in soup.find_all("p") if
+                          p.get_text(strip=True)]
+            return " ".join(paragraphs)
 
     async def run(self):
         print(f"[start-parsing] {self.source_title}")
         used = await self.get_used()
-        connector = aiohttp.TCPConnector(limit=5)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
         async with aiohttp.ClientSession(connector=connector) as session:
             new_data = await self.collect_data(session, used)
         return new_data
 
+    @abstractmethod
+    async def discover(self, session: aiohttp.ClientSession, day: date,
+                       used: Set[int]) -> List[Dict]:
+        """
+        Списки источника за день -> [{other_id, published_dttm, url}] без used.
+        Вместе с extract — шаги очереди crawl_tasks (parsers/crawl_worker.py), поэтому
+        обязательны: парсер без них не создать, и задачи его источника не зациклятся в retry.
+        """
+
+    @abstractmethod
+    async def extract(self, session: aiohttp.ClientSession, item: Dict) -> Optional[Dict]:
+        """Элемент discover -> строка для dump (+ content) или None, если текста нет."""
+
     @abstractmethod
     async def collect_data(self, session: aiohttp.ClientSession, used: set[int]) -> List[
         SourceNews]:
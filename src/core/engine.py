@@ -0,0 +1,78 @@
+from typing import Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, \
+    create_async_engine
+
+from config.config import PostgresDB, load_config
+from src.core.tracing import instrument_engine
+
+_settings: Optional[PostgresDB] = None
+_engines: dict[str, AsyncEngine] = {}
+_session_makers: dict[str, async_sessionmaker] = {}
+
+
+def configure_engines(settings: PostgresDB):
+    """Настройки пула для всех engine процесса; без вызова берутся из load_config()."""
+    global _settings
+    _settings = settings
+
+
+def _get_settings() -> PostgresDB:
+    global _settings
+    if _settings is None:
+        _settings = load_config().db
+    return _settings
+
+
+def get_engine(url: Optional[str] = None) -> AsyncEngine:
+    """Один engine (и один пул соединений) на URL на процесс."""
+    settings = _get_settings()
+    url = url or settings.alchemy_url
+    engine = _engines.get(url)
+    if engine is None:
+        engine_url = make_url(url).update_query_dict({
+            "prepared_statement_cache_size": str(settings.statement_cache_size),
+        })
+        engine = create_async_engine(
+            engine_url,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_pre_ping=settings.pool_pre_ping,
+            pool_recycle=settings.pool_recycle,
+        )
+        instrument_engine(engine)
+        _engines[url] = engine
+    return engine
+
+
+def get_session_maker(url: Optional[str] = None) -> async_sessionmaker:
+    settings = _get_settings()
+    url = url or settings.alchemy_url
+    session_maker = _session_makers.get(url)
+    if session_maker is None:
+        session_maker = async_sessionmaker(bind=get_engine(url), class_=AsyncSession,
+                                           expire_on_commit=False)
+        _session_makers[url] = session_maker
+    return session_maker
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Состояние пулов всех созданных engine: размер, занятые/свободные соединения, overflow."""
+    stats = {}
+    for url, engine in _engines.items():
+        pool = engine.pool
+        stats[make_url(url).render_as_string(hide_password=True)] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+    return stats
+
+
+async def dispose_engines():
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    _session_makers.clear()
@@ -1,22 +1,50 @@
-from fastapi import Request, FastAPI
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
 from sqlalchemy.ext.asyncio import async_sessionmaker
-from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.core.profiling import profile
+from src.core.tracing import trace
 from src.repo import DB
 
 
-class GetDBMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: FastAPI, session_pool: async_sessionmaker):
-        super().__init__(app)
-        self.session_pool = session_pool
+class DBSessionRoute(APIRoute):
+    """
+    Route, который закрывает сессию БД сразу после обработчика, ещё до отправки ответа.
+    Сама сессия открывается лениво в get_db: эндпоинты, которым БД не нужна
+    (и CORS preflight, и docs), соединение из пула не берут вовсе.
+    Обработчик выполняется внутри SQL-трассы (src/core/tracing.py) и профиля
+    (src/core/profiling.py), если они включены.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
 
-    async def dispatch(self, request: Request, call_next):
-        async with self.session_pool() as session:
-            request.state.db = DB(session)
+        async def route_handler(request: Request) -> Response:
+            try:
+                name = f"{request.method} {self.path}"
+                async with profile(name):
+                    with trace(name):
+                        return await handler(request)
+            finally:
+                session = getattr(request.state, "db_session", None)
+                if session is not None:
+                    request.state.db_session = None
+                    await session.close()
 
-            response = await call_next(request)
-            return response
+        return route_handler
 
 
 async def get_db(request: Request) -> DB:
-    return request.state.db
+    db = getattr(request.state, "db", None)
+    if db is None:
+        session = request.app.state.session_pool()
+        request.state.db_session = session
+        request.state.db = db = DB(session)
+    return db
+
+
+async def get_session_pool(request: Request) -> async_sessionmaker:
+    """Для обработчиков, которым сессия нужна дольше самого запроса (стриминг ответа)."""
+    return request.app.state.session_pool
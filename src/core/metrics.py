@@ -0,0 +1,67 @@
+"""
+Метрики конвейера в формате Prometheus.
+
+API отдаёт их на /metrics (app.py), процесс парсеров — через start_exporter на
+METRICS__PORT. Метрики объявлены здесь все сразу, чтобы имена и бакеты не расползались
+по модулям; модули только вызывают .observe()/.inc()/.time().
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, \
+    start_http_server
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 24 * 3600, 7 * 24 * 3600)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+FETCH_SECONDS = Histogram(
+    "parser_fetch_seconds", "HTTP request latency of parsers", ["host", "kind"],
+    buckets=LATENCY_BUCKETS,
+)
+FETCH_ERRORS = Counter("parser_fetch_errors_total", "Failed parser HTTP requests", ["host"])
+EXTRACT_SECONDS = Histogram(
+    "parser_extract_seconds", "HTML to article text extraction time", ["source"],
+    buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per embedding batch", buckets=BATCH_BUCKETS,
+)
+EMBEDDING_SECONDS = Histogram(
+    "embedding_batch_seconds", "Embedding batch latency", buckets=LATENCY_BUCKETS,
+)
+DB_WRITE_SECONDS = Histogram(
+    "db_write_seconds", "Database write latency", ["op"], buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds", "Analysis stage duration per item", ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+CYCLE_SECONDS = Histogram(
+    "ingest_cycle_seconds", "Full ingest cycle duration",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200),
+)
+CYCLE_ITEMS = Gauge("ingest_cycle_items", "Items produced by the last cycle", ["stage"])
+INGESTED = Counter("ingest_items_total", "Stored source news", ["source"])
+INGEST_LAG_SECONDS = Histogram(
+    "ingest_lag_seconds", "Delay between publication and ingest", ["source"],
+    buckets=LAG_BUCKETS,
+)
+
+SQL_QUERIES = Histogram(
+    "sql_queries", "SQL statements per traced unit", ["scope"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+SQL_SECONDS = Histogram(
+    "sql_seconds", "Time spent in the database per traced unit", ["scope"],
+    buckets=LATENCY_BUCKETS,
+)
+SQL_N_PLUS_ONE = Counter("sql_n_plus_one_total", "Repeated statement shapes over threshold",
+                         ["scope"])
+
+
+def start_exporter(port: int):
+    """HTTP-экспортер в отдельном потоке; port <= 0 выключает его."""
+    if port > 0:
+        start_http_server(port)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
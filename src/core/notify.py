@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Optional
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# изменились News / NewsTickerValue: устарели /hot, /news и ряды тикеров
+NEWS_CHANGED = "news_changed"
+# изменилась только лента /news: новые SourceNews (триггер вставки source_news), is_original
+FEED_CHANGED = "feed_changed"
+# SourceNews признана оригиналом: {"id", "dttm", "url", "source_title"}
+NEWS_ORIGINAL = "news_original"
+# найдена сюжетная линия: {"news_id", "source_news_id", "line": [source_news.id, ...]}
+NEWS_STORYLINE = "news_storyline"
+# обновилась hotness тикеров: {"news_ids": [...]}
+TICKER_HOTNESS = "ticker_hotness"
+# вставка в source_news (триггер миграции 0005), без payload: будит parsers.analysis_worker
+SOURCE_NEWS_INSERTED = "source_news_inserted"
+
+# каналы, которые ретранслирует API (src/core/pubsub.py)
+CHANNELS = (NEWS_CHANGED, FEED_CHANGED, NEWS_ORIGINAL, NEWS_STORYLINE, TICKER_HOTNESS)
+
+logger = logging.getLogger("notify")
+
+
+async def notify(session: AsyncSession, channel: str, payload: str = ""):
+    """NOTIFY в транзакции сессии: подписчики получат его только после её commit."""
+    await session.execute(select(func.pg_notify(channel, payload)))
+
+
+async def notify_json(session: AsyncSession, channel: str, data: Any):
+    # payload NOTIFY ограничен 8000 байт — передаём только id и короткие поля
+    await notify(session, channel, json.dumps(data, ensure_ascii=False, default=str))
+
+
+async def listen(url: str, callbacks: dict[str, Callable[[str], None]]) -> asyncpg.Connection:
+    """
+    Отдельное asyncpg-соединение под LISTEN (url вида postgresql://...).
+    callback получает payload; соединение нужно закрыть при остановке.
+    """
+    conn = await asyncpg.connect(url)
+    for channel, callback in callbacks.items():
+        await conn.add_listener(channel, lambda _conn, _pid, _channel, payload,
+                                                cb=callback: cb(payload))
+    return conn
+
+
+class Listener:
+    """
+    LISTEN, переживающий рестарт Postgres и обрыв сети. Потерю соединения ловит
+    termination listener asyncpg, а «тихий» обрыв — SELECT 1 раз в check_s. После этого
+    соединение пересоздаётся с экспоненциальной паузой и каналы подписываются заново.
+    Уведомления за время разрыва потеряны, поэтому после переподключения вызывается
+    on_reconnect (сбросить кэши, перечитать состояние).
+    """
+
+    def __init__(self, url: str, callbacks: dict[str, Callable[[str], None]], *,
+                 on_reconnect: Optional[Callable[[], None]] = None,
+                 check_s: float = 30.0, max_backoff_s: float = 60.0):
+        self.url = url
+        self.callbacks = callbacks
+        self.on_reconnect = on_reconnect
+        self.check_s = check_s
+        self.max_backoff_s = max_backoff_s
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lost = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _connect(self):
+        self._lost.clear()
+        self._conn = await listen(self.url, self.callbacks)
+        self._conn.add_termination_listener(lambda _conn: self._lost.set())
+
+    async def start(self):
+        """Первое подключение — сразу (ошибка уходит вызывающему), дальше — надзор в фоне."""
+        await self._connect()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def _alive(self) -> bool:
+        try:
+            await asyncio.wait_for(self._lost.wait(), self.check_s)
+            return False
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await asyncio.wait_for(self._conn.fetchval("SELECT 1"), self.check_s)
+            return True
+        except (asyncio.TimeoutError, OSError, asyncpg.PostgresError,
+                asyncpg.InterfaceError):
+            return False
+
+    async def _supervise(self):
+        while True:
+            while await self._alive():
+                pass
+            logger.warning("LISTEN connection lost, reconnecting")
+            self._conn.terminate()
+            backoff = 1.0
+            while True:
+                try:
+                    await self._connect()
+                    break
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+                    logger.warning(f"LISTEN reconnect failed: {exc!r}, retry in {backoff:.0f}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff_s)
+            logger.info("LISTEN reconnected")
+            if self.on_reconnect is not None:
+                self.on_reconnect()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
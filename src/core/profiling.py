@@ -0,0 +1,218 @@
+"""
+Профилирование по запросу: циклы ingest и выборочные HTTP-запросы API.
+
+Профилируемая единица пишет в PROFILING__DIR три файла с общим префиксом
+<время>-<имя>:
+    .prof        — cProfile (pstats: python -m pstats, snakeviz)
+    .json        — wall/CPU-время, RSS, лаг event loop, asyncio-задачи, топ роста памяти
+    .tracemalloc — снимок tracemalloc (tracemalloc.Snapshot.load)
+
+Включается без передеплоя: PROFILING__CYCLES / PROFILING__SAMPLE_RATE при старте,
+trigger-файл с числом N на лету (его забирает первый процесс, который его увидит)
+или автоматически — после цикла дольше PROFILING__SLOW_CYCLE_S или роста RSS больше
+PROFILING__RSS_GROWTH_MB. cProfile в потоке может быть только один, поэтому
+одновременно профилируется одна единица; в профиль запроса API попадает и работа
+параллельных запросов того же event loop.
+"""
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import resource
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from config.config import Profiling
+
+logger = logging.getLogger("profiling")
+
+_settings = Profiling()
+_budget: Counter = Counter()
+_active = False
+_trigger_checked = 0.0
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+_last_rss: Optional[int] = None
+_last_cycle_rss: Optional[int] = None
+_NAME_RE = re.compile(r"[^\w.-]+")
+
+
+def configure_profiling(settings: Profiling):
+    global _settings
+    _settings = settings
+    arm("cycle", settings.cycles)
+
+
+def arm(scope: str, n: int = 1):
+    """Профилировать следующие n единиц scope ("cycle" или "request")."""
+    if n > 0:
+        _budget[scope] += n
+
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса; вне Linux — пиковый (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _check_trigger(scope: str):
+    """Trigger-файл проверяется не чаще раза в секунду: запросов API может быть много."""
+    global _trigger_checked
+    now = time.monotonic()
+    if now - _trigger_checked < 1:
+        return
+    _trigger_checked = now
+    try:
+        raw = Path(_settings.trigger).read_text().strip()
+        os.remove(_settings.trigger)
+    except OSError:
+        return
+    n = int(raw) if raw.isdigit() else 1
+    logger.info(f"profiling triggered: next {n} x {scope}")
+    arm(scope, n)
+
+
+def _take(scope: str) -> bool:
+    if _active:
+        return False
+    _check_trigger(scope)
+    if _budget[scope] > 0:
+        _budget[scope] -= 1
+        return True
+    return scope == "request" and _settings.sample_rate > 0 \
+        and random.random() < _settings.sample_rate
+
+
+async def _watch_loop(interval: float, lags: list[float], tasks: list[int]):
+    """Опаздывание пробуждений sleep(interval) — лаг event loop; заодно число задач."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(loop.time() - started - interval, 0.0))
+        tasks.append(len(asyncio.all_tasks()))
+
+
+def _task_names() -> dict[str, int]:
+    names = Counter()
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        names[getattr(coro, "__qualname__", type(coro).__name__)] += 1
+    return dict(names.most_common(_settings.top))
+
+
+def _memory_top(snapshot: tracemalloc.Snapshot, base: Optional[tracemalloc.Snapshot]) -> list:
+    if base is None:
+        return []
+    return [
+        {"where": str(stat.traceback), "size_diff": stat.size_diff, "size": stat.size,
+         "count_diff": stat.count_diff}
+        for stat in snapshot.compare_to(base, "lineno")[:_settings.top]
+    ]
+
+
+def _lag_stats(lags: list[float]) -> dict:
+    if not lags:
+        return {}
+    lags = sorted(lags)
+    return {
+        "samples": len(lags),
+        "mean_ms": statistics.fmean(lags) * 1000,
+        "p95_ms": lags[int(0.95 * (len(lags) - 1))] * 1000,
+        "max_ms": lags[-1] * 1000,
+    }
+
+
+@asynccontextmanager
+async def profile(name: str, scope: str = "request") -> AsyncIterator[Optional[Path]]:
+    """
+    Профиль блока, если для scope он сейчас включён; иначе — None и почти нулевая цена.
+    Отдаёт префикс файлов результата.
+    """
+    global _active, _last_snapshot, _last_rss
+    if not _take(scope):
+        yield None
+        return
+
+    out = Path(_settings.dir)
+    out.mkdir(parents=True, exist_ok=True)
+    _active = True
+    prefix = out / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{_NAME_RE.sub('_', name).strip('_')}"
+
+    if _settings.tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+    lags, tasks = [], []
+    watcher = asyncio.create_task(_watch_loop(_settings.lag_interval_ms / 1000, lags, tasks))
+    rss_before = rss_bytes()
+    wall, cpu = time.perf_counter(), time.process_time()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield prefix
+    finally:
+        profiler.disable()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        watcher.cancel()
+        # _active сбрасывается, даже если запись файлов упала (диск, права на каталог):
+        # иначе профилирование молча выключилось бы до конца жизни процесса
+        try:
+            profiler.dump_stats(f"{prefix}.prof")
+
+            report = {
+                "name": name, "scope": scope, "wall_s": wall, "cpu_s": cpu,
+                "rss_before": rss_before, "rss_after": rss_bytes(),
+                "rss_prev_profile": _last_rss,
+                "loop_lag": _lag_stats(lags),
+                "tasks": {"max": max(tasks, default=0), "at_exit": _task_names()},
+            }
+            _last_rss = report["rss_after"]
+            if start_snapshot is not None:
+                snapshot = tracemalloc.take_snapshot()
+                snapshot.dump(f"{prefix}.tracemalloc")
+                report["memory_top"] = _memory_top(snapshot, start_snapshot)
+                report["memory_top_since_prev_profile"] = _memory_top(snapshot, _last_snapshot)
+                _last_snapshot = snapshot
+                idle = not _budget["cycle"] and not _budget["request"]
+                if idle and not _settings.sample_rate:
+                    # tracemalloc заметно замедляет аллокации — держим его только пока
+                    # нужен; рост памяти между профилями сравним, только пока трассировка
+                    # не прерывалась
+                    tracemalloc.stop()
+                    _last_snapshot = None
+            with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+        finally:
+            _active = False
+        logger.info(f"profile {name}: {wall:.2f}s wall, {cpu:.2f}s cpu -> {prefix}.*")
+
+
+def watch_cycle(seconds: float, profiled: bool):
+    """
+    После цикла: слишком долгий цикл или рост RSS с прошлого цикла включают профиль
+    следующего. Профилированный цикл не считается — cProfile сам его замедляет.
+    """
+    global _last_cycle_rss
+    rss = rss_bytes()
+    grown = rss - _last_cycle_rss if _last_cycle_rss is not None else 0
+    _last_cycle_rss = rss
+    if profiled:
+        return
+    if _settings.slow_cycle_s and seconds > _settings.slow_cycle_s:
+        logger.warning(f"cycle took {seconds:.0f}s, profiling the next one")
+        arm("cycle")
+    elif _settings.rss_growth_mb and grown > _settings.rss_growth_mb * 2 ** 20:
+        logger.warning(f"RSS grew by {grown / 2 ** 20:.0f} MB, profiling the next cycle")
+        arm("cycle")
+
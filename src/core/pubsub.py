@@ -0,0 +1,80 @@
+import asyncio
+from collections import defaultdict
+from typing import Callable, Iterable, Optional
+
+from src.core.notify import CHANNELS, NEWS_CHANGED, Listener
+
+
+class Subscription:
+    """Очередь событий одного клиента; при переполнении теряются самые старые события."""
+
+    def __init__(self, broker: "Broker", channels: Optional[set[str]], maxsize: int):
+        self.broker = broker
+        self.channels = channels
+        self.queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, channel: str, payload: str):
+        if self.channels is not None and channel not in self.channels:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait((channel, payload))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[tuple[str, str]]:
+        """Следующее событие (channel, payload) или None, если за timeout ничего не пришло."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    In-process pub/sub API. Источник событий — LISTEN на каналы из src.core.notify,
+    так что ingest в другом процессе публикует через NOTIFY после коммита.
+    LISTEN переподключается сам (Listener); события за время разрыва потеряны, поэтому
+    после переподключения публикуется NEWS_CHANGED — кэши сбрасываются, клиенты /stream
+    перечитывают данные.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self._callbacks: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._listener: Optional[Listener] = None
+
+    def on(self, channel: str, callback: Callable[[str], None]):
+        """Синхронный обработчик канала (например, инвалидация кэша)."""
+        self._callbacks[channel].append(callback)
+
+    def subscribe(self, channels: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(self, set(channels) if channels else None, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, channel: str, payload: str):
+        for callback in self._callbacks.get(channel, ()):
+            callback(payload)
+        for subscription in list(self._subscriptions):
+            subscription.put(channel, payload)
+
+    async def start(self, url: str, channels: Iterable[str] = CHANNELS):
+        self._listener = Listener(url, {
+            channel: lambda payload, channel=channel: self.publish(channel, payload)
+            for channel in channels
+        }, on_reconnect=lambda: self.publish(NEWS_CHANGED, ""))
+        await self._listener.start()
+
+    async def stop(self):
+        if self._listener is not None:
+            await self._listener.stop()
+            self._listener = None
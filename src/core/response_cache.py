@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from starlette.responses import StreamingResponse
+
+from src.core.cache import TTLCache
+from src.core.get_db import DBSessionRoute
+
+
+@dataclass
+class CachedResponse:
+    etag: str
+    media_type: Optional[str]
+    body: bytes
+
+
+class MemoryBackend:
+    """LRU+TTL в памяти процесса."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def clear(self, prefix: str = ""):
+        if not prefix:
+            self._cache.clear()
+            return
+        for key in self._cache.keys():
+            if key.startswith(prefix):
+                self._cache.pop(key)
+
+
+class SqliteBackend:
+    """
+    Кэш в sqlite-файле: общий для нескольких worker-процессов uvicorn на одной машине.
+    Срок жизни считается по time.time(), т.к. monotonic у процессов разный.
+    Вызовы sqlite блокирующие (запись другого процесса держит файл до 5 с), поэтому идут
+    в потоке через asyncio.to_thread. Просроченные и лишние сверх maxsize записи
+    вычищаются не чаще раза в evict_s, а не на каждую запись.
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, evict_s: float = 60.0):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.maxsize = maxsize
+        self.evict_s = evict_s
+        self._evicted = 0.0
+        # одно соединение на процесс: потоки to_thread не должны писать в него одновременно
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, expires_at REAL, etag TEXT, media_type TEXT, body BLOB)"
+        )
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, media_type, body FROM response_cache "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def _set(self, key: str, value: CachedResponse, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                (key, now + ttl, value.etag, value.media_type, value.body),
+            )
+            if time.monotonic() - self._evicted < self.evict_s:
+                return
+            self._evicted = time.monotonic()
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key NOT IN ("
+                "SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT ?)",
+                (self.maxsize,),
+            )
+
+    def _clear(self, prefix: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE substr(key, 1, length(?)) = ?",
+                (prefix, prefix),
+            )
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: CachedResponse, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self, prefix: str = ""):
+        await asyncio.to_thread(self._clear, prefix)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(request: Request) -> str:
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def invalidate(self, *_, prefix: str = ""):
+        """
+        Сбрасывает ответы, путь которых начинается с prefix (по умолчанию — все);
+        сигнатура подходит для callback'а LISTEN. Callback синхронный, поэтому сброс
+        уходит задачей в event loop.
+        """
+        task = asyncio.get_running_loop().create_task(self.backend.clear(prefix))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def cache_response(ttl: Optional[float] = None):
+    """
+    Помечает GET-эндпоинт как кэшируемый (ttl=None — ttl из настроек кэша).
+    Работает вместе с route_class=CachedRoute.
+    """
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.cache_ttl = ttl
+        return endpoint
+
+    return decorator
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match == "*"
+
+
+class CachedRoute(DBSessionRoute):
+    """
+    DBSessionRoute + кэш ответов для эндпоинтов с @cache_response.
+    Попадание в кэш не вызывает обработчик, а значит и не открывает сессию БД.
+    Поддерживается ETag / If-None-Match -> 304.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not hasattr(self.endpoint, "cache_ttl"):
+            return handler
+        endpoint_ttl = self.endpoint.cache_ttl
+
+        async def route_handler(request: Request) -> Response:
+            cache: Optional[ResponseCache] = getattr(request.app.state, "response_cache", None)
+            if cache is None or request.method != "GET":
+                return await handler(request)
+
+            key = cache.key(request)
+            cached = await cache.backend.get(key)
+            if cached is None:
+                response = await handler(request)
+                if response.status_code != 200 or isinstance(response, StreamingResponse):
+                    return response
+                body = bytes(response.body)
+                cached = CachedResponse(
+                    etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+                    media_type=response.media_type,
+                    body=body,
+                )
+                await cache.backend.set(key, cached,
+                                        cache.ttl if endpoint_ttl is None else endpoint_ttl)
+
+            headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+            if _not_modified(request, cached.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+        return route_handler
@@ -0,0 +1,134 @@
+"""
+Трассировка SQL: число запросов, суммарное время в БД и самые медленные запросы на единицу
+работы (HTTP-запрос API или цикл ingest), плюс предупреждение о N+1.
+
+Слушатели висят на каждом engine из get_engine, но работают, только пока активен
+trace(...) — без него (и при TRACING__ENABLED=no) это один ContextVar.get на запрос.
+Дочерние asyncio-задачи наследуют контекст, поэтому запросы параллельных парсеров
+считаются в трассе цикла.
+"""
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.config import Tracing
+from src.core import metrics
+
+logger = logging.getLogger("sql-trace")
+
+_settings = Tracing()
+_current: ContextVar[Optional["QueryTrace"]] = ContextVar("sql_trace", default=None)
+_IN_LIST_RE = re.compile(r"\(\s*\$\d+(?:\s*,\s*\$\d+)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def configure_tracing(settings: Tracing):
+    global _settings
+    _settings = settings
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: IN-списки разной длины и переносы строк не делают запросы разными."""
+    return _SPACE_RE.sub(" ", _IN_LIST_RE.sub("(...)", statement)).strip()
+
+
+class QueryTrace:
+    def __init__(self, name: str, top: int):
+        self.name = name
+        self.top = top
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._slowest: list[tuple[float, int, str]] = []
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        item = (seconds, self.count, statement)
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    @property
+    def slowest(self) -> list[tuple[float, str]]:
+        return [(s, stmt) for s, _, stmt in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Формы запросов, выполненные не меньше threshold раз (подозрение на N+1)."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        return f"{self.name}: {self.count} queries, {self.db_seconds * 1000:.1f} ms in db"
+
+
+@contextmanager
+def trace(name: str, scope: str = "request") -> Iterator[Optional[QueryTrace]]:
+    """
+    Трасса на время блока; по выходу — метрики, лог медленных запросов и N+1.
+    scope — метка метрик: "request" для API, "cycle" для ingest.
+    """
+    if not _settings.enabled:
+        yield None
+        return
+
+    current = QueryTrace(name, _settings.top)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        _report(current, scope)
+
+
+def _report(current: QueryTrace, scope: str):
+    metrics.SQL_QUERIES.labels(scope).observe(current.count)
+    metrics.SQL_SECONDS.labels(scope).observe(current.db_seconds)
+    logger.info(current.summary())
+
+    for seconds, statement in current.slowest:
+        if seconds * 1000 >= _settings.slow_ms:
+            logger.info(f"{current.name}: slow {seconds * 1000:.1f} ms: "
+                        f"{statement_shape(statement)}")
+
+    for shape, n in current.repeated(_settings.n_plus_one):
+        metrics.SQL_N_PLUS_ONE.labels(scope).inc()
+        logger.warning(f"{current.name}: possible N+1, {n} x {shape[:300]}")
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("sql_trace_started", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is None:
+        return
+    started = conn.info.get("sql_trace_started")
+    if started:
+        current.record(statement, time.perf_counter() - started.pop())
+
+
+def _error(exception_context):
+    started = exception_context.connection.info.get("sql_trace_started") \
+        if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before):
+        event.listen(sync_engine, "before_cursor_execute", _before)
+        event.listen(sync_engine, "after_cursor_execute", _after)
+        event.listen(sync_engine, "handle_error", _error)
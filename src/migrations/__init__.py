@@ -0,0 +1 @@
+from src.migrations.runner import migrate
@@ -0,0 +1,220 @@
+"""
+EXPLAIN ANALYZE для горячих запросов репозиториев на локальном Postgres.
+
+    python -m src.migrations.advisor --seed 50000     # пустая база -> синтетические данные
+    python -m src.migrations.advisor --save-baseline  # зафиксировать текущие планы
+    python -m src.migrations.advisor                  # сравнить с baseline, exit 1 при регрессии
+
+Запросы не дублируются здесь руками: вызываются настоящие методы репозиториев, их SQL
+перехватывается событием before_cursor_execute и повторяется с EXPLAIN (ANALYZE, BUFFERS)
+в той же транзакции, которая затем откатывается. Флаги регрессии:
+seq-scan     — Seq Scan по таблице, которой нет в SMALL_TABLES;
+slower       — время выполнения выросло больше чем в --tolerance раз (и минимум на 5 мс);
+plan-changed — набор использованных индексов отличается от baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from config.config import load_config
+from src.core.engine import configure_engines, dispose_engines, get_engine
+from src.migrations import migrate
+from src.migrations.hnsw import build_hnsw_index
+from src.repo import DB
+
+SMALL_TABLES = {"tickers", "schema_migrations"}
+MIN_SLOWDOWN_MS = 5.0
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def _hot_queries(now: datetime) -> dict[str, Callable[[DB], Awaitable]]:
+    day_ago, week_ago = now - timedelta(days=1), now - timedelta(days=7)
+    probe = [0.05] * 384
+    return {
+        "source_news.get_used": lambda db: db.source_news.get_used("www.interfax.ru"),
+        "source_news.get_last_for_n_days": lambda db: db.source_news.get_last_for_n_days(2),
+        "source_news.get_feed_page": lambda db: db.source_news.get_feed_page(
+            50, after=(day_ago, 0)),
+        "source_news.get_feed_page[source]": lambda db: db.source_news.get_feed_page(
+            50, source_title="www.interfax.ru", start_dttm=week_ago),
+        "source_news.get_embeddings_after": lambda db: db.source_news.get_embeddings_after(0, 5000),
+        "source_news.search": lambda db: db.source_news.search(probe, 10, start_dttm=week_ago),
+        "hotness.get_hottest": lambda db: db.hotness.get_hottest(day_ago, now, 20),
+        "hotness.get_ticker_series": lambda db: db.hotness.get_ticker_series(
+            1, "1h", week_ago, now),
+        "news_ticker_values.get_active": lambda db: db.news_ticker_values.get_active(
+            now - timedelta(days=3)),
+    }
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def summarize(explain: list) -> dict:
+    root = explain[0]
+    nodes = list(_walk(root["Plan"]))
+    return {
+        "execution_ms": root.get("Execution Time", 0.0),
+        "seq_scans": sorted({n["Relation Name"] for n in nodes
+                             if n["Node Type"] == "Seq Scan" and "Relation Name" in n}),
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "shared_read": sum(n.get("Shared Read Blocks", 0) for n in nodes),
+    }
+
+
+def compare(name: str, current: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    flags = []
+    for i, stmt in enumerate(current):
+        tag = f"{name}#{i}"
+        big_seq = [r for r in stmt["seq_scans"] if r not in SMALL_TABLES]
+        if big_seq:
+            flags.append(f"{tag}: seq-scan on {', '.join(big_seq)}")
+        if i >= len(baseline):
+            continue
+        base = baseline[i]
+        if stmt["execution_ms"] > base["execution_ms"] * tolerance \
+                and stmt["execution_ms"] - base["execution_ms"] > MIN_SLOWDOWN_MS:
+            flags.append(f"{tag}: slower {base['execution_ms']:.1f} -> "
+                         f"{stmt['execution_ms']:.1f} ms")
+        if stmt["indexes"] != base["indexes"]:
+            flags.append(f"{tag}: plan-changed {base['indexes']} -> {stmt['indexes']}")
+    return flags
+
+
+async def explain_query(conn: AsyncConnection, call: Callable[[DB], Awaitable]) -> list[dict]:
+    captured: list[tuple[str, object]] = []
+
+    def capture(_conn, _cursor, statement, parameters, _context, _executemany):
+        if statement.lstrip().upper().startswith(EXPLAINABLE):
+            captured.append((statement, parameters))
+
+    sync_engine = conn.engine.sync_engine
+    async with conn.begin_nested():
+        event.listen(sync_engine, "before_cursor_execute", capture)
+        try:
+            await call(DB(AsyncSession(bind=conn), autocommit=False))
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", capture)
+
+        result = []
+        for statement, parameters in captured:
+            rows = await conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters,
+            )
+            explain = rows.scalar()
+            result.append(summarize(json.loads(explain) if isinstance(explain, str) else explain))
+        return result
+
+
+async def seed(conn: AsyncConnection, n_news: int, days: int = 30):
+    """Синтетические source_news/news/tickers/NTV и rollup'ы; только для пустой базы."""
+    if await conn.scalar(text("SELECT count(*) FROM source_news")):
+        raise RuntimeError("source_news is not empty, refusing to seed")
+    await conn.execute(text(
+        "INSERT INTO tickers (symbol, name) SELECT 'T' || g, 'Ticker ' || g "
+        "FROM generate_series(1, 50) g"
+    ))
+    await conn.execute(text(
+        "INSERT INTO source_news (dttm, url, source_title, other_id, embedding, "
+        "embedding_model, is_original) "
+        "SELECT now()::timestamp - random() * make_interval(days => :days), "
+        "'https://example.com/' || g, "
+        "(ARRAY['www.interfax.ru', 'www.cbr.ru', 'lenta.ru'])[1 + g % 3], g, "
+        "(SELECT array_agg(random())::vector FROM generate_series(1, 384) WHERE g > 0), "
+        "'seed', g % 3 = 0 "
+        "FROM generate_series(1, :n) g"
+    ), {"n": n_news, "days": days})
+    await conn.execute(text(
+        "INSERT INTO source_news_content (source_news_id, content) "
+        "SELECT id, repeat('lorem ipsum ', 200) FROM source_news"
+    ))
+    await conn.execute(text(
+        "INSERT INTO news (news_id, duplicate_count, timeline_length, sources_count) "
+        "SELECT id, 0, 1 + id % 5, 1 + id % 3 FROM source_news WHERE is_original"
+    ))
+    await conn.execute(text(
+        "INSERT INTO news_ticker_values (news_id, ticker_id, hotness, mentions) "
+        "SELECT id, 1 + id % 50, random() * 10, 1 + id % 4 FROM news"
+    ))
+    session = AsyncSession(bind=conn)
+    news_ids = list(await conn.scalars(text("SELECT id FROM news")))
+    await DB(session, autocommit=False).hotness.refresh(news_ids)
+    await session.flush()
+    for table in ("source_news", "source_news_content", "news", "news_ticker_values", "news_hotness_rollup",
+                  "ticker_hotness_rollup", "tickers"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def run(args) -> int:
+    now = datetime.utcnow() + timedelta(hours=3)
+    async with get_engine().begin() as conn:
+        await migrate(conn)
+        if args.seed:
+            await seed(conn, args.seed)
+    # /search должен идти по HNSW, как в рабочей базе
+    async with get_engine().connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await build_hnsw_index(conn)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report, flags = {}, []
+    async with get_engine().connect() as conn:
+        # EXPLAIN ANALYZE выполняет запросы (в том числе пишущие) — всё откатывается
+        for name, call in _hot_queries(now).items():
+            report[name] = await explain_query(conn, call)
+            flags += compare(name, report[name], baseline.get(name, []), args.tolerance)
+            for i, stmt in enumerate(report[name]):
+                print(f"{name}#{i:<3}{stmt['execution_ms']:>10.2f} ms  "
+                      f"idx={','.join(stmt['indexes']) or '-'}  "
+                      f"seq={','.join(stmt['seq_scans']) or '-'}")
+        await conn.rollback()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[advisor] baseline saved to {args.baseline}")
+        return 0
+
+    for flag in flags:
+        print(f"[advisor] {flag}")
+    return 1 if flags else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE of the hot repository queries")
+    parser.add_argument("--seed", default=0, type=int, help="seed N synthetic source_news rows")
+    parser.add_argument("--baseline", default="data/explain_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", default=1.5, type=float,
+                        help="allowed slowdown factor against the baseline")
+    args = parser.parse_args()
+
+    config = load_config()
+    configure_engines(config.db)
+
+    async def _run() -> int:
+        try:
+            return await run(args)
+        finally:
+            await dispose_engines()
+
+    sys.exit(asyncio.run(_run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+HNSW-индекс source_news.embedding для /search — отдельный шаг, не миграция:
+
+    python -m src.migrations.hnsw
+
+На большой таблице индекс строится долго, а миграции идут в транзакции старта app и
+парсеров под advisory lock и заблокировали бы запуск всех процессов. Здесь индекс
+строится CREATE INDEX CONCURRENTLY и записи в source_news не останавливает.
+У секционированной таблицы CONCURRENTLY для родителя недоступен: родительский индекс
+создаётся ON ONLY (пустой и пока невалидный), индекс каждой секции — CONCURRENTLY, и он
+присоединяется к родительскому. Когда присоединены все, родительский становится валидным,
+а новые секции (ensure_partitions) получают индекс сами. Повторный запуск продолжает с
+места обрыва: невалидный индекс секции от прерванной сборки пересоздаётся.
+"""
+import asyncio
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.models.partitions import TABLE, is_partitioned
+
+INDEX = "ix_source_news_embedding_hnsw"
+# как в модели SourceNews: эмбеддинги нормализованы, поэтому cosine
+METHOD = "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+
+
+async def index_valid(conn: AsyncConnection, name: str) -> Optional[bool]:
+    """None — индекса нет, False — есть, но невалидный (прерванная сборка, ON ONLY)."""
+    return await conn.scalar(text(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+    ), {"name": name})
+
+
+async def _create_concurrently(conn: AsyncConnection, table: str, name: str):
+    valid = await index_valid(conn, name)
+    if valid:
+        return
+    if valid is False:
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+    print(f"[hnsw] building {name} on {table}")
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY {name} ON {table} {METHOD}"))
+
+
+async def build_hnsw_index(conn: AsyncConnection):
+    """conn — в режиме AUTOCOMMIT: CREATE INDEX CONCURRENTLY не выполняется в транзакции."""
+    if await index_valid(conn, INDEX):
+        return
+    if not await conn.run_sync(is_partitioned):
+        await _create_concurrently(conn, TABLE, INDEX)
+        return
+
+    await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY {TABLE} {METHOD}"))
+    partitions = (await conn.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": TABLE})).all()
+    for partition in partitions:
+        attached = await conn.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits i "
+            "JOIN pg_index x ON x.indexrelid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:index) AND x.indrelid = to_regclass(:partition))"
+        ), {"index": INDEX, "partition": partition})
+        if attached:
+            continue
+        name = f"{partition}_embedding_hnsw"
+        await _create_concurrently(conn, partition, name)
+        await conn.execute(text(f"ALTER INDEX {INDEX} ATTACH PARTITION {name}"))
+    print(f"[hnsw] {INDEX} valid: {await index_valid(conn, INDEX)}")
+
+
+async def _main():
+    from config.config import load_config
+    from src.core.engine import configure_engines, dispose_engines, get_engine
+    from src.migrations import migrate
+
+    configure_engines(load_config().db)
+    try:
+        async with get_engine().begin() as conn:
+            await migrate(conn)
+        async with get_engine().connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await build_hnsw_index(conn)
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
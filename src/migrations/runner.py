@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Connection, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.migrations.hnsw import INDEX as HNSW_INDEX
+from src.migrations.versions import MIGRATIONS
+from src.models.partitions import ensure_insert_trigger, ensure_partitions, is_partitioned
+
+# отдельная metadata: таблица версий не должна попадать в Base.metadata.create_all
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# одновременный старт app и парсеров не должен применять миграции дважды
+LOCK_ID = 0x4846_4d47
+
+
+def _migrate(conn: Connection) -> list[str]:
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": LOCK_ID})
+    schema_migrations.create(conn, checkfirst=True)
+    applied = set(conn.scalars(select(schema_migrations.c.version)))
+
+    done = []
+    for version, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        migration(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=version, applied_at=datetime.utcnow(),
+        ))
+        done.append(version)
+        print(f"[migrations] applied {version}")
+
+    # триггер пропадает при пересоздании source_news (partitions convert), а тело функции
+    # могло измениться — приводим к текущему виду на каждом запуске
+    if "0005_source_news_notify" in applied | set(done) and ensure_insert_trigger(conn):
+        print("[migrations] recreated source_news insert trigger")
+
+    if is_partitioned(conn):
+        ensure_partitions(conn)
+    else:
+        print("[migrations] source_news is not partitioned, "
+              "run: python -m src.models.partitions convert")
+    if not conn.scalar(text(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+    ), {"name": HNSW_INDEX}):
+        print(f"[migrations] {HNSW_INDEX} is not built, run: python -m src.migrations.hnsw")
+    return done
+
+
+async def migrate(conn: AsyncConnection) -> list[str]:
+    """Применяет недостающие миграции в текущей транзакции; возвращает их версии."""
+    return await conn.run_sync(_migrate)
@@ -0,0 +1,254 @@
+"""
+Миграции схемы по порядку. Каждая — функция от синхронного Connection (вызывается через
+run_sync внутри общей транзакции) и должна быть идемпотентной: её могут применить к базе,
+созданной ещё до миграций (ensure_schema). Миграции — явный DDL на момент их появления и
+модели не читают: история воспроизводится одинаково, как бы модели ни менялись потом.
+Долгие операции (HNSW-индекс) сюда не входят — см. src/migrations/hnsw.py.
+"""
+from sqlalchemy import Connection, text
+
+from src.models.partitions import ensure_insert_trigger
+
+
+def m0001_baseline(conn: Connection):
+    """
+    Схема, которую до миграций создавал ensure_schema (create_all + недостающие колонки).
+    Базам того времени могут не хватать embedding_model и mentions — они добавляются.
+    Несекционированную source_news переводит python -m src.models.partitions convert.
+    """
+    for ddl in (
+        "CREATE EXTENSION IF NOT EXISTS vector",
+        "CREATE TABLE IF NOT EXISTS source_news ("
+        " id SERIAL NOT NULL,"
+        " dttm TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " url VARCHAR NOT NULL,"
+        " source_title VARCHAR,"
+        " other_id BIGINT,"
+        " content TEXT,"
+        " embedding VECTOR(384),"
+        " embedding_model VARCHAR,"
+        " is_original BOOLEAN,"
+        " PRIMARY KEY (id, dttm)"
+        ") PARTITION BY RANGE (dttm)",
+        "ALTER TABLE source_news ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_dttm ON source_news (dttm)",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_dttm_id ON source_news (dttm, id)",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_embedding_model "
+        "ON source_news (embedding_model)",
+        "CREATE TABLE IF NOT EXISTS news ("
+        " id SERIAL NOT NULL,"
+        " news_id INTEGER,"
+        " duplicate_count INTEGER,"
+        " timeline_length INTEGER,"
+        " sources_count INTEGER,"
+        " PRIMARY KEY (id)"
+        ")",
+        "CREATE TABLE IF NOT EXISTS tickers ("
+        " id SERIAL NOT NULL,"
+        " symbol VARCHAR(20) NOT NULL,"
+        " name VARCHAR,"
+        " PRIMARY KEY (id)"
+        ")",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_tickers_symbol ON tickers (symbol)",
+        "CREATE TABLE IF NOT EXISTS news_ticker_values ("
+        " id SERIAL NOT NULL,"
+        " news_id INTEGER NOT NULL,"
+        " ticker_id INTEGER NOT NULL,"
+        " hotness FLOAT NOT NULL,"
+        " mentions INTEGER DEFAULT 1 NOT NULL,"
+        " PRIMARY KEY (id),"
+        " CONSTRAINT uq_news_ticker UNIQUE (news_id, ticker_id),"
+        " FOREIGN KEY (news_id) REFERENCES news (id) ON DELETE CASCADE,"
+        " FOREIGN KEY (ticker_id) REFERENCES tickers (id) ON DELETE CASCADE"
+        ")",
+        "ALTER TABLE news_ticker_values "
+        "ADD COLUMN IF NOT EXISTS mentions INTEGER DEFAULT 1 NOT NULL",
+        "CREATE TABLE IF NOT EXISTS news_hotness_rollup ("
+        " bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " news_id INTEGER NOT NULL,"
+        " ticker_id INTEGER NOT NULL,"
+        " dttm TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " hotness FLOAT NOT NULL,"
+        " PRIMARY KEY (bucket, news_id, ticker_id)"
+        ")",
+        "CREATE INDEX IF NOT EXISTS ix_news_hotness_rollup_bucket_hotness "
+        "ON news_hotness_rollup (bucket, hotness DESC) INCLUDE (dttm, news_id, ticker_id)",
+        "CREATE INDEX IF NOT EXISTS ix_news_hotness_rollup_news_id "
+        "ON news_hotness_rollup (news_id)",
+        "CREATE TABLE IF NOT EXISTS ticker_hotness_rollup ("
+        " ticker_id INTEGER NOT NULL,"
+        " bucket_size VARCHAR(3) NOT NULL,"
+        " bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " hotness FLOAT NOT NULL,"
+        " news_count INTEGER NOT NULL,"
+        " source_count INTEGER NOT NULL,"
+        " PRIMARY KEY (ticker_id, bucket_size, bucket)"
+        ")",
+        "CREATE INDEX IF NOT EXISTS ix_ticker_hotness_rollup_series "
+        "ON ticker_hotness_rollup (ticker_id, bucket_size, bucket) "
+        "INCLUDE (hotness, news_count, source_count)",
+    ):
+        conn.execute(text(ddl))
+
+
+def m0002_hot_path_indexes(conn: Connection):
+    """
+    Индексы горячих запросов (см. python -m src.migrations.advisor). HNSW-индекс /search
+    строится отдельно (python -m src.migrations.hnsw): здесь, в транзакции старта под
+    advisory lock, на большой таблице он заблокировал бы запуск всех процессов.
+    """
+    for ddl in (
+        # окна по dttm обслуживает ix_source_news_dttm_id, одиночный индекс лишний
+        "DROP INDEX IF EXISTS ix_source_news_dttm",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_dttm_id ON source_news (dttm, id)",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_source_other "
+        "ON source_news (source_title, other_id)",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_source_dttm "
+        "ON source_news (source_title, dttm)",
+        "CREATE INDEX IF NOT EXISTS ix_source_news_embedding_model "
+        "ON source_news (embedding_model)",
+        "CREATE INDEX IF NOT EXISTS ix_news_news_id ON news (news_id)",
+        "CREATE INDEX IF NOT EXISTS ix_news_ticker_values_ticker_id "
+        "ON news_ticker_values (ticker_id) INCLUDE (news_id, hotness)",
+        # covering-индексы rollup'ов /hot и /tickers/{symbol}/hotness
+        "CREATE INDEX IF NOT EXISTS ix_news_hotness_rollup_bucket_hotness "
+        "ON news_hotness_rollup (bucket, hotness DESC) INCLUDE (dttm, news_id, ticker_id)",
+        "CREATE INDEX IF NOT EXISTS ix_news_hotness_rollup_news_id "
+        "ON news_hotness_rollup (news_id)",
+        "CREATE INDEX IF NOT EXISTS ix_ticker_hotness_rollup_series "
+        "ON ticker_hotness_rollup (ticker_id, bucket_size, bucket) "
+        "INCLUDE (hotness, news_count, source_count)",
+    ):
+        conn.execute(text(ddl))
+
+
+def m0003_split_content(conn: Connection):
+    """Текст статей из source_news в отдельную source_news_content со сжатием lz4."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS source_news_content ("
+        " source_news_id SERIAL NOT NULL,"
+        " content TEXT,"
+        " PRIMARY KEY (source_news_id)"
+        ")"
+    ))
+    # сжатие задаётся до переноса: SET COMPRESSION действует только на новые значения
+    conn.execute(text("ALTER TABLE source_news_content ALTER COLUMN content SET COMPRESSION lz4"))
+    has_content = conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'source_news' AND column_name = 'content')"
+    ))
+    if has_content:
+        conn.execute(text(
+            "INSERT INTO source_news_content (source_news_id, content) "
+            "SELECT id, content FROM source_news WHERE content IS NOT NULL "
+            "ON CONFLICT (source_news_id) DO NOTHING"
+        ))
+        conn.execute(text("ALTER TABLE source_news DROP COLUMN content"))
+
+
+def m0004_crawl_tasks(conn: Connection):
+    """Очередь обхода для шардированных ingest-воркеров (parsers/crawl_worker.py)."""
+    for ddl in (
+        "CREATE TABLE IF NOT EXISTS crawl_tasks ("
+        " id BIGSERIAL NOT NULL,"
+        " source_title VARCHAR NOT NULL,"
+        " kind VARCHAR(16) NOT NULL,"
+        " key VARCHAR NOT NULL,"
+        " url VARCHAR,"
+        " published_dttm VARCHAR,"
+        " status VARCHAR(16) DEFAULT 'pending' NOT NULL,"
+        " attempts INTEGER DEFAULT 0 NOT NULL,"
+        " available_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,"
+        " lease_until TIMESTAMP WITH TIME ZONE,"
+        " owner VARCHAR,"
+        " last_error TEXT,"
+        " updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,"
+        " PRIMARY KEY (id),"
+        " CONSTRAINT uq_crawl_task UNIQUE (source_title, kind, key)"
+        ")",
+        "CREATE INDEX IF NOT EXISTS ix_crawl_tasks_pending "
+        "ON crawl_tasks (available_at) WHERE status = 'pending'",
+        "CREATE INDEX IF NOT EXISTS ix_crawl_tasks_running "
+        "ON crawl_tasks (lease_until) WHERE status = 'running'",
+    ):
+        conn.execute(text(ddl))
+
+
+def m0005_source_news_notify(conn: Connection):
+    """
+    NOTIFY source_news_inserted на каждую вставку в source_news (один на оператор, не на
+    строку) и частичный индекс очереди анализа (parsers/analysis_worker.py).
+    """
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_source_news_unprocessed "
+        "ON source_news (dttm) WHERE is_original IS NULL"
+    ))
+    ensure_insert_trigger(conn)
+
+
+def m0006_source_news_unique(conn: Connection):
+    """
+    Уникальность (source_title, other_id, dttm): сначала удаляются накопившиеся дубли —
+    в группе остаётся строка, на которую есть News, иначе с меньшим id; News удалённых
+    строк уходят вместе с ними (news_ticker_values — по CASCADE).
+    """
+    conn.execute(text(
+        "CREATE TEMP TABLE source_news_dups ON COMMIT DROP AS "
+        "SELECT id FROM ("
+        " SELECT s.id, row_number() OVER ("
+        "  PARTITION BY s.source_title, s.other_id, s.dttm"
+        "  ORDER BY EXISTS (SELECT 1 FROM news n WHERE n.news_id = s.id) DESC, s.id"
+        " ) AS rn FROM source_news s WHERE s.other_id IS NOT NULL"
+        ") ranked WHERE rn > 1"
+    ))
+    conn.execute(text(
+        "DELETE FROM news_hotness_rollup WHERE news_id IN "
+        "(SELECT id FROM news WHERE news_id IN (SELECT id FROM source_news_dups))"
+    ))
+    conn.execute(text("DELETE FROM news WHERE news_id IN (SELECT id FROM source_news_dups)"))
+    conn.execute(text(
+        "DELETE FROM source_news_content "
+        "WHERE source_news_id IN (SELECT id FROM source_news_dups)"
+    ))
+    conn.execute(text("DELETE FROM source_news WHERE id IN (SELECT id FROM source_news_dups)"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_source_news_source_other_dttm "
+        "ON source_news (source_title, other_id, dttm)"
+    ))
+    # get_used обслуживает префикс уникального индекса
+    conn.execute(text("DROP INDEX IF EXISTS ix_source_news_source_other"))
+
+
+def m0007_analysis_attempts(conn: Connection):
+    """Счётчик сбоев анализа новости (parsers/analysis_worker.py откладывает «ядовитые»)."""
+    conn.execute(text(
+        "ALTER TABLE source_news "
+        "ADD COLUMN IF NOT EXISTS analysis_attempts smallint NOT NULL DEFAULT 0"
+    ))
+
+
+def m0008_backfill_embedding_model(conn: Connection):
+    """
+    embedding_model у строк, записанных до появления колонки: эмбеддинги той же модели
+    с правилами очистки v1. Без этого sync_store и /search отбрасывали бы всю историю
+    до полного reembed. Значение зафиксировано, а не берётся из EMBEDDING_MODEL_VERSION:
+    смена версии не должна задним числом менять эту миграцию.
+    """
+    conn.execute(text(
+        "UPDATE source_news "
+        "SET embedding_model = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        "@clean-v1' "
+        "WHERE embedding_model IS NULL AND embedding IS NOT NULL"
+    ))
+
+
+MIGRATIONS = [
+    ("0001_baseline", m0001_baseline),
+    ("0002_hot_path_indexes", m0002_hot_path_indexes),
+    ("0003_split_content", m0003_split_content),
+    ("0004_crawl_tasks", m0004_crawl_tasks),
+    ("0005_source_news_notify", m0005_source_news_notify),
+    ("0006_source_news_unique", m0006_source_news_unique),
+    ("0007_analysis_attempts", m0007_analysis_attempts),
+    ("0008_backfill_embedding_model", m0008_backfill_embedding_model),
+]
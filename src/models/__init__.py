@@ -1,2 +1,4 @@
 from src.models.base import Base
-from src.models.news import SourceNews
+from src.models.crawl import CrawlTask
+from src.models.news import SourceNews, SourceNewsContent, News, Ticker, NewsTickerValue, \
+    NewsHotness, TickerHotness
@@ -0,0 +1,42 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, \
+    UniqueConstraint, func
+
+from src.models.base import Base
+
+
+class CrawlTask(Base):
+    """
+    Очередь обхода для ingest-воркеров (parsers/crawl_worker.py).
+
+    kind="listing" — страница списка источника за день (key — дата), повторяется каждые
+    CRAWL__REFRESH_S, пока день не закончился; kind="article" — статья (key — other_id).
+    Воркер забирает строки через SELECT ... FOR UPDATE SKIP LOCKED и держит аренду до
+    lease_until; истёкшая аренда (воркер упал) снова делает задачу доступной.
+    Время — timestamptz от now() сервера: часы узлов не сравниваются между собой.
+    """
+    __tablename__ = "crawl_tasks"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    source_title = Column(String, nullable=False)
+    kind = Column(String(16), nullable=False)
+    key = Column(String, nullable=False)
+    url = Column(String)
+    published_dttm = Column(String)
+    # pending -> running -> done | failed; listing после обхода и после сбоя возвращается
+    # в pending и failed не становится
+    status = Column(String(16), nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    lease_until = Column(DateTime(timezone=True))
+    owner = Column(String)
+    last_error = Column(Text)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("source_title", "kind", "key", name="uq_crawl_task"),
+        # claim: доступные pending по available_at и просроченные running по lease_until
+        Index("ix_crawl_tasks_pending", "available_at",
+              postgresql_where=status == "pending"),
+        Index("ix_crawl_tasks_running", "lease_until",
+              postgresql_where=status == "running"),
+    )
@@ -1,31 +1,88 @@
 from pgvector.sqlalchemy import VECTOR
 from sqlalchemy import Column, Boolean, Integer, ForeignKey, String, DateTime, BigInteger, Text, \
-    Float, \
-    UniqueConstraint
+    Float, SmallInteger, \
+    UniqueConstraint, Index, text
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 
 from src.models.base import Base
 
 
+class SourceNewsContent(Base):
+    """
+    Текст статьи отдельно от метаданных source_news: сканы окон и дедупликация читают
+    узкие строки. Колонка сжимается lz4 (миграция 0003). FK нет — source_news секционирована.
+    """
+    __tablename__ = "source_news_content"
+
+    source_news_id = Column(Integer, primary_key=True)
+    content = Column(Text)
+
+
 class SourceNews(Base):
+    """
+    Таблица секционирована по месяцам dttm (см. src/models/partitions.py), поэтому ключ
+    секционирования входит в первичный ключ. Для ORM ключом остаётся id: get_by_id,
+    update_many и т. п. работают как раньше, просто без отсечения секций.
+    """
     __tablename__ = "source_news"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    dttm = Column(DateTime, nullable=False, index=True)
+    dttm = Column(DateTime, primary_key=True)
     url = Column(String, nullable=False)
     source_title = Column(String)
     other_id = Column(BigInteger)
-    content = Column(Text)
     embedding = Column(VECTOR(384))
+    embedding_model = Column(String, index=True)
 
     is_original = Column(Boolean)
+    # сбои parsers.analysis_worker на этой новости; после ANALYSIS__MAX_ATTEMPTS она
+    # откладывается (claim_unprocessed её не берёт), чтобы не валить воркеры по кругу
+    analysis_attempts = Column(SmallInteger, nullable=False, default=0, server_default="0")
+
+    # текст грузится только явно (selectinload(SourceNews.body)), случайный lazy load — ошибка
+    body = relationship(
+        SourceNewsContent,
+        primaryjoin="foreign(SourceNewsContent.source_news_id) == SourceNews.id",
+        uselist=False,
+        lazy="raise",
+        cascade="all, delete-orphan",
+    )
+    content = association_proxy("body", "content",
+                                creator=lambda content: SourceNewsContent(content=content))
+
+    __table_args__ = (
+        # keyset-пагинация ленты /news по (dttm, id) и все окна по dttm
+        Index("ix_source_news_dttm_id", "dttm", "id"),
+        # одна статья источника — одна строка (повтор задачи обхода, запоздавший воркер):
+        # INSERT ... ON CONFLICT DO NOTHING; ключ секционирования dttm обязан входить в
+        # уникальный индекс. Заодно get_used — index-only scan по префиксу
+        Index("uq_source_news_source_other_dttm", "source_title", "other_id", "dttm",
+              unique=True),
+        # лента и окна с фильтром по источнику
+        Index("ix_source_news_source_dttm", "source_title", "dttm"),
+        # очередь анализа: ещё не размеченные is_original (claim_unprocessed)
+        Index("ix_source_news_unprocessed", "dttm", postgresql_where=text("is_original IS NULL")),
+        # ANN-поиск /search; эмбеддинги нормализованы, поэтому cosine. В рабочей базе
+        # строится отдельно: python -m src.migrations.hnsw
+        Index(
+            "ix_source_news_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (dttm)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
 
 
 class News(Base):
     __tablename__ = "news"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    news_id = Column(Integer, ForeignKey("source_news.id"))
+    # без FK: на секционированную source_news можно ссылаться только по (id, dttm)
+    news_id = Column(Integer, index=True)
     duplicate_count = Column(Integer, default=0)
     timeline_length = Column(Integer, default=1)
     sources_count = Column(Integer, default=1)
@@ -52,10 +109,62 @@ class NewsTickerValue(Base):
     news_id = Column(Integer, ForeignKey("news.id", ondelete="CASCADE"), nullable=False)
     ticker_id = Column(Integer, ForeignKey("tickers.id", ondelete="CASCADE"), nullable=False)
     hotness = Column(Float, nullable=False)
+    mentions = Column(Integer, nullable=False, default=1, server_default="1")
 
     news = relationship("News", back_populates="tickers", uselist=False)
     ticker = relationship("Ticker", uselist=False)
 
     __table_args__ = (
         UniqueConstraint("news_id", "ticker_id", name="uq_news_ticker"),
+        # пересчёт ticker_hotness_rollup по тикеру без обращения к heap
+        Index("ix_news_ticker_values_ticker_id", "ticker_id",
+              postgresql_include=["news_id", "hotness"]),
+    )
+
+
+class NewsHotness(Base):
+    """
+    Предрасчитанный rollup для /hot: hotness пары (News, Ticker), разложенный по часовым
+    бакетам времени публикации. Индекс (bucket, hotness DESC) c INCLUDE позволяет брать
+    top-k каждого бакета index-only сканом.
+    """
+    __tablename__ = "news_hotness_rollup"
+
+    bucket = Column(DateTime, primary_key=True)
+    news_id = Column(Integer, primary_key=True)
+    ticker_id = Column(Integer, primary_key=True)
+    dttm = Column(DateTime, nullable=False)
+    hotness = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_news_hotness_rollup_bucket_hotness",
+            "bucket", hotness.desc(),
+            postgresql_include=["dttm", "news_id", "ticker_id"],
+        ),
+        Index("ix_news_hotness_rollup_news_id", "news_id"),
+    )
+
+
+class TickerHotness(Base):
+    """
+    Rollup для графиков /tickers/{symbol}/hotness: суммарная hotness, число новостей и
+    источников тикера в бакете bucket_size ("5m", "1h", "1d"). Пересчитывается
+    инкрементально — только бакеты, затронутые новыми NewsTickerValue.
+    """
+    __tablename__ = "ticker_hotness_rollup"
+
+    ticker_id = Column(Integer, primary_key=True)
+    bucket_size = Column(String(3), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    hotness = Column(Float, nullable=False)
+    news_count = Column(Integer, nullable=False)
+    source_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_ticker_hotness_rollup_series",
+            "ticker_id", "bucket_size", "bucket",
+            postgresql_include=["hotness", "news_count", "source_count"],
+        ),
     )
@@ -0,0 +1,239 @@
+"""
+Помесячные секции source_news.
+
+    python -m src.models.partitions convert          # разовый перевод старой таблицы
+    python -m src.models.partitions ensure --ahead 3 # создать секции на 3 месяца вперёд
+
+Секции называются source_news_pYYYYMM и покрывают [1-е число месяца, 1-е число следующего).
+Строки вне созданных секций (бэкфилл из далёкого прошлого) попадают в source_news_default.
+"""
+import argparse
+import asyncio
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import DBAPIError
+
+from src.core.notify import FEED_CHANGED, SOURCE_NEWS_INSERTED
+from src.models import Base, SourceNews, SourceNewsContent
+
+TABLE = SourceNews.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+INSERT_TRIGGER = SOURCE_NEWS_INSERTED
+
+
+def month_start(dttm: date | datetime) -> date:
+    return date(dttm.year, dttm.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    y, m = divmod(month.month - 1 + n, 12)
+    return date(month.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    prefix = f"{TABLE}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m").date()
+    except ValueError:
+        return None
+
+
+def is_partitioned(conn: Connection) -> bool:
+    return conn.scalar(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"
+    ), {"table": TABLE}) or False
+
+
+def list_partitions(conn: Connection) -> list[date]:
+    """Месяцы существующих помесячных секций, по возрастанию."""
+    names = conn.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": TABLE})
+    return sorted(m for m in map(parse_partition_name, names) if m is not None)
+
+
+def _bounds(month: date) -> str:
+    return f"dttm >= '{month.isoformat()}' AND dttm < '{add_months(month, 1).isoformat()}'"
+
+
+def create_partition(conn: Connection, month: date):
+    """
+    Секция месяца. Если строки этого месяца уже лежат в default-секции (dttm из
+    будущего — кривая дата источника), CREATE ... PARTITION OF упал бы на её проверке:
+    default отцепляется, секция создаётся, строки переносятся, default цепляется обратно.
+    """
+    name = partition_name(month)
+    if conn.scalar(text("SELECT to_regclass(:t)"), {"t": name}) is not None:
+        return
+    create = (
+        f"CREATE TABLE {name} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+    has_default = conn.scalar(text(
+        "SELECT relispartition FROM pg_class WHERE oid = to_regclass(:t)"
+    ), {"t": DEFAULT_PARTITION})
+    if not has_default or not conn.scalar(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {_bounds(month)})"
+    )):
+        conn.execute(text(create))
+        return
+
+    columns = ", ".join(c.name for c in SourceNews.__table__.columns)
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(create))
+    moved = conn.execute(text(
+        f"INSERT INTO {name} ({columns}) "
+        f"SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {_bounds(month)}"
+    )).rowcount
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {_bounds(month)}"))
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    print(f"[partitions] {name}: moved {moved} rows from {DEFAULT_PARTITION}")
+
+
+def ensure_partitions(conn: Connection, now: Optional[datetime] = None, ahead: int = 2):
+    """
+    Секции с текущего месяца на ahead месяцев вперёд и default-секция. Месяц, секцию
+    которого создать не удалось, пропускается с сообщением: ensure_partitions вызывают
+    каждый цикл и каждый старт, и одна ошибка не должна их останавливать.
+    """
+    if not is_partitioned(conn):
+        return
+    current = month_start(now or datetime.utcnow())
+    for n in range(ahead + 1):
+        month = add_months(current, n)
+        try:
+            with conn.begin_nested():
+                create_partition(conn, month)
+        except DBAPIError as exc:
+            print(f"[partitions] skipped {partition_name(month)}: {exc.orig!r}")
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+
+def has_insert_trigger(conn: Connection) -> bool:
+    return conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+        "WHERE tgrelid = to_regclass(:table) AND tgname = :name AND NOT tgisinternal)"
+    ), {"table": TABLE, "name": INSERT_TRIGGER})
+
+
+def ensure_insert_trigger(conn: Connection) -> bool:
+    """
+    NOTIFY на каждую вставку в source_news (один на оператор, не на строку):
+    source_news_inserted будит parsers.analysis_worker, feed_changed сбрасывает в кэше
+    ответов API ленту /news — от любого писателя (цикл парсеров, воркеры обхода).
+    Функция пересоздаётся всегда (её тело могло поменяться), триггер — если его нет:
+    он живёт на самой таблице и пропадает вместе с ней (partitions convert).
+    Возвращает True, если триггер пришлось создать.
+    """
+    conn.execute(text(
+        f"CREATE OR REPLACE FUNCTION notify_{INSERT_TRIGGER}() RETURNS trigger "
+        f"LANGUAGE plpgsql AS $$ BEGIN "
+        f"PERFORM pg_notify('{SOURCE_NEWS_INSERTED}', ''); "
+        f"PERFORM pg_notify('{FEED_CHANGED}', ''); RETURN NULL; "
+        f"END $$"
+    ))
+    if has_insert_trigger(conn):
+        return False
+    conn.execute(text(
+        f"CREATE TRIGGER {INSERT_TRIGGER} AFTER INSERT ON {TABLE} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION notify_{INSERT_TRIGGER}()"
+    ))
+    return True
+
+
+def convert_to_partitioned(conn: Connection):
+    """
+    Переводит обычную source_news в секционированную с сохранением id:
+    переименование -> новая таблица из модели -> секции на весь диапазон dttm ->
+    INSERT ... SELECT -> сдвиг sequence. Выполнять в одной транзакции при остановленных писателях.
+    """
+    if is_partitioned(conn) or conn.scalar(text("SELECT to_regclass(:t)"), {"t": TABLE}) is None:
+        return
+    legacy = f"{TABLE}_legacy"
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+    # FK news.news_id и индексы старой таблицы уходят вместе с ней
+    conn.execute(text("ALTER TABLE news DROP CONSTRAINT IF EXISTS news_news_id_fkey"))
+    for index in SourceNews.__table__.indexes:
+        conn.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_legacy"))
+    conn.execute(text(f"ALTER INDEX IF EXISTS {TABLE}_pkey RENAME TO {legacy}_pkey"))
+
+    Base.metadata.create_all(conn, tables=[SourceNews.__table__])
+    ensure_insert_trigger(conn)
+    bounds = conn.execute(text(f"SELECT min(dttm), max(dttm) FROM {legacy}")).one()
+    if bounds[0] is not None:
+        month, last = month_start(bounds[0]), month_start(bounds[1])
+        while month <= last:
+            create_partition(conn, month)
+            month = add_months(month, 1)
+    ensure_partitions(conn)
+
+    columns = ", ".join(c.name for c in SourceNews.__table__.columns)
+    conn.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {legacy}"))
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+        f"coalesce((SELECT max(id) FROM {TABLE}), 0) + 1, false)"
+    ))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+def list_detached(conn: Connection) -> list[date]:
+    """Месяцы таблиц source_news_pYYYYMM, уже отцепленных, но не удалённых (retention)."""
+    names = conn.scalars(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relkind = 'r' AND NOT relispartition AND relname LIKE :pattern"
+    ), {"pattern": f"{TABLE}_p%"})
+    return sorted(m for m in map(parse_partition_name, names) if m is not None)
+
+
+def detach_partition(conn: Connection, month: date):
+    """
+    Отцепляет секцию: дальше в неё ничего не пишется (строки этого месяца пойдут в
+    default-секцию), и её можно спокойно выгружать.
+    """
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {partition_name(month)}"))
+
+
+def drop_detached(conn: Connection, month: date):
+    """Удаляет отцепленную секцию вместе с текстами её строк в source_news_content."""
+    name = partition_name(month)
+    conn.execute(text(
+        f"DELETE FROM {SourceNewsContent.__tablename__} "
+        f"WHERE source_news_id IN (SELECT id FROM {name})"
+    ))
+    conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def _main(command: str, ahead: int):
+    from config.config import load_config
+    from src.core.engine import configure_engines, dispose_engines, get_engine
+    from src.migrations import migrate
+
+    config = load_config()
+    configure_engines(config.db)
+    try:
+        async with get_engine().begin() as conn:
+            # тексты должны уже переехать в source_news_content (миграция 0003)
+            await migrate(conn)
+            if command == "convert":
+                await conn.run_sync(convert_to_partitioned)
+            await conn.run_sync(ensure_partitions, None, ahead)
+            print([partition_name(m) for m in await conn.run_sync(list_partitions)])
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="source_news monthly partitions")
+    parser.add_argument("command", choices=["convert", "ensure"])
+    parser.add_argument("--ahead", default=2, type=int, help="months to create ahead")
+    args = parser.parse_args()
+    asyncio.run(_main(args.command, args.ahead))
@@ -1 +1,2 @@
 from src.repo.db import DB
+from src.repo.unit_of_work import UnitOfWork
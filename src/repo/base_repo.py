@@ -1,49 +1,120 @@
+from typing import Any, Iterable, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import select, update
+from sqlalchemy import Row, Select, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer as defer_column, load_only, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from src.models import Base
 
 
 class BaseRepo[T: Base]:
-    def __init__(self, session: AsyncSession, model: type[T]):
+    def __init__(self, session: AsyncSession, model: type[T], autocommit: bool = True):
+        """
+        autocommit=False — репозиторий только делает flush, а commit остаётся за вызывающим
+        (см. UnitOfWork).
+        """
         self.session = session
         self.model = model
+        self.autocommit = autocommit
+        self._staged: dict[int | UUID, dict] = {}
+
+    async def _commit(self):
+        await self.session.flush()
+        if self.autocommit:
+            await self.session.commit()
+
+    def _apply_loading(self, stmt: Select, *,
+                       only: Optional[Sequence[Any]] = None,
+                       defer: Optional[Sequence[Any]] = None,
+                       options: Optional[Sequence[LoaderOption]] = None) -> Select:
+        """
+        only — загрузить только эти колонки (load_only), defer — отложить эти колонки
+        (например, embedding у SourceNews), options — явные loader options.
+        Если options не переданы, как и раньше подгружаются все relationships (selectinload).
+        """
+        if only:
+            stmt = stmt.options(load_only(*only))
+        for column in defer or ():
+            stmt = stmt.options(defer_column(column))
+        if options is None:
+            for rel in self.model.__mapper__.relationships:
+                stmt = stmt.options(selectinload(getattr(self.model, rel.key)))
+        else:
+            stmt = stmt.options(*options)
+        return stmt
 
     async def create(self, **kwargs) -> T:
         model = self.model(**kwargs)
 
         self.session.add(model)
-        await self.session.flush()
-        await self.session.commit()
+        await self._commit()
 
         return model
 
-    async def get_by_id(self, model_id: int | UUID) -> T:
+    async def get_by_id(self, model_id: int | UUID, *,
+                        only: Optional[Sequence[Any]] = None,
+                        defer: Optional[Sequence[Any]] = None,
+                        options: Optional[Sequence[LoaderOption]] = None) -> T:
         stmt = select(self.model).filter(self.model.id == model_id)
-
-        for rel in self.model.__mapper__.relationships:
-            stmt = stmt.options(selectinload(rel.key))
+        stmt = self._apply_loading(stmt, only=only, defer=defer, options=options)
 
         return await self.session.scalar(stmt)
 
+    async def get_many(self, ids: Sequence[int | UUID], *,
+                       only: Optional[Sequence[Any]] = None,
+                       defer: Optional[Sequence[Any]] = None,
+                       options: Optional[Sequence[LoaderOption]] = None) -> list[T]:
+        """Модели по списку id одним запросом, в порядке ids (отсутствующие пропускаются)."""
+        if not ids:
+            return []
+        stmt = select(self.model).filter(self.model.id.in_(ids))
+        stmt = self._apply_loading(stmt, only=only, defer=defer, options=options)
+
+        by_id = {m.id: m for m in (await self.session.scalars(stmt)).all()}
+        return [by_id[i] for i in ids if i in by_id]
+
+    async def get_columns(self, ids: Sequence[int | UUID], *columns) -> Sequence[Row]:
+        """Только указанные колонки (плюс id) без построения ORM-объектов."""
+        if not ids:
+            return []
+        return (await self.session.execute(
+            select(self.model.id, *columns).filter(self.model.id.in_(ids))
+        )).all()
+
     async def update(self, model: T, **kwargs) -> T:
         for k, v in kwargs.items():
             setattr(model, k, v)
 
         self.session.add(model)
-        await self.session.flush()
-        await self.session.commit()
+        await self._commit()
 
         return model
 
-    async def update_by_id(self, model_id: int | UUID, **kwargs) -> T:
-        model: T = await self.session.execute(update(self.model).values(**kwargs).filter(
+    async def update_by_id(self, model_id: int | UUID, **kwargs) -> Optional[T]:
+        model = await self.session.scalar(update(self.model).values(**kwargs).filter(
             self.model.id == model_id,
-        ).returning(T))
-        await self.session.flush()
-        await self.session.commit()
+        ).returning(self.model))
+        await self._commit()
 
         return model
+
+    async def update_many(self, values: Iterable[tuple[int | UUID, dict]]):
+        """
+        Bulk UPDATE по первичному ключу: пары (id, {колонка: значение}) уходят одним
+        executemany (SQLAlchemy группирует строки с одинаковым набором колонок).
+        """
+        rows = [{"id": model_id, **row} for model_id, row in values]
+        if not rows:
+            return
+        await self.session.execute(update(self.model), rows)
+        await self._commit()
+
+    def stage_update(self, model_id: int | UUID, **kwargs):
+        """Копит изменения строки до flush_staged(); повторные вызовы для id сливаются."""
+        self._staged.setdefault(model_id, {}).update(kwargs)
+
+    async def flush_staged(self):
+        staged, self._staged = self._staged, {}
+        await self.update_many(staged.items())
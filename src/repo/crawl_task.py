@@ -0,0 +1,115 @@
+from datetime import timedelta
+from typing import Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import CrawlTask
+from src.repo.base_repo import BaseRepo
+
+LISTING = "listing"
+ARTICLE = "article"
+
+
+class CrawlTaskRepo(BaseRepo[CrawlTask]):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, CrawlTask, autocommit)
+
+    async def enqueue(self, source_title: str, kind: str, tasks: Iterable[Mapping]) -> int:
+        """
+        Вставка задач {key, url, published_dttm}; уже известные (source_title, kind, key)
+        пропускаются, поэтому обнаружение может повторяться на любом числе воркеров.
+        """
+        rows = [{"source_title": source_title, "kind": kind, **t} for t in tasks]
+        if not rows:
+            return 0
+        result = await self.session.execute(
+            pg_insert(CrawlTask).values(rows)
+            .on_conflict_do_nothing(constraint="uq_crawl_task")
+            .returning(CrawlTask.id)
+        )
+        inserted = len(result.all())
+        await self._commit()
+        return inserted
+
+    async def claim(self, owner: str, limit: int, lease: timedelta,
+                    sources: Optional[Sequence[str]] = None) -> Sequence[CrawlTask]:
+        """
+        Забирает до limit задач: доступные pending и running с истёкшей арендой.
+        Строки, которые держит другой воркер, пропускаются (SKIP LOCKED), а не ждут.
+        """
+        ready = or_(
+            and_(CrawlTask.status == "pending", CrawlTask.available_at <= func.now()),
+            and_(CrawlTask.status == "running", CrawlTask.lease_until < func.now()),
+        )
+        candidates = select(CrawlTask.id).filter(ready)
+        if sources is not None:
+            candidates = candidates.filter(CrawlTask.source_title.in_(sources))
+        candidates = (
+            candidates.order_by(CrawlTask.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        tasks = (await self.session.scalars(
+            update(CrawlTask)
+            .filter(CrawlTask.id.in_(candidates.scalar_subquery()))
+            .values(status="running", owner=owner, attempts=CrawlTask.attempts + 1,
+                    lease_until=func.now() + lease, updated_at=func.now())
+            .returning(CrawlTask)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await self._commit()
+        return tasks
+
+    async def _finish(self, task_id: int, owner: str, **values) -> bool:
+        """Только пока аренда наша: задачу, у которой аренда истекла и её забрали, не трогаем."""
+        result = await self.session.execute(
+            update(CrawlTask)
+            .filter(CrawlTask.id == task_id, CrawlTask.owner == owner,
+                    CrawlTask.status == "running")
+            .values(lease_until=None, updated_at=func.now(), **values)
+        )
+        await self._commit()
+        return result.rowcount > 0
+
+    async def complete(self, task_id: int, owner: str) -> bool:
+        return await self._finish(task_id, owner, status="done", last_error=None)
+
+    async def reschedule(self, task_id: int, owner: str, delay: timedelta) -> bool:
+        """Повторяющаяся задача (listing) снова в очереди через delay, попытки сбрасываются."""
+        return await self._finish(task_id, owner, status="pending", attempts=0, last_error=None,
+                                  available_at=func.now() + delay)
+
+    async def fail(self, task_id: int, owner: str, error: str, attempts: int,
+                   max_attempts: Optional[int], backoff: timedelta,
+                   max_backoff: Optional[timedelta] = None) -> bool:
+        """
+        Повтор с экспоненциальной паузой backoff * 2^(attempts-1), не длиннее max_backoff;
+        после max_attempts — failed. max_attempts=None — задача никогда не становится failed.
+        """
+        if max_attempts is not None and attempts >= max_attempts:
+            return await self._finish(task_id, owner, status="failed", last_error=error)
+        delay = backoff * 2 ** min(max(attempts - 1, 0), 16)
+        if max_backoff is not None:
+            delay = min(delay, max_backoff)
+        return await self._finish(task_id, owner, status="pending", last_error=error,
+                                  available_at=func.now() + delay)
+
+    async def purge(self, older_than: timedelta) -> int:
+        """Удаляет завершённые задачи старше older_than (их ключи уже есть в source_news)."""
+        result = await self.session.execute(
+            delete(CrawlTask).filter(
+                CrawlTask.status.in_(["done", "failed"]),
+                CrawlTask.updated_at < func.now() - older_than,
+            )
+        )
+        await self._commit()
+        return result.rowcount
+
+    async def stats(self) -> dict[tuple[str, str, str], int]:
+        rows = (await self.session.execute(
+            select(CrawlTask.source_title, CrawlTask.kind, CrawlTask.status, func.count())
+            .group_by(CrawlTask.source_title, CrawlTask.kind, CrawlTask.status)
+        )).all()
+        return {(source, kind, status): n for source, kind, status, n in rows}
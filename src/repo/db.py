@@ -1,8 +1,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.repo.crawl_task import CrawlTaskRepo
+from src.repo.hotness import HotnessRepo
+from src.repo.news import NewsRepo
+from src.repo.news_ticker_value import NewsTickerValueRepo
 from src.repo.source_news import SourceNewsRepo
+from src.repo.ticker import TickerRepo
 
 
 class DB:
-    def __init__(self, session: AsyncSession):
-        self.source_news = SourceNewsRepo(session)
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        self.session = session
+        self.source_news = SourceNewsRepo(session, autocommit)
+        self.news = NewsRepo(session, autocommit)
+        self.hotness = HotnessRepo(session, autocommit)
+        self.tickers = TickerRepo(session, autocommit)
+        self.news_ticker_values = NewsTickerValueRepo(session, autocommit)
+        self.crawl_tasks = CrawlTaskRepo(session, autocommit)
+
+    @property
+    def repos(self) -> list:
+        return [v for v in vars(self).values() if hasattr(v, "flush_staged")]
+
+    async def flush_staged(self):
+        for repo in self.repos:
+            await repo.flush_staged()
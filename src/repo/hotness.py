@@ -0,0 +1,215 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from sqlalchemy import Row, and_, delete, distinct, func, insert, literal, literal_column, \
+    select, true, tuple_, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import News, NewsHotness, NewsTickerValue, SourceNews, Ticker, TickerHotness
+from src.repo.base_repo import BaseRepo
+
+HOTNESS_BUCKET = timedelta(hours=1)
+
+# размеры бакетов ticker_hotness_rollup -> интервал Postgres
+TICKER_BUCKETS = {"5m": "5 minutes", "1h": "1 hour", "1d": "1 day"}
+
+# первая половина ключа pg_advisory_xact_lock(int, int) ячеек тикера в rollup'е
+TICKER_ROLLUP_LOCK = 5_037_001
+
+
+def ticker_bucket(bucket_size: str, column):
+    # литералы, а не bind-параметры: одно и то же выражение стоит и в SELECT, и в GROUP BY
+    return func.date_bin(
+        literal_column(f"interval '{TICKER_BUCKETS[bucket_size]}'"),
+        column,
+        literal_column("timestamp '2000-01-01'"),
+    )
+
+
+def bucket_start(dttm: datetime) -> datetime:
+    return dttm.replace(minute=0, second=0, microsecond=0)
+
+
+class HotnessRepo(BaseRepo[NewsHotness]):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, NewsHotness, autocommit)
+
+    async def refresh_news(self, news_ids: Sequence[int]):
+        """Пересобирает строки rollup'а для News с указанными id из news_ticker_values."""
+        if not news_ids:
+            return
+        await self.session.execute(delete(NewsHotness).filter(NewsHotness.news_id.in_(news_ids)))
+        await self.session.execute(insert(NewsHotness).from_select(
+            ["bucket", "news_id", "ticker_id", "dttm", "hotness"],
+            select(
+                func.date_trunc("hour", SourceNews.dttm),
+                News.id,
+                NewsTickerValue.ticker_id,
+                SourceNews.dttm,
+                NewsTickerValue.hotness,
+            )
+            .join(News, News.id == NewsTickerValue.news_id)
+            .join(SourceNews, SourceNews.id == News.news_id)
+            .filter(News.id.in_(news_ids))
+        ))
+        await self._commit()
+
+    async def refresh_tickers(self, news_ids: Sequence[int]):
+        """
+        Пересчитывает в ticker_hotness_rollup только бакеты (тикер, время), в которые
+        попадают News с указанными id, — для каждого размера бакета. Затронутые — и по
+        текущим news_ticker_values, и по прежнему состоянию из news_hotness_rollup, поэтому
+        вызывать до refresh_news. Ячейки сначала удаляются: бакет, где упоминаний не
+        осталось, пропадает, а не сохраняет старое значение.
+
+        Параллельные воркеры анализа пересчитывают тикеры по очереди: advisory lock на
+        тикер до конца транзакции, в порядке id (без deadlock'ов). Иначе агрегат одного
+        не видел бы ещё не закоммиченных news_ticker_values другого, и победил бы
+        последний commit.
+        """
+        if not news_ids:
+            return
+        ticker_ids = (await self.session.scalars(union(
+            select(NewsTickerValue.ticker_id).filter(NewsTickerValue.news_id.in_(news_ids)),
+            select(NewsHotness.ticker_id).filter(NewsHotness.news_id.in_(news_ids)),
+        ))).all()
+        for ticker_id in sorted(ticker_ids):
+            await self.session.execute(
+                select(func.pg_advisory_xact_lock(TICKER_ROLLUP_LOCK, ticker_id))
+            )
+        for bucket_size, interval in TICKER_BUCKETS.items():
+            bucket = ticker_bucket(bucket_size, SourceNews.dttm)
+            step = literal_column(f"interval '{interval}'")
+            affected = union(
+                select(NewsTickerValue.ticker_id, bucket.label("bucket"))
+                .join(News, News.id == NewsTickerValue.news_id)
+                .join(SourceNews, SourceNews.id == News.news_id)
+                .filter(News.id.in_(news_ids)),
+                select(NewsHotness.ticker_id,
+                       ticker_bucket(bucket_size, NewsHotness.dttm).label("bucket"))
+                .filter(NewsHotness.news_id.in_(news_ids)),
+            ).cte("affected")
+            await self.session.execute(
+                delete(TickerHotness).filter(
+                    TickerHotness.bucket_size == bucket_size,
+                    tuple_(TickerHotness.ticker_id, TickerHotness.bucket).in_(
+                        select(affected.c.ticker_id, affected.c.bucket)
+                    ),
+                )
+            )
+            aggregated = (
+                select(
+                    NewsTickerValue.ticker_id,
+                    literal(bucket_size),
+                    bucket,
+                    func.sum(NewsTickerValue.hotness),
+                    func.count(distinct(News.id)),
+                    func.count(distinct(SourceNews.source_title)),
+                )
+                .join(News, News.id == NewsTickerValue.news_id)
+                .join(SourceNews, SourceNews.id == News.news_id)
+                .join(affected, and_(
+                    affected.c.ticker_id == NewsTickerValue.ticker_id,
+                    affected.c.bucket == bucket,
+                ))
+                # границы по dttm, чтобы join не перебирал всю историю тикеров
+                .filter(
+                    SourceNews.dttm >= select(func.min(affected.c.bucket)).scalar_subquery(),
+                    SourceNews.dttm < select(
+                        func.max(affected.c.bucket) + step
+                    ).scalar_subquery(),
+                )
+                .group_by(NewsTickerValue.ticker_id, bucket)
+            )
+            stmt = pg_insert(TickerHotness).from_select(
+                ["ticker_id", "bucket_size", "bucket", "hotness", "news_count", "source_count"],
+                aggregated,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["ticker_id", "bucket_size", "bucket"],
+                set_={
+                    "hotness": stmt.excluded.hotness,
+                    "news_count": stmt.excluded.news_count,
+                    "source_count": stmt.excluded.source_count,
+                },
+            )
+            await self.session.execute(stmt)
+        await self._commit()
+
+    async def refresh(self, news_ids: Sequence[int]):
+        """Оба rollup'а после записи NewsTickerValue для этих News."""
+        # refresh_tickers берёт прежние ячейки из news_hotness_rollup — до его пересборки
+        await self.refresh_tickers(news_ids)
+        await self.refresh_news(news_ids)
+
+    async def get_ticker_series(self, ticker_id: int, bucket_size: str,
+                                start_dttm: datetime, end_dttm: datetime) -> Sequence[Row]:
+        """Точки ряда тикера за [start_dttm, end_dttm): range scan по ix_ticker_hotness_rollup_series."""
+        return (await self.session.execute(
+            select(TickerHotness.bucket, TickerHotness.hotness, TickerHotness.news_count,
+                   TickerHotness.source_count)
+            .filter(
+                TickerHotness.ticker_id == ticker_id,
+                TickerHotness.bucket_size == bucket_size,
+                TickerHotness.bucket >= start_dttm,
+                TickerHotness.bucket < end_dttm,
+            )
+            .order_by(TickerHotness.bucket)
+        )).all()
+
+    async def get_hottest(self, start_dttm: datetime, end_dttm: datetime, k: int) -> list[dict]:
+        """
+        Top-k пар (новость, тикер) по hotness за [start_dttm, end_dttm).
+        Для каждого часового бакета окна берётся его собственный top-k (index-only скан
+        по ix_news_hotness_rollup_bucket_hotness), затем кандидаты сливаются кучей.
+        """
+        buckets = func.generate_series(
+            bucket_start(start_dttm), bucket_start(end_dttm), HOTNESS_BUCKET,
+        ).table_valued("bucket").render_derived(name="b")
+        top_in_bucket = (
+            select(NewsHotness.news_id, NewsHotness.ticker_id, NewsHotness.dttm,
+                   NewsHotness.hotness)
+            .filter(
+                NewsHotness.bucket == buckets.c.bucket,
+                NewsHotness.dttm >= start_dttm,
+                NewsHotness.dttm < end_dttm,
+            )
+            .order_by(NewsHotness.hotness.desc())
+            .limit(k)
+            .lateral("t")
+        )
+        candidates = (await self.session.execute(
+            select(top_in_bucket).select_from(buckets).join(top_in_bucket, true())
+        )).all()
+        top = heapq.nlargest(k, candidates, key=lambda r: r.hotness)
+        if not top:
+            return []
+
+        details = (await self.session.execute(
+            select(News.id, SourceNews.id.label("source_news_id"), SourceNews.url,
+                   SourceNews.source_title)
+            .join(SourceNews, SourceNews.id == News.news_id)
+            .filter(News.id.in_({r.news_id for r in top}))
+        )).all()
+        news_by_id = {d.id: d for d in details}
+        symbols = dict((await self.session.execute(
+            select(Ticker.id, Ticker.symbol).filter(Ticker.id.in_({r.ticker_id for r in top}))
+        )).all())
+
+        result = []
+        for r in top:
+            news = news_by_id.get(r.news_id)
+            if news is None:
+                continue
+            result.append({
+                "news_id": r.news_id,
+                "source_news_id": news.source_news_id,
+                "dttm": r.dttm,
+                "url": news.url,
+                "source_title": news.source_title,
+                "ticker": symbols.get(r.ticker_id),
+                "hotness": r.hotness,
+            })
+        return result
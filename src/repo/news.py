@@ -0,0 +1,24 @@
+from typing import Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import News
+from src.repo.base_repo import BaseRepo
+
+
+class NewsRepo(BaseRepo[News]):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, News, autocommit)
+
+    async def lock_by_source_news(self, source_news_ids: Sequence[int]) -> Sequence[News]:
+        """
+        News оригиналов с указанными source_news.id, заблокированные до конца транзакции
+        (FOR UPDATE, в порядке id — без deadlock'ов между воркерами).
+        """
+        if not source_news_ids:
+            return []
+        return (await self.session.scalars(
+            select(News).filter(News.news_id.in_(source_news_ids))
+            .order_by(News.id).with_for_update()
+        )).all()
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Mapping, Optional, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import News, NewsTickerValue, SourceNews
+from src.repo.base_repo import BaseRepo
+
+
+class NewsTickerValueRepo(BaseRepo[NewsTickerValue]):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, NewsTickerValue, autocommit)
+
+    async def upsert_mentions(self, news_id: int, mentions: Mapping[int, int],
+                              hotness: float = 0.0):
+        """Одна вставка на новость: ticker_id -> число упоминаний, повторный вызов обновляет mentions."""
+        if not mentions:
+            return
+        stmt = pg_insert(NewsTickerValue).values([
+            {"news_id": news_id, "ticker_id": ticker_id, "mentions": count, "hotness": hotness}
+            for ticker_id, count in mentions.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_news_ticker",
+            set_={"mentions": stmt.excluded.mentions},
+        )
+        await self.session.execute(stmt)
+        await self._commit()
+
+    async def get_active(self, start_dttm: datetime,
+                         news_ids: Optional[Sequence[int]] = None) -> Sequence[Row]:
+        """
+        Пары (News, Ticker) оригиналов с dttm >= start_dttm вместе со всеми входами скорера;
+        news_ids — только пары этих News.
+        """
+        stmt = (
+            select(
+                NewsTickerValue.id,
+                NewsTickerValue.news_id,
+                NewsTickerValue.hotness,
+                NewsTickerValue.mentions,
+                News.duplicate_count,
+                News.sources_count,
+                News.timeline_length,
+                SourceNews.dttm,
+            )
+            .join(News, News.id == NewsTickerValue.news_id)
+            .join(SourceNews, SourceNews.id == News.news_id)
+            .filter(SourceNews.dttm >= start_dttm)
+        )
+        if news_ids is not None:
+            stmt = stmt.filter(NewsTickerValue.news_id.in_(news_ids))
+        return (await self.session.execute(stmt)).all()
@@ -1,25 +1,217 @@
 import datetime
-from typing import Sequence
+from typing import AsyncIterator, Mapping, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Integer, Row, Select, all_, bindparam, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from src.models import SourceNews
+from src.models import News, SourceNews, SourceNewsContent
 from src.repo.base_repo import BaseRepo
 
 
 class SourceNewsRepo(BaseRepo[SourceNews]):
-    def __init__(self, session: AsyncSession):
-        super().__init__(session, SourceNews)
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, SourceNews, autocommit)
 
     async def get_used(self, source_title: str) -> Sequence[int]:
         return (await self.session.scalars(select(SourceNews.other_id).filter(
             SourceNews.source_title == source_title,
         ))).all()
 
-    async def get_last_for_n_days(self, days: int) -> Sequence[SourceNews]:
+    async def insert_new(self, rows: Sequence[Mapping]) -> Sequence[SourceNews]:
+        """
+        Пачка {dttm, source_title, url, other_id, content, embedding, embedding_model} одним
+        INSERT ... ON CONFLICT DO NOTHING по uq_source_news_source_other_dttm: уже сохранённые
+        статьи (повтор задачи, запоздавший воркер) пропускаются. Тексты — тем же commit.
+        Возвращает вставленные строки с загруженным текстом.
+        """
+        if not rows:
+            return []
+        contents = {(r["source_title"], r["other_id"], r["dttm"]): r["content"] for r in rows}
+        inserted = (await self.session.execute(
+            pg_insert(SourceNews)
+            .values([{k: v for k, v in r.items() if k != "content"} for r in rows])
+            .on_conflict_do_nothing(index_elements=["source_title", "other_id", "dttm"])
+            .returning(SourceNews.id, SourceNews.source_title, SourceNews.other_id,
+                       SourceNews.dttm)
+        )).all()
+        if inserted:
+            await self.session.execute(pg_insert(SourceNewsContent).values([
+                {"source_news_id": r.id,
+                 "content": contents[(r.source_title, r.other_id, r.dttm)]}
+                for r in inserted
+            ]))
+        await self._commit()
+        return await self.get_many([r.id for r in inserted],
+                                   options=[selectinload(SourceNews.body)])
+
+    async def get_last_for_n_days(self, days: int,
+                                  embedding_model: Optional[str] = None, *,
+                                  options: Sequence = ()) -> Sequence[SourceNews]:
+        """
+        Новости за последние days дней. Текст лежит в source_news_content и по умолчанию
+        не грузится; при необходимости options=[selectinload(SourceNews.body)].
+        """
         now = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
         prev = now - datetime.timedelta(days=days)
-        return (await self.session.scalars(select(SourceNews).filter(
-            SourceNews.dttm > prev
-        ))).all()
+        stmt = select(SourceNews).filter(SourceNews.dttm > prev)
+        if embedding_model is not None:
+            stmt = stmt.filter(SourceNews.embedding_model == embedding_model)
+        stmt = self._apply_loading(stmt, options=options)
+        return (await self.session.scalars(stmt)).all()
+
+    async def get_embeddings_after(self, last_id: int, limit: int,
+                                   embedding_model: Optional[str] = None,
+                                   exclude: Sequence[int] = ()) -> Sequence[Row]:
+        """
+        (id, dttm, source_title, embedding) строк с id > last_id, по возрастанию id;
+        exclude — уже известные id (передаются одним массивом, а не списком параметров).
+        """
+        stmt = select(
+            SourceNews.id, SourceNews.dttm, SourceNews.source_title, SourceNews.embedding,
+        ).filter(SourceNews.id > last_id, SourceNews.embedding.is_not(None))
+        if embedding_model is not None:
+            stmt = stmt.filter(SourceNews.embedding_model == embedding_model)
+        if len(exclude):
+            stmt = stmt.filter(SourceNews.id != all_(
+                bindparam("exclude", [int(i) for i in exclude], type_=ARRAY(Integer))
+            ))
+        return (await self.session.execute(stmt.order_by(SourceNews.id).limit(limit))).all()
+
+    def _unprocessed_query(self, since: datetime.datetime, limit: int,
+                           options: Sequence, ids: Optional[Sequence[int]] = None,
+                           max_attempts: Optional[int] = None) -> Select:
+        stmt = select(SourceNews).filter(SourceNews.dttm >= since,
+                                         SourceNews.is_original.is_(None))
+        if ids is not None:
+            stmt = stmt.filter(SourceNews.id.in_(ids))
+        if max_attempts is not None:
+            stmt = stmt.filter(SourceNews.analysis_attempts < max_attempts)
+        stmt = stmt.order_by(SourceNews.dttm, SourceNews.id).limit(limit)
+        return self._apply_loading(stmt, options=options)
+
+    async def get_unprocessed(self, since: datetime.datetime, limit: int, *,
+                              options: Sequence = ()) -> Sequence[SourceNews]:
+        """Сохранённые, но не проанализированные новости (is_original IS NULL), старые первыми."""
+        return (await self.session.scalars(
+            self._unprocessed_query(since, limit, options)
+        )).all()
+
+    async def claim_unprocessed(self, since: datetime.datetime, limit: int, *,
+                                ids: Optional[Sequence[int]] = None,
+                                max_attempts: Optional[int] = None,
+                                options: Sequence = ()) -> Sequence[SourceNews]:
+        """
+        Как get_unprocessed, но строки блокируются до конца транзакции (FOR UPDATE SKIP
+        LOCKED): параллельные воркеры анализа разбирают разные новости. Для UnitOfWork.
+        ids — только из этих новостей, max_attempts — без отложенных после стольких сбоев.
+        """
+        return (await self.session.scalars(
+            self._unprocessed_query(since, limit, options, ids, max_attempts)
+            .with_for_update(skip_locked=True, of=SourceNews)
+        )).all()
+
+    async def add_analysis_attempt(self, source_news_id: int) -> Optional[int]:
+        """Сбой анализа новости: analysis_attempts + 1; возвращает новое значение."""
+        attempts = await self.session.scalar(
+            update(SourceNews)
+            .filter(SourceNews.id == source_news_id)
+            .values(analysis_attempts=SourceNews.analysis_attempts + 1)
+            .returning(SourceNews.analysis_attempts)
+        )
+        await self._commit()
+        return attempts
+
+    async def get_detail(self, source_news_id: int) -> Optional[Row]:
+        """Новость целиком для детального просмотра: метаданные, текст и поля News."""
+        return (await self.session.execute(
+            select(
+                SourceNews.id, SourceNews.dttm, SourceNews.url, SourceNews.source_title,
+                SourceNews.other_id, SourceNews.is_original,
+                News.id.label("news_id"), News.duplicate_count, News.timeline_length,
+                News.sources_count, SourceNewsContent.content,
+            )
+            .outerjoin(SourceNewsContent, SourceNewsContent.source_news_id == SourceNews.id)
+            .outerjoin(News, News.news_id == SourceNews.id)
+            .filter(SourceNews.id == source_news_id)
+        )).first()
+
+    async def get_stale_embeddings(self, embedding_model: str, after_id: int,
+                                   limit: int) -> Sequence[Row]:
+        """(id, source_title, content) строк, эмбеддинг которых посчитан не embedding_model."""
+        return (await self.session.execute(
+            select(SourceNews.id, SourceNews.source_title, SourceNewsContent.content)
+            .outerjoin(SourceNewsContent, SourceNewsContent.source_news_id == SourceNews.id)
+            .filter(
+                SourceNews.id > after_id,
+                SourceNews.embedding_model.is_distinct_from(embedding_model),
+            )
+            .order_by(SourceNews.id)
+            .limit(limit)
+        )).all()
+
+    @staticmethod
+    def _feed_query(*, after: Optional[tuple[datetime.datetime, int]] = None,
+                    source_title: Optional[str] = None,
+                    start_dttm: Optional[datetime.datetime] = None,
+                    end_dttm: Optional[datetime.datetime] = None,
+                    with_content: bool = False) -> Select:
+        columns = [
+            SourceNews.id, SourceNews.dttm, SourceNews.url, SourceNews.source_title,
+            SourceNews.other_id, SourceNews.is_original,
+            News.duplicate_count, News.timeline_length, News.sources_count,
+        ]
+        if with_content:
+            columns.append(SourceNewsContent.content)
+
+        stmt = select(*columns).outerjoin(News, News.news_id == SourceNews.id)
+        if with_content:
+            stmt = stmt.outerjoin(SourceNewsContent,
+                                  SourceNewsContent.source_news_id == SourceNews.id)
+        if after is not None:
+            stmt = stmt.filter(tuple_(SourceNews.dttm, SourceNews.id) > tuple_(*after))
+        if source_title is not None:
+            stmt = stmt.filter(SourceNews.source_title == source_title)
+        if start_dttm is not None:
+            stmt = stmt.filter(SourceNews.dttm >= start_dttm)
+        if end_dttm is not None:
+            stmt = stmt.filter(SourceNews.dttm < end_dttm)
+        return stmt.order_by(SourceNews.dttm, SourceNews.id)
+
+    async def get_feed_page(self, limit: int, **filters) -> Sequence[Row]:
+        """Страница ленты после курсора (dttm, id); фильтры — как у _feed_query."""
+        return (await self.session.execute(self._feed_query(**filters).limit(limit))).all()
+
+    async def stream_feed(self, partition_size: int = 500,
+                          **filters) -> AsyncIterator[Sequence[Row]]:
+        """Лента через server-side cursor: отдаёт строки пачками по мере чтения."""
+        result = await self.session.stream(
+            self._feed_query(**filters).execution_options(yield_per=partition_size)
+        )
+        async for partition in result.partitions(partition_size):
+            yield partition
+
+    async def search(self, embedding: Sequence[float], k: int, *,
+                     embedding_model: Optional[str] = None,
+                     source_title: Optional[str] = None,
+                     start_dttm: Optional[datetime.datetime] = None,
+                     end_dttm: Optional[datetime.datetime] = None) -> Sequence[Row]:
+        """k ближайших по косинусу новостей (HNSW-индекс ix_source_news_embedding_hnsw)."""
+        distance = SourceNews.embedding.cosine_distance(embedding).label("distance")
+        stmt = select(
+            SourceNews.id, SourceNews.dttm, SourceNews.url, SourceNews.source_title,
+            SourceNews.is_original, distance,
+        )
+        if embedding_model is not None:
+            stmt = stmt.filter(SourceNews.embedding_model == embedding_model)
+        if source_title is not None:
+            stmt = stmt.filter(SourceNews.source_title == source_title)
+        if start_dttm is not None:
+            stmt = stmt.filter(SourceNews.dttm >= start_dttm)
+        if end_dttm is not None:
+            stmt = stmt.filter(SourceNews.dttm < end_dttm)
+
+        # фильтры применяются после обхода графа, поэтому кандидатов берём с запасом
+        await self.session.execute(text(f"SET LOCAL hnsw.ef_search = {max(40, 4 * int(k))}"))
+        return (await self.session.execute(stmt.order_by(distance).limit(k))).all()
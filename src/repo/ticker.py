@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Ticker
+from src.repo.base_repo import BaseRepo
+
+
+class TickerRepo(BaseRepo[Ticker]):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        super().__init__(session, Ticker, autocommit)
+
+    async def get_by_symbol(self, symbol: str) -> Optional[Ticker]:
+        return await self.session.scalar(select(Ticker).filter(Ticker.symbol == symbol))
+
+    async def get_all(self) -> list[Ticker]:
+        return list(await self.session.scalars(select(Ticker).order_by(Ticker.id)))
+
+    async def fingerprint(self) -> tuple:
+        """Дешёвый отпечаток таблицы: меняется при любой вставке/удалении/правке symbol или name."""
+        row = (await self.session.execute(select(
+            func.count(),
+            func.md5(func.string_agg(
+                func.concat(Ticker.id, ":", Ticker.symbol, ":", func.coalesce(Ticker.name, "")),
+                aggregate_order_by("|", Ticker.id),
+            )),
+        ))).one()
+        return tuple(row)
@@ -0,0 +1,36 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.repo.db import DB
+
+
+class UnitOfWork:
+    """
+    Одна транзакция на блок:
+
+        async with UnitOfWork(session_maker) as db:
+            db.source_news.stage_update(news_id, is_original=True)
+            await db.news.create(...)
+
+    Репозитории внутри не коммитят. stage_update'ы копятся и на выходе уходят
+    bulk UPDATE'ами, затем один commit. При исключении — rollback.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self.session = None
+        self.db = None
+
+    async def __aenter__(self) -> DB:
+        self.session = self.session_maker()
+        self.db = DB(self.session, autocommit=False)
+        return self.db
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.db.flush_staged()
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+        finally:
+            await self.session.close()
@@ -1,24 +1,219 @@
+import asyncio
+import base64
+import json
 from datetime import datetime
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.core.get_db import get_db
+from parsers.utils import EMBEDDING_MODEL_VERSION, generate_news_embedding
+from src.core.cache import TTLCache
+from src.core.get_db import get_db, get_session_pool
+from src.core.notify import NEWS_ORIGINAL, NEWS_STORYLINE, TICKER_HOTNESS
+from src.core.response_cache import CachedRoute, cache_response
 from src.repo import DB
 
-router = APIRouter(prefix="/api/v1")
+router = APIRouter(prefix="/api/v1", route_class=CachedRoute)
+
+query_embeddings_cache = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+search_results_cache = TTLCache(maxsize=1024, ttl=60)
 
 
 @router.get("/hot")
+@cache_response()
 async def get_hottest(
         start_dttm: datetime,
         end_dttm: datetime,
-        k: int = 10,
+        k: int = Query(10, gt=0, le=100),
         db: DB = Depends(get_db),
 ):
-    if end_dttm >= start_dttm:
+    if end_dttm <= start_dttm:
         raise HTTPException(400, "date interval is invalid")
 
-    result = await db.source_news.get_hottest(start_dttm, end_dttm, k)
+    result = await db.hotness.get_hottest(start_dttm, end_dttm, k)
 
     return result
 
+
+def encode_cursor(dttm: datetime, news_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{dttm.isoformat()}|{news_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        dttm, news_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(dttm), int(news_id)
+    except ValueError:
+        raise HTTPException(400, "cursor is invalid")
+
+
+def _feed_item(row) -> dict:
+    item = dict(row._mapping)
+    item["dttm"] = item["dttm"].isoformat()
+    return item
+
+
+@router.get("/news")
+@cache_response()
+async def get_news(
+        cursor: Optional[str] = None,
+        source_title: Optional[str] = None,
+        start_dttm: Optional[datetime] = None,
+        end_dttm: Optional[datetime] = None,
+        limit: int = Query(100, gt=0, le=1000),
+        with_content: bool = False,
+        format: Literal["json", "ndjson"] = "json",
+        db: DB = Depends(get_db),
+        session_pool: async_sessionmaker = Depends(get_session_pool),
+):
+    """
+    Лента SourceNews по возрастанию (dttm, id) с keyset-пагинацией.
+    format=json — страница из limit строк и next_cursor;
+    format=ndjson — весь диапазон после cursor потоком, по строке JSON на новость.
+    """
+    if start_dttm and end_dttm and end_dttm <= start_dttm:
+        raise HTTPException(400, "date interval is invalid")
+
+    filters = dict(
+        after=decode_cursor(cursor) if cursor else None,
+        source_title=source_title,
+        start_dttm=start_dttm,
+        end_dttm=end_dttm,
+        with_content=with_content,
+    )
+
+    if format == "ndjson":
+        async def stream():
+            # отдельная сессия: ответ стримится уже после завершения обработчика
+            async with session_pool() as session:
+                async for rows in DB(session).source_news.stream_feed(**filters):
+                    yield "".join(
+                        json.dumps(_feed_item(r), ensure_ascii=False) + "\n" for r in rows
+                    )
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    rows = await db.source_news.get_feed_page(limit, **filters)
+    next_cursor = encode_cursor(rows[-1].dttm, rows[-1].id) if len(rows) == limit else None
+    return {
+        "items": [_feed_item(r) for r in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/news/{source_news_id}")
+@cache_response()
+async def get_news_detail(source_news_id: int, db: DB = Depends(get_db)):
+    """Одна новость с полным текстом — единственное место API, где текст читается всегда."""
+    row = await db.source_news.get_detail(source_news_id)
+    if row is None:
+        raise HTTPException(404, "news not found")
+    return _feed_item(row)
+
+
+@router.get("/search")
+async def search_news(
+        q: str = Query(..., min_length=1, max_length=1000),
+        k: int = Query(10, gt=0, le=100),
+        source_title: Optional[str] = None,
+        start_dttm: Optional[datetime] = None,
+        end_dttm: Optional[datetime] = None,
+        db: DB = Depends(get_db),
+):
+    """Семантический поиск по SourceNews: запрос эмбеддится той же моделью, что и новости."""
+    if start_dttm and end_dttm and end_dttm <= start_dttm:
+        raise HTTPException(400, "date interval is invalid")
+
+    q = q.strip()
+    if not q:
+        raise HTTPException(400, "query is empty")
+    key = (q, k, source_title, start_dttm, end_dttm)
+    result = search_results_cache.get(key)
+    if result is not None:
+        return result
+
+    embedding = query_embeddings_cache.get(q)
+    if embedding is None:
+        embedding = await asyncio.to_thread(generate_news_embedding, q, None)
+        query_embeddings_cache.set(q, embedding)
+
+    rows = await db.source_news.search(
+        embedding, k,
+        embedding_model=EMBEDDING_MODEL_VERSION,
+        source_title=source_title,
+        start_dttm=start_dttm,
+        end_dttm=end_dttm,
+    )
+    result = [_feed_item(r) for r in rows]
+    search_results_cache.set(key, result)
+    return result
+
+
+@router.get("/tickers/{symbol}/hotness")
+@cache_response()
+async def get_ticker_hotness(
+        symbol: str,
+        from_dttm: datetime = Query(..., alias="from"),
+        to_dttm: datetime = Query(..., alias="to"),
+        bucket: Literal["5m", "1h", "1d"] = "1h",
+        db: DB = Depends(get_db),
+):
+    """Ряд hotness / числа новостей / числа источников тикера с шагом bucket."""
+    if to_dttm <= from_dttm:
+        raise HTTPException(400, "date interval is invalid")
+
+    ticker = await db.tickers.get_by_symbol(symbol)
+    if ticker is None:
+        raise HTTPException(404, "ticker not found")
+
+    points = await db.hotness.get_ticker_series(ticker.id, bucket, from_dttm, to_dttm)
+    return {
+        "symbol": ticker.symbol,
+        "bucket": bucket,
+        "points": [
+            {
+                "dttm": p.bucket.isoformat(),
+                "hotness": p.hotness,
+                "news_count": p.news_count,
+                "source_count": p.source_count,
+            }
+            for p in points
+        ],
+    }
+
+
+STREAM_CHANNELS = (NEWS_ORIGINAL, NEWS_STORYLINE, TICKER_HOTNESS)
+STREAM_HEARTBEAT = 15
+
+
+@router.get("/stream")
+async def stream_events(
+        request: Request,
+        channels: Optional[str] = Query(None, description="через запятую: "
+                                                          + ",".join(STREAM_CHANNELS)),
+):
+    """
+    Server-Sent Events: новые оригинальные новости, сюжетные линии и обновления hotness.
+    События приходят из ingest через NOTIFY сразу после коммита.
+    """
+    selected = set(channels.split(",")) if channels else set(STREAM_CHANNELS)
+    if not selected <= set(STREAM_CHANNELS):
+        raise HTTPException(400, f"unknown channels: {sorted(selected - set(STREAM_CHANNELS))}")
+
+    broker = request.app.state.broker
+
+    async def events():
+        with broker.subscribe(selected) as subscription:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                channel, payload = event
+                yield f"event: {channel}\ndata: {payload}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1 @@
+from src.store.embeddings import EmbeddingStore, EmbeddingWindow, sync_store
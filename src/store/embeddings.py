@@ -0,0 +1,433 @@
+import asyncio
+import fcntl
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models import SourceNews
+from src.repo import DB
+
+EMBEDDING_DIM = 384
+DTTM_DTYPE = "datetime64[us]"
+# сколько id ниже last_id перечитывает sync_store: запас на транзакции, закоммиченные
+# позже соседних (пачка dump парсера, воркеры обхода)
+SYNC_OVERLAP = 10_000
+
+
+@dataclass
+class EmbeddingWindow:
+    """
+    Срез хранилища: параллельные массивы, отсортированные по dttm.
+    Полученные через EmbeddingStore.window массивы — view на memmap, без копирования.
+    """
+    ids: np.ndarray
+    dttm: np.ndarray
+    source_codes: np.ndarray
+    sources: list[str]
+    embeddings: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def source_titles(self) -> np.ndarray:
+        return np.asarray(self.sources, dtype=object)[self.source_codes]
+
+    def slice(self, start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> "EmbeddingWindow":
+        """Подокно [start, end) — тоже view."""
+        lo, hi = 0, len(self)
+        if start is not None:
+            lo = int(np.searchsorted(self.dttm, np.datetime64(start, "us"), "left"))
+        if end is not None:
+            hi = int(np.searchsorted(self.dttm, np.datetime64(end, "us"), "left"))
+        return self._take(slice(lo, hi))
+
+    def exclude(self, ids: Iterable[int]) -> "EmbeddingWindow":
+        """Окно без указанных id (копия, если что-то исключено)."""
+        mask = ~np.isin(self.ids, np.fromiter(ids, dtype=np.int64))
+        if mask.all():
+            return self
+        return self._take(mask)
+
+    def _take(self, key) -> "EmbeddingWindow":
+        return EmbeddingWindow(
+            ids=self.ids[key],
+            dttm=self.dttm[key],
+            source_codes=self.source_codes[key],
+            sources=self.sources,
+            embeddings=self.embeddings[key],
+        )
+
+    @classmethod
+    def from_news(cls, news: Iterable[SourceNews]) -> "EmbeddingWindow":
+        news = sorted((n for n in news if n.embedding is not None), key=lambda n: (n.dttm, n.id))
+        sources = sorted({n.source_title or "" for n in news})
+        codes = {s: i for i, s in enumerate(sources)}
+        return cls(
+            ids=np.array([n.id for n in news], dtype=np.int64),
+            dttm=np.array([n.dttm for n in news], dtype=DTTM_DTYPE),
+            source_codes=np.array([codes[n.source_title or ""] for n in news], dtype=np.int16),
+            sources=sources,
+            embeddings=np.array([n.embedding for n in news],
+                                dtype=np.float32).reshape(-1, EMBEDDING_DIM),
+        )
+
+
+class EmbeddingStore:
+    """
+    Append-only хранилище эмбеддингов SourceNews на диске.
+
+    Основной сегмент — memmap-файлы embeddings.f32 (capacity x 384), ids.i64, dttm.i64,
+    sources.i16, строки отсортированы по dttm, поэтому окно по времени — два searchsorted
+    и view. Записанные строки основного сегмента не меняются никогда: новые дописываются
+    только после count, а строки старше последней (поздние) копятся в маленьком
+    отсортированном сегменте late.<n>.npz и подмешиваются к окну при чтении.
+    Когда поздних набирается LATE_LIMIT, оба сегмента сливаются в файлы нового поколения
+    (ids.<g>.i64, ...). meta.json (count, capacity, last_id, источники, поколение, файл
+    поздних строк) публикует изменения атомарной заменой, старые файлы после этого
+    удаляются: уже открытые view читателей остаются целыми, новые строки они подхватывают
+    через refresh().
+    Читателей сколько угодно. Писать может несколько процессов (цикл парсеров, воркеры
+    анализа), но только через sync_store — она берёт блокировку директории.
+    Хранилище привязано к версии модели эмбеддингов: при смене версии оно очищается,
+    чтобы в одном окне никогда не оказались векторы разных моделей.
+    """
+    META = "meta.json"
+    INITIAL_CAPACITY = 1 << 14
+    LATE_LIMIT = 4096
+    FILES = (("ids.i64", np.int64), ("dttm.i64", np.int64), ("sources.i16", np.int16),
+             ("embeddings.f32", np.float32))
+
+    def __init__(self, path: str, *, model_version: Optional[str] = None,
+                 readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self.model_version = model_version
+        self.count = 0
+        self.capacity = 0
+        self.generation = 0
+        self.last_id = 0
+        self.sources: list[str] = []
+        self.late_file: Optional[str] = None
+        self._late = self._empty()
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self.count + len(self._late)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _segment_file(self, name: str, generation: int) -> str:
+        # поколение 0 — имена файлов хранилищ, созданных до появления поколений
+        if generation == 0:
+            return self._file(name)
+        stem, ext = name.split(".")
+        return self._file(f"{stem}.{generation}.{ext}")
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._file(self.META), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"count": 0, "capacity": 0, "last_id": 0, "sources": [],
+                    "model_version": self.model_version}
+
+    def _write_meta(self):
+        tmp = self._file(self.META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "count": self.count,
+                "capacity": self.capacity,
+                "generation": self.generation,
+                "last_id": self.last_id,
+                "sources": self.sources,
+                "late_file": self.late_file,
+                "model_version": self.model_version,
+            }, f)
+        os.replace(tmp, self._file(self.META))
+
+    @staticmethod
+    def _empty() -> EmbeddingWindow:
+        return EmbeddingWindow(
+            ids=np.empty(0, dtype=np.int64),
+            dttm=np.empty(0, dtype=DTTM_DTYPE),
+            source_codes=np.empty(0, dtype=np.int16),
+            sources=[],
+            embeddings=np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+        )
+
+    def _open(self, generation: int, capacity: int, mode: str) -> list[np.ndarray]:
+        return [
+            np.memmap(self._segment_file(name, generation), dtype, mode,
+                      shape=(capacity, EMBEDDING_DIM) if dtype == np.float32 else (capacity,))
+            for name, dtype in self.FILES
+        ]
+
+    def _map(self, generation: int, capacity: int):
+        if capacity == 0:
+            empty = self._empty()
+            self._ids, self._dttm = empty.ids, empty.dttm
+            self._source_codes, self._embeddings = empty.source_codes, empty.embeddings
+            return
+        ids, dttm, codes, embeddings = self._open(generation, capacity,
+                                                  "r" if self.readonly else "r+")
+        self._ids, self._dttm = ids, dttm.view(DTTM_DTYPE)
+        self._source_codes, self._embeddings = codes, embeddings
+
+    def _load_late(self, name: Optional[str]) -> EmbeddingWindow:
+        if name is None:
+            return self._empty()
+        with np.load(self._file(name)) as f:
+            return EmbeddingWindow(
+                ids=f["ids"], dttm=f["dttm"].view(DTTM_DTYPE), source_codes=f["codes"],
+                sources=[], embeddings=f["embeddings"],
+            )
+
+    def refresh(self):
+        """Перечитывает meta.json и, если поменялись файлы, перемапливает их."""
+        for attempt in range(5):
+            meta = self._read_meta()
+            generation = meta.get("generation", 0)
+            try:
+                if generation != self.generation or meta["capacity"] != self.capacity \
+                        or not hasattr(self, "_ids"):
+                    self._map(generation, meta["capacity"])
+                if meta.get("late_file") != self.late_file:
+                    self._late = self._load_late(meta.get("late_file"))
+                break
+            except FileNotFoundError:
+                # писатель успел выпустить следующее поколение и удалить это — читаем заново
+                if attempt == 4:
+                    raise
+        self.count = meta["count"]
+        self.capacity = meta["capacity"]
+        self.generation = generation
+        self.last_id = meta["last_id"]
+        self.sources = meta["sources"]
+        self.late_file = meta.get("late_file")
+
+        stored_version = meta.get("model_version")
+        if self.model_version is None:
+            self.model_version = stored_version
+        elif stored_version != self.model_version and not self.readonly:
+            self.reset()
+
+    def _remove(self, generation: int, late_file: Optional[str]):
+        """Файлы, на которые больше не ссылается meta.json."""
+        paths = [self._segment_file(name, generation) for name, _ in self.FILES]
+        if late_file is not None:
+            paths.append(self._file(late_file))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def reset(self):
+        """Очищает хранилище: пустое новое поколение, файлы старого удаляются."""
+        old_generation, old_late = self.generation, self.late_file
+        self.generation += 1
+        self.count = 0
+        self.capacity = 0
+        self.last_id = 0
+        self.sources = []
+        self.late_file = None
+        self._late = self._empty()
+        self._map(self.generation, 0)
+        self._write_meta()
+        self._remove(old_generation, old_late)
+
+    @staticmethod
+    def _capacity_for(required: int, current: int = 0) -> int:
+        capacity = max(current, EmbeddingStore.INITIAL_CAPACITY)
+        while capacity < required:
+            capacity *= 2
+        return capacity
+
+    def _grow(self, required: int):
+        """Расширяет файлы текущего поколения; записанные строки остаются на месте."""
+        if required <= self.capacity:
+            return
+        capacity = self._capacity_for(required, self.capacity)
+        for name, dtype in self.FILES:
+            itemsize = np.dtype(dtype).itemsize * (EMBEDDING_DIM if dtype == np.float32 else 1)
+            with open(self._segment_file(name, self.generation), "ab") as f:
+                f.truncate(capacity * itemsize)
+        self.capacity = capacity
+        self._map(self.generation, capacity)
+
+    def _source_code(self, source_title: Optional[str]) -> int:
+        source_title = source_title or ""
+        if source_title not in self.sources:
+            self.sources.append(source_title)
+        return self.sources.index(source_title)
+
+    def append(self, ids: np.ndarray, dttm: np.ndarray, source_titles: list[Optional[str]],
+               embeddings: np.ndarray):
+        """
+        Дописывает пачку строк. Строки не старше последней записанной идут в конец
+        основного сегмента, остальные — в сегмент поздних строк.
+        """
+        if self.readonly:
+            raise RuntimeError("EmbeddingStore is opened read-only")
+        if len(ids) == 0:
+            return
+
+        batch = EmbeddingWindow(
+            ids=np.asarray(ids, dtype=np.int64),
+            dttm=np.asarray(dttm, dtype=DTTM_DTYPE),
+            source_codes=np.array([self._source_code(s) for s in source_titles],
+                                  dtype=np.int16),
+            sources=self.sources,
+            embeddings=np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM),
+        )
+        batch = batch._take(np.lexsort((batch.ids, batch.dttm)))
+        n = self.count
+        split = int(np.searchsorted(batch.dttm, self._dttm[n - 1], "left")) if n else 0
+        late, tail = batch._take(slice(0, split)), batch._take(slice(split, None))
+
+        if len(tail):
+            end = n + len(tail)
+            self._grow(end)
+            self._ids[n:end] = tail.ids
+            self._dttm[n:end] = tail.dttm
+            self._source_codes[n:end] = tail.source_codes
+            self._embeddings[n:end] = tail.embeddings
+            for arr in (self._ids, self._dttm.view(np.int64), self._source_codes,
+                        self._embeddings):
+                arr.flush()
+            self.count = end
+        self.last_id = max(self.last_id, int(batch.ids.max()))
+
+        old_generation, old_late = self.generation, self.late_file
+        if len(late):
+            merged = _merge(self._late, late)
+            if len(merged) >= self.LATE_LIMIT:
+                self._compact(merged)
+            else:
+                self._write_late(merged)
+        self._write_meta()
+        if self.generation != old_generation:
+            self._remove(old_generation, old_late)
+        elif self.late_file != old_late and old_late is not None:
+            os.remove(self._file(old_late))
+
+    def _write_late(self, late: EmbeddingWindow):
+        seq = int(self.late_file.split(".")[1]) + 1 if self.late_file else 1
+        name = f"late.{seq}.npz"
+        tmp = self._file(f"late.{seq}.tmp.npz")
+        np.savez(tmp, ids=late.ids, dttm=late.dttm.view(np.int64), codes=late.source_codes,
+                 embeddings=late.embeddings)
+        os.replace(tmp, self._file(name))
+        self.late_file = name
+        self._late = late
+
+    def _compact(self, late: EmbeddingWindow):
+        """Основной сегмент + поздние строки -> файлы нового поколения."""
+        merged = _merge(self._main(), late)
+        generation = self.generation + 1
+        capacity = self._capacity_for(len(merged))
+        ids, dttm, codes, embeddings = self._open(generation, capacity, "w+")
+        for arr, values in ((ids, merged.ids), (dttm, merged.dttm.view(np.int64)),
+                            (codes, merged.source_codes), (embeddings, merged.embeddings)):
+            arr[:len(merged)] = values
+            arr.flush()
+        self.generation = generation
+        self.capacity = capacity
+        self.count = len(merged)
+        self.late_file = None
+        self._late = self._empty()
+        self._map(generation, capacity)
+
+    def _main(self) -> EmbeddingWindow:
+        n = self.count
+        return EmbeddingWindow(
+            ids=self._ids[:n],
+            dttm=self._dttm[:n],
+            source_codes=self._source_codes[:n],
+            sources=list(self.sources),
+            embeddings=self._embeddings[:n],
+        )
+
+    def ids_after(self, low: int) -> np.ndarray:
+        """id строк хранилища больше low."""
+        ids = np.concatenate([self._ids[:self.count], self._late.ids])
+        return ids[ids > low]
+
+    def window(self, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> EmbeddingWindow:
+        """
+        Строки с dttm в [start, end): view на memmap, а если в интервал попали
+        поздние строки — слитая копия.
+        """
+        main = self._main().slice(start, end)
+        late = self._late.slice(start, end)
+        if not len(late):
+            return main
+        return _merge(main, late)
+
+
+def _merge(a: EmbeddingWindow, b: EmbeddingWindow) -> EmbeddingWindow:
+    """Два отсортированных по dttm окна одного хранилища -> одно, тоже отсортированное."""
+    merged = EmbeddingWindow(
+        ids=np.concatenate([a.ids, b.ids]),
+        dttm=np.concatenate([a.dttm, b.dttm]),
+        source_codes=np.concatenate([a.source_codes, b.source_codes]),
+        sources=a.sources or b.sources,
+        embeddings=np.concatenate([a.embeddings, b.embeddings]),
+    )
+    return merged._take(np.lexsort((merged.ids, merged.dttm)))
+
+
+async def sync_store(store: EmbeddingStore, session_pool: async_sessionmaker,
+                     batch_size: int = 5000, overlap: int = SYNC_OVERLAP) -> int:
+    """
+    Догружает в store новые строки source_news с эмбеддингами версии store.model_version.
+    Возвращает их число.
+    id выдаёт sequence при вставке, а видна строка только после commit своей транзакции,
+    поэтому при параллельных писателях строка с меньшим id может появиться позже большей.
+    Так что перечитываются и overlap id ниже store.last_id, за вычетом уже известных.
+    Под flock на <path>/.lock: параллельный писатель дождётся и продолжит с его last_id.
+    """
+    lock = open(store._file(".lock"), "a")
+    try:
+        await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+        store.refresh()
+        return await _sync(store, session_pool, batch_size, overlap)
+    finally:
+        lock.close()
+
+
+async def _sync(store: EmbeddingStore, session_pool: async_sessionmaker,
+                batch_size: int, overlap: int) -> int:
+    after = max(store.last_id - overlap, 0)
+    known = store.ids_after(after)
+    total = 0
+    while True:
+        async with session_pool() as session:
+            rows = await DB(session).source_news.get_embeddings_after(
+                after, batch_size, embedding_model=store.model_version, exclude=known,
+            )
+        if not rows:
+            return total
+
+        store.append(
+            ids=np.array([r.id for r in rows], dtype=np.int64),
+            dttm=np.array([r.dttm for r in rows], dtype=DTTM_DTYPE),
+            source_titles=[r.source_title for r in rows],
+            embeddings=np.vstack([np.asarray(r.embedding, dtype=np.float32) for r in rows]),
+        )
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+        after = rows[-1].id
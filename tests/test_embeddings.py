@@ -0,0 +1,177 @@
+"""
+EmbeddingStore и sync_store на временной директории, без БД:
+sync_store получает строки через подменённый SourceNewsRepo.get_embeddings_after.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.repo.source_news import SourceNewsRepo
+from src.store import EmbeddingStore, sync_store
+from src.store.embeddings import DTTM_DTYPE, EMBEDDING_DIM
+
+T0 = datetime(2026, 1, 1)
+MODEL = "test-model@v1"
+
+
+def vectors(ids) -> np.ndarray:
+    """Эмбеддинг строки id — вектор из id: по нему видно, что строка не перепутана."""
+    return np.repeat(np.asarray(ids, dtype=np.float32)[:, None], EMBEDDING_DIM, axis=1)
+
+
+def append(store: EmbeddingStore, ids, minutes, source: str = "src"):
+    store.append(
+        ids=np.asarray(ids, dtype=np.int64),
+        dttm=np.array([T0 + timedelta(minutes=m) for m in minutes], dtype=DTTM_DTYPE),
+        source_titles=[source] * len(ids),
+        embeddings=vectors(ids),
+    )
+
+
+def assert_consistent(window):
+    assert np.all(np.diff(window.dttm.astype(np.int64)) >= 0)
+    np.testing.assert_array_equal(window.embeddings, vectors(window.ids))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path), model_version=MODEL)
+
+
+def test_append_in_order(store):
+    append(store, [1, 2, 3], [0, 1, 2])
+    append(store, [4, 5], [2, 3])
+
+    window = store.window()
+    assert store.count == 5 and store.late_file is None
+    assert store.last_id == 5
+    np.testing.assert_array_equal(window.ids, [1, 2, 3, 4, 5])
+    assert_consistent(window)
+    # окно без поздних строк — view на memmap, а не копия
+    assert isinstance(window.embeddings, np.memmap)
+    np.testing.assert_array_equal(
+        store.window(T0 + timedelta(minutes=1), T0 + timedelta(minutes=3)).ids, [2, 3, 4])
+
+
+def test_late_row_merged_into_window(store):
+    append(store, [1, 2, 3], [0, 10, 20])
+    append(store, [4], [5])
+
+    assert store.count == 3 and store.late_file is not None
+    assert len(store) == 4
+    window = store.window()
+    np.testing.assert_array_equal(window.ids, [1, 4, 2, 3])
+    assert_consistent(window)
+    # поздняя строка вне интервала в окно не попадает, оно остаётся view
+    window = store.window(T0 + timedelta(minutes=10))
+    np.testing.assert_array_equal(window.ids, [2, 3])
+    assert isinstance(window.embeddings, np.memmap)
+    np.testing.assert_array_equal(store.ids_after(1), [2, 3, 4])
+
+    reader = EmbeddingStore(store.path, readonly=True)
+    np.testing.assert_array_equal(reader.window(end=T0 + timedelta(minutes=10)).ids, [1, 4])
+
+
+def test_compaction_at_late_limit(store):
+    store.LATE_LIMIT = 3
+    append(store, [1, 2], [0, 100])
+    append(store, [3, 4], [10, 20])
+    late_file = store.late_file
+    assert store.generation == 0 and late_file is not None
+
+    append(store, [5], [30])
+
+    assert store.generation == 1
+    assert store.late_file is None and store.count == 5
+    assert not os.path.exists(os.path.join(store.path, late_file))
+    assert not os.path.exists(os.path.join(store.path, "ids.i64"))
+    window = store.window()
+    np.testing.assert_array_equal(window.ids, [1, 3, 4, 5, 2])
+    assert_consistent(window)
+
+    reader = EmbeddingStore(store.path, readonly=True)
+    np.testing.assert_array_equal(reader.window().ids, [1, 3, 4, 5, 2])
+
+
+def test_reader_view_survives_generation_switch(store):
+    store.LATE_LIMIT = 2
+    append(store, [1, 2, 3], [0, 10, 20])
+    reader = EmbeddingStore(store.path, readonly=True)
+    view = reader.window()
+    snapshot = np.array(view.embeddings)
+
+    append(store, [4, 5], [1, 2])
+    assert store.generation == 1
+
+    # файлы старого поколения удалены, но уже открытый memmap читается как прежде
+    np.testing.assert_array_equal(view.ids, [1, 2, 3])
+    np.testing.assert_array_equal(view.embeddings, snapshot)
+
+    reader.refresh()
+    np.testing.assert_array_equal(reader.window().ids, [1, 4, 5, 2, 3])
+    assert_consistent(reader.window())
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSourceNews:
+    """Таблица source_news в памяти; строки видны после commit()."""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+        self.session_maker = FakeSession
+
+    def commit(self, *rows: tuple[int, int]):
+        for id_, minute in rows:
+            self.rows.append(SimpleNamespace(
+                id=id_, dttm=T0 + timedelta(minutes=minute), source_title="src",
+                embedding=vectors([id_])[0].tolist(),
+            ))
+
+
+@pytest.fixture
+def source_news(monkeypatch):
+    table = FakeSourceNews()
+
+    async def get_embeddings_after(self, last_id, limit, embedding_model=None, exclude=()):
+        table.calls.append((last_id, list(exclude)))
+        assert embedding_model == MODEL
+        known = set(exclude)
+        rows = sorted((r for r in table.rows if r.id > last_id and r.id not in known),
+                      key=lambda r: r.id)
+        return rows[:limit]
+
+    monkeypatch.setattr(SourceNewsRepo, "get_embeddings_after", get_embeddings_after)
+    return table
+
+
+def test_sync_rereads_overlap_without_duplicates(store, source_news):
+    source_news.commit((1, 0), (2, 1), (4, 3), (5, 4))
+    assert asyncio.run(sync_store(store, source_news.session_maker, batch_size=3)) == 4
+    assert store.last_id == 5
+
+    # транзакция с id 3 закоммичена позже, чем 4 и 5
+    source_news.commit((3, 2))
+    source_news.calls.clear()
+    assert asyncio.run(sync_store(store, source_news.session_maker, overlap=10)) == 1
+
+    last_id, exclude = source_news.calls[0]
+    assert last_id == 0 and sorted(exclude) == [1, 2, 4, 5]
+    ids = store.ids_after(0)
+    assert len(ids) == len(set(ids.tolist())) == 5
+    window = store.window()
+    np.testing.assert_array_equal(window.ids, [1, 2, 3, 4, 5])
+    assert_consistent(window)
+
+    assert asyncio.run(sync_store(store, source_news.session_maker)) == 0